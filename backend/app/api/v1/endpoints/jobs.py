@@ -1,91 +1,527 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Any
-import shutil
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from collections import Counter
+import asyncio
+import hashlib
 import uuid
 import os
 
-from ....app import schemas # Dotted path from endpoints directory
-from ....app import crud # Dotted path from endpoints directory
-from ....app.db import session as db_session # Dotted path from endpoints directory
-from ....app.core.config import settings
-from ....app.services import file_handler, job_orchestrator # Dotted path from endpoints directory
+from .... import schemas # Dotted path from endpoints directory
+from .... import crud # Dotted path from endpoints directory
+from ....db import session as db_session # Dotted path from endpoints directory
+from ....core.config import settings
+from ....services import artifacts, checkpoints, events, file_handler, job_queue, job_results, profiling # Dotted path from endpoints directory
+from ....services.storage import get_storage_backend, run_blocking
 
 router = APIRouter()
 
-@router.post("/uploadfile/", response_model=schemas.job.JobSchema)
-async def create_upload_file(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    db: Session = Depends(db_session.get_db)
-) -> Any:
-    """
-    Upload a file for processing.
-    """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
-
+def _make_internal_filename(original_filename: str) -> str:
     # Generate a unique filename to avoid collisions
     unique_id = uuid.uuid4()
-    file_extension = os.path.splitext(file.filename)[1]
-    internal_filename = f"{unique_id}{file_extension}"
+    file_extension = os.path.splitext(original_filename)[1]
+    return f"{unique_id}{file_extension}"
 
-    try:
-        # Store the file temporarily locally before uploading to MinIO
-        # In a production system, you might stream directly or use a more robust temp storage
-        temp_file_path = f"/tmp/{internal_filename}"
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Upload to MinIO (or other object storage)
-        file_path_in_storage = await file_handler.save_file_to_storage(temp_file_path, internal_filename, file.content_type)
-        os.remove(temp_file_path) # Clean up temp file
+def _etag(db_job: Any, *variant: Any) -> str:
+    """Weak ETag from the job's row version, plus the request parameters that shape the representation."""
+    tag = f"{db_job.id}-{db_job.version}"
+    if variant:
+        tag += "-" + hashlib.sha1(repr(variant).encode()).hexdigest()[:12]
+    return f'W/"{tag}"'
 
-    except Exception as e:
-        # Clean up temp file if it exists and an error occurs
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
-    finally:
-        file.file.close()
+def _caching_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Sets caching headers; returns a 304 response if the client's If-None-Match already matches."""
+    headers = _caching_headers(etag)
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in candidates or etag.removeprefix("W/") in candidates:
+            return Response(status_code=304, headers=headers)
+    return None
+
+def _json_response(body: bytes, etag: str) -> Response:
+    """Serves already serialized JSON as is (no response_model validation or re-encoding)."""
+    return Response(content=body, media_type="application/json", headers=_caching_headers(etag))
+
+def _get_job_or_404(db: Session, job_id: int, with_results: bool = False):
+    db_job = crud.job.get_job(db, job_id=job_id, with_results=with_results)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+def _load_results(db_job: Any) -> Any:
+    """The job's results column, loaded on first access (blocking: call through run_in_threadpool)."""
+    return db_job.results
+
+async def _register_upload(
+    db: Session,
+    internal_filename: str,
+    original_filename: str,
+    content_type: str,
+    file_path_in_storage: str,
+    content_hash: str,
+    priority: Optional[int] = None,
+    tenant_id: Optional[str] = None,
+    profile: bool = False
+):
+    """Records a stored upload and creates its job (reusing results for identical content)."""
+    existing_file = crud.file.get_uploaded_file_by_hash(db, content_hash=content_hash)
+    if existing_file and existing_file.file_path != file_path_in_storage:
+        # Identical content is already stored: share that object and drop the copy we just wrote
+        await file_handler.remove_file_from_storage(file_path_in_storage)
+        file_path_in_storage = existing_file.file_path
 
     db_file = crud.file.create_uploaded_file(
         db=db, 
         file_in=schemas.file.UploadedFileCreate(
             filename=internal_filename, 
-            original_filename=file.filename,
-            content_type=file.content_type,
-            file_path=file_path_in_storage
+            original_filename=original_filename,
+            content_type=content_type,
+            file_path=file_path_in_storage,
+            content_hash=content_hash
             )
         )
     
     if not db_file:
         raise HTTPException(status_code=500, detail="Could not record file in database.")
 
+    job_in = schemas.job.JobCreate(uploaded_file_id=db_file.id, priority=priority, tenant_id=tenant_id, profile=profile)
+
+    # Identical content of the same type already processed by this pipeline version: reuse its results
+    reusable_job = crud.job.get_reusable_job(
+        db, content_hash=content_hash, content_type=content_type, pipeline_version=settings.PIPELINE_VERSION
+    )
+    if reusable_job:
+        return crud.job.create_reused_job(db=db, job_in=job_in, source_job=reusable_job)
+
     # Create a job for this file
-    job_in = schemas.job.JobCreate(uploaded_file_id=db_file.id)
     db_job = crud.job.create_job(db=db, job_in=job_in)
 
     if not db_job:
         # Potentially delete the file from storage and db if job creation fails, or mark as orphaned
         raise HTTPException(status_code=500, detail="Could not create processing job.")
 
-    # Add the processing task to background tasks
-    background_tasks.add_task(job_orchestrator.process_file_job, job_id=db_job.id, db_provider=db_session.get_db)
+    # Hand the job to the worker subsystem; the pipeline never runs in the API process
+    job_queue.enqueue_job(db_job.id)
     
     return db_job
 
+@router.post("/uploadfile/", response_model=schemas.job.JobSchema)
+async def create_upload_file(
+    file: UploadFile = File(...),
+    priority: Optional[int] = Query(None, description="Queue priority; higher runs first (database job queue only)"),
+    tenant_id: Optional[str] = Query(None, max_length=255, description="Tenant to share worker capacity fairly with"),
+    profile: bool = Query(False, description="Profile the pipeline run; download it from GET /jobs/{job_id}/profile"),
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Upload a file for processing (multipart form).
+    Note that the multipart parser spools large files to a temporary file before this handler
+    runs; use /uploadfile/stream/ to avoid local disk entirely.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+
+    internal_filename = _make_internal_filename(file.filename)
+
+    try:
+        # Stream the upload into object storage; size limit and SHA-256 are applied on the way
+        file_path_in_storage, content_hash, _ = await file_handler.save_stream_to_storage(
+            file.file, internal_filename, file.content_type, max_bytes=settings.MAX_UPLOAD_SIZE_BYTES
+        )
+    except file_handler.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+    finally:
+        file.file.close()
+
+    return await _register_upload(db, internal_filename, file.filename, file.content_type, file_path_in_storage, content_hash, priority, tenant_id, profile)
+
+
+@router.post("/uploadfile/stream/", response_model=schemas.job.JobSchema)
+async def create_upload_file_stream(
+    request: Request,
+    filename: str,
+    priority: Optional[int] = Query(None, description="Queue priority; higher runs first (database job queue only)"),
+    tenant_id: Optional[str] = Query(None, max_length=255, description="Tenant to share worker capacity fairly with"),
+    profile: bool = Query(False, description="Profile the pipeline run; download it from GET /jobs/{job_id}/profile"),
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Upload a file for processing as the raw request body (Content-Type = the file's type).
+    The body is piped chunk by chunk into a multipart upload; nothing touches local disk.
+    """
+    if not filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > settings.MAX_UPLOAD_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {settings.MAX_UPLOAD_SIZE_BYTES} byte limit")
+
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    internal_filename = _make_internal_filename(filename)
+
+    try:
+        file_path_in_storage, content_hash, _ = await file_handler.save_async_stream_to_storage(
+            request.stream(), internal_filename, content_type, max_bytes=settings.MAX_UPLOAD_SIZE_BYTES
+        )
+    except file_handler.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+
+    return await _register_upload(db, internal_filename, filename, content_type, file_path_in_storage, content_hash, priority, tenant_id, profile)
+
+
+def _iter_batch_members(files: List[UploadFile]) -> Iterator[Tuple[str, BinaryIO]]:
+    """Plain files as they are, archives (zip/tar) expanded into their member files."""
+    for file in files:
+        if file_handler.is_archive(file.filename or "", file.content_type):
+            yield from file_handler.iter_archive_members(file.file, file.filename, file.content_type)
+        elif file.filename:
+            yield file.filename, file.file
+
+@router.post("/uploadfiles/batch/", response_model=schemas.job.BatchUploadResponse)
+async def create_upload_batch(
+    files: List[UploadFile] = File(...),
+    priority: Optional[int] = Query(None, description="Queue priority; higher runs first (database job queue only)"),
+    tenant_id: Optional[str] = Query(None, max_length=255, description="Tenant to share worker capacity fairly with"),
+    profile: bool = Query(False, description="Profile the pipeline run; download it from GET /jobs/{job_id}/profile"),
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Upload many files at once; zip and tar archives are expanded into their member files.
+    Files are streamed into object storage concurrently, all file and job rows are inserted in one
+    transaction and the jobs are enqueued together. Track them with GET /batches/{batch_id}.
+    """
+    try:
+        stored = await file_handler.save_members_to_storage(
+            _iter_batch_members(files),
+            _make_internal_filename,
+            max_bytes=settings.MAX_UPLOAD_SIZE_BYTES,
+            max_members=settings.BATCH_MAX_FILES
+        )
+    except (file_handler.UploadTooLargeError, file_handler.BatchTooLargeError) as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not save files: {e}")
+    if not stored:
+        raise HTTPException(status_code=400, detail="No files in the batch")
+
+    # Identical content (already stored, or earlier in this batch) shares one stored object
+    content_hashes = [content_hash for _, _, _, content_hash, _ in stored]
+    existing_files = crud.file.get_uploaded_files_by_hashes(db, content_hashes)
+    canonical_paths = {content_hash: db_file.file_path for content_hash, db_file in existing_files.items()}
+    files_in, redundant_objects = [], []
+    for original_filename, content_type, object_name, content_hash, _ in stored:
+        file_path = canonical_paths.setdefault(content_hash, object_name)
+        if file_path != object_name:
+            redundant_objects.append(object_name)
+        files_in.append(schemas.file.UploadedFileCreate(
+            filename=object_name,
+            original_filename=original_filename,
+            content_type=content_type,
+            file_path=file_path,
+            content_hash=content_hash
+        ))
+    await asyncio.gather(*(file_handler.remove_file_from_storage(name) for name in redundant_objects))
+
+    reuse_keys = [(file_in.content_hash, file_in.content_type) for file_in in files_in]
+    reusable_jobs = crud.job.get_reusable_jobs(db, reuse_keys, pipeline_version=settings.PIPELINE_VERSION)
+    batch_id = str(uuid.uuid4())
+    jobs = crud.job.create_batch(db, files_in, [reusable_jobs.get(key) for key in reuse_keys], batch_id, priority, tenant_id, profile)
+
+    job_queue.enqueue_jobs([job["job_id"] for job in jobs if job["status"] == schemas.job.JobStatus.PENDING])
+
+    return schemas.job.BatchUploadResponse(
+        batch_id=batch_id,
+        jobs=[
+            schemas.job.BatchJobSummary(original_filename=file_in.original_filename, **job)
+            for file_in, job in zip(files_in, jobs)
+        ]
+    )
+
+@router.get("/batches/{batch_id}", response_model=schemas.job.BatchStatusResponse)
+def read_batch(
+    batch_id: str,
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Status of every job created by a batch upload, with counts per status.
+    """
+    rows = crud.job.get_batch_jobs(db, batch_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    jobs = [
+        schemas.job.BatchJobSummary(
+            job_id=job_id, uploaded_file_id=uploaded_file_id, status=status,
+            reused_from_job_id=reused_from_job_id, original_filename=original_filename
+        )
+        for job_id, uploaded_file_id, status, reused_from_job_id, original_filename in rows
+    ]
+    return schemas.job.BatchStatusResponse(
+        batch_id=batch_id, total=len(jobs), status_counts=Counter(job.status for job in jobs), jobs=jobs
+    )
 
 @router.get("/jobs/{job_id}", response_model=schemas.job.JobSchema)
 def read_job(
     job_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(db_session.get_db)
 ) -> Any:
     """
     Retrieve job status and results.
+    Supports If-None-Match: an unchanged job answers 304 without loading its results.
     """
-    db_job = crud.job.get_job(db, job_id=job_id)
-    if db_job is None:
+    db_job = _get_job_or_404(db, job_id)
+    etag = _etag(db_job)
+    not_modified = _not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    body = job_results.get_cached_response(db_job, "job") or job_results.load_stored_response(db_job, "job")
+    if body is None:
+        # Validated once per job version; finished jobs are then served from the cached bytes
+        job_data = schemas.job.JobSchema.from_orm(db_job).dict()
+        body = job_results.encode_response(db_job, ("job",), job_data)
+    return _json_response(body, etag)
+
+@router.get("/jobs/{job_id}/status", response_model=schemas.job.JobStatusResponse)
+def read_job_status(
+    job_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Lightweight status for polling: no results are loaded or sent.
+    """
+    db_job = _get_job_or_404(db, job_id)
+    not_modified = _not_modified(request, response, _etag(db_job, "status"))
+    if not_modified:
+        return not_modified
+    return schemas.job.JobStatusResponse(
+        job_id=db_job.id, status=db_job.status, version=db_job.version, updated_at=db_job.updated_at
+    )
+
+def _read_status_event(job_id: int) -> Optional[Dict[str, Any]]:
+    """The job's current status as an event, read with a short-lived session (streams must not hold a connection)."""
+    db = db_session.SessionLocal()
+    try:
+        db_job = crud.job.get_job(db, job_id=job_id, with_results=False)
+        if db_job is None:
+            return None
+        return {"job_id": db_job.id, "type": events.EVENT_STATUS, "status": db_job.status.value, "version": db_job.version}
+    finally:
+        db.close()
+
+def _sse_message(event: Dict[str, Any]) -> bytes:
+    return b"event: " + event["type"].encode() + b"\ndata: " + job_results.encode_json(event) + b"\n\n"
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: int, request: Request) -> Any:
+    """
+    Server-sent events for a job, instead of polling: the current status first, then status changes,
+    per-stage completion ("stage") and row progress ("progress") as they happen. The stream ends
+    once the job is COMPLETED or FAILED; fetch the results with GET /jobs/{job_id} then.
+    """
+    # Subscribe before reading the status, so a change in between is not missed
+    subscription = events.get_event_broker().subscribe(job_id)
+    try:
+        current = await run_in_threadpool(_read_status_event, job_id)
+    except Exception:
+        subscription.close()
+        raise
+    if current is None:
+        subscription.close()
         raise HTTPException(status_code=404, detail="Job not found")
-    return db_job
 
+    async def stream() -> AsyncIterator[bytes]:
+        try:
+            version = current["version"]
+            yield _sse_message(current)
+            if current["status"] in job_results.FINAL_STATUSES:
+                return
+            while True:
+                event = await subscription.get(timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+                if event is None:
+                    if await request.is_disconnected():
+                        return
+                    # Idle: re-check the status in case an event was missed (e.g. a listener reconnect)
+                    event = await run_in_threadpool(_read_status_event, job_id)
+                    if event is None:
+                        return
+                    if event["version"] == version:
+                        yield b": keep-alive\n\n"
+                        continue
+                if event["type"] == events.EVENT_STATUS:
+                    if (event.get("version") or 0) <= version:
+                        continue # Already sent (or older than what was sent)
+                    version = event["version"]
+                yield _sse_message(event)
+                if event["type"] == events.EVENT_STATUS and event["status"] in job_results.FINAL_STATUSES:
+                    return
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _requeued_response(row: Any) -> schemas.job.JobStatusResponse:
+    job_queue.enqueue_job(row.id)
+    events.publish_status(row.id, row.status, row.version)
+    return schemas.job.JobStatusResponse(job_id=row.id, status=row.status, version=row.version)
+
+@router.post("/jobs/{job_id}/reanalyze", response_model=schemas.job.JobStatusResponse, status_code=202)
+def reanalyze_job(
+    job_id: int,
+    params: Optional[schemas.job.AnalysisParameters] = None,
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Re-runs only the analysis stage of a finished job, with new analyzer parameters, from the
+    checkpointed cleaning output (the file is not extracted again). The current results stay
+    readable until the new ones replace them; follow progress with GET /jobs/{job_id}/events.
+    """
+    db_job = _get_job_or_404(db, job_id)
+    if db_job.status not in job_results.FINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is {db_job.status.value}; wait for it to finish")
+    if not checkpoints.can_resume(db, [db_job.id, db_job.reused_from_job_id], "cleaning"):
+        raise HTTPException(status_code=409, detail="No cleaning checkpoint for this job and pipeline version")
+    analysis_params = params.dict(exclude_defaults=True) if params else {}
+    row = crud.job.requeue_job(db, job_id, job_results.FINAL_STATUSES, analysis_params=analysis_params or None)
+    if row is None:
+        raise HTTPException(status_code=409, detail="Job was requeued or started concurrently")
+    return _requeued_response(row)
+
+@router.post("/jobs/{job_id}/retry", response_model=schemas.job.JobStatusResponse, status_code=202)
+def retry_job(
+    job_id: int,
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Re-queues a FAILED job. It resumes after its last checkpointed stage, e.g. only the analysis
+    runs again if analysis was the stage that failed.
+    """
+    _get_job_or_404(db, job_id)
+    row = crud.job.requeue_job(db, job_id, [schemas.job.JobStatus.FAILED])
+    if row is None:
+        raise HTTPException(status_code=409, detail="Only FAILED jobs can be retried")
+    return _requeued_response(row)
+
+def _read_object(object_name: str) -> bytes:
+    with get_storage_backend().open_stream(object_name) as f:
+        return f.read()
+
+@router.get("/jobs/{job_id}/profile")
+async def read_job_profile(
+    job_id: int,
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Downloads the profile of a job uploaded with ?profile=true: a pstats dump (cProfile) or an
+    HTML report (pyinstrument), see PROFILER.
+    """
+    db_job = await run_in_threadpool(_get_job_or_404, db, job_id, True)
+    profile_ref = (db_job.results or {}).get(profiling.PROFILE_RESULTS_KEY) if isinstance(db_job.results, dict) else None
+    if not profile_ref:
+        raise HTTPException(status_code=404, detail="No profile for this job")
+    body = await run_blocking(_read_object, profile_ref["object_name"])
+    extension = profile_ref["object_name"].rsplit(".", 1)[-1]
+    return Response(
+        content=body,
+        media_type=profile_ref["content_type"],
+        headers={"Content-Disposition": f'attachment; filename="job-{job_id}-profile.{extension}"'}
+    )
+
+@router.get("/jobs/{job_id}/results")
+async def read_job_results(
+    job_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated dotted paths, e.g. analysis.table_analysis"),
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Retrieve a job's results, optionally projected to the given fields.
+    Without fields, offloaded stages are returned as artifact references; with fields, the
+    selected parts of offloaded stages are loaded.
+    """
+    db_job = await run_in_threadpool(_get_job_or_404, db, job_id)
+    paths = job_results.parse_fields(fields)
+    variant = ("results", tuple(map(tuple, paths)))
+    etag = _etag(db_job, *variant)
+    not_modified = _not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    body = job_results.get_cached_response(db_job, *variant)
+    if body is None:
+        body = await run_in_threadpool(job_results.load_stored_response, db_job, *variant)
+    if body is None:
+        results = await run_in_threadpool(_load_results, db_job)
+        value = await job_results.project_results(results, paths) if paths else results
+        body = await run_in_threadpool(job_results.encode_response, db_job, variant, value)
+    return _json_response(body, etag)
+
+@router.get("/jobs/{job_id}/results/{stage}")
+async def read_job_stage_results(
+    job_id: int,
+    stage: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Retrieve one stage of a job's results ("extraction", "cleaning" or "analysis").
+    Stages that were offloaded to object storage are loaded on demand.
+    """
+    db_job = await run_in_threadpool(_get_job_or_404, db, job_id)
+    variant = ("stage", stage)
+    etag = _etag(db_job, *variant)
+    not_modified = _not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    body = job_results.get_cached_response(db_job, *variant)
+    if body is None:
+        body = await run_in_threadpool(job_results.load_stored_response, db_job, *variant)
+    if body is None:
+        found, value = await artifacts.resolve_stage(await run_in_threadpool(_load_results, db_job), stage)
+        if not found:
+            raise HTTPException(status_code=404, detail=f"No '{stage}' results for this job")
+        body = await run_in_threadpool(job_results.encode_response, db_job, variant, value)
+    return _json_response(body, etag)
+
+@router.get("/jobs/{job_id}/results/{stage}/tables/{table_index}/rows", response_model=schemas.job.TableRowsPage)
+async def read_job_table_rows(
+    job_id: int,
+    stage: str,
+    table_index: int,
+    request: Request,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.RESULTS_MAX_PAGE_ROWS),
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Page through the rows of an extracted or cleaned table.
+    """
+    db_job = await run_in_threadpool(_get_job_or_404, db, job_id)
+    not_modified = _not_modified(request, response, _etag(db_job, "rows", stage, table_index, offset, limit))
+    if not_modified:
+        return not_modified
+    found, stage_output = await artifacts.resolve_stage(await run_in_threadpool(_load_results, db_job), stage)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"No '{stage}' results for this job")
+    try:
+        return job_results.table_rows_page(stage_output, table_index, offset, limit)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
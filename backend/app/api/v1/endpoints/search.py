@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Any
+
+from .... import schemas # Dotted path from endpoints directory
+from .... import crud # Dotted path from endpoints directory
+from ....db import session as db_session # Dotted path from endpoints directory
+from ....core.config import settings
+
+router = APIRouter()
+
+@router.get("/", response_model=schemas.search.SearchResults)
+def search_documents(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(db_session.get_db)
+) -> Any:
+    """
+    Full-text search over the text of completed jobs, best matches first, with highlighted snippets.
+    On Postgres, q supports web search syntax ("quoted phrase", or, -excluded).
+    """
+    rows = crud.search.search_documents(db, q, limit + 1, offset) # One extra row tells whether there is a next page
+    return schemas.search.SearchResults(
+        query=q, offset=offset, limit=limit, has_more=len(rows) > limit,
+        hits=[schemas.search.SearchHit(**row) for row in rows[:limit]]
+    )
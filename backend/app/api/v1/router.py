@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from ....app.api.v1.endpoints import jobs # Dotted path from v1 directory
+from .endpoints import jobs, search # Dotted path from v1 directory
 
 api_router = APIRouter()
 api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
 # The prefix /jobs was already in jobs.py, so we use it here for consistency
 # Or, we can remove prefix from jobs.router and define it here as /jobs or /files for upload
 # For now, let's assume /api/v1/jobs/uploadfile/ and /api/v1/jobs/jobs/{job_id}
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from pydantic import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,7 +11,12 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "password"
     POSTGRES_DB: str = "app"
-    SQLALCHEMY_DATABASE_URI: str | None = None
+    SQLALCHEMY_DATABASE_URI: str | None = None # Overrides the POSTGRES_* settings when set
+    DB_POOL_SIZE: int = 10 # Per process; size it against Postgres max_connections x processes
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30 # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800 # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True # Detects connections dropped by the server/network before use
 
     # MinIO
     MINIO_ENDPOINT: str = "localhost:9000"
@@ -18,13 +25,169 @@ class Settings(BaseSettings):
     MINIO_BUCKET_NAME: str = "uploads"
     MINIO_USE_SSL: bool = False
 
+    # Storage
+    STORAGE_BACKEND: str = "minio" # minio | local (files under LOCAL_STORAGE_ROOT, for tests/local dev)
+    LOCAL_STORAGE_ROOT: str = "./storage"
+    STORAGE_MAX_WORKERS: int = 16 # Threads that run blocking storage calls off the event loop
+    STORAGE_HTTP_POOL_SIZE: int = 32 # Keep >= STORAGE_MAX_WORKERS (MinIO also uploads parts in parallel)
+    STORAGE_HTTP_TIMEOUT: int = 300 # Read timeout in seconds
+    STORAGE_HTTP_RETRIES: int = 3
+    STORAGE_RANGE_READ_SIZE: int = 1024 * 1024 # Bytes fetched per ranged read for seekable access
+
+    # Job result artifacts
+    RESULTS_OFFLOAD_THRESHOLD_BYTES: int = 256 * 1024 # Stage outputs this large go to object storage; -1 keeps everything inline
+    ARTIFACT_COMPRESSION_LEVEL: int = 3 # zstd level (gzip fallback is capped at 9)
+    ARTIFACT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024 # Decoded artifacts kept in memory by the API for paging
+    RESULTS_MAX_PAGE_ROWS: int = 1000 # Upper bound for the table rows endpoint's limit
+    RESULTS_RESPONSE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024 # Serialized responses of finished jobs kept by the API
+    RESULTS_RESPONSE_STORE_MIN_BYTES: int = 256 * 1024 # Ones this large are also kept in object storage; -1 never
+
+    # Bump whenever agent output changes; uploads with identical content only reuse
+    # results produced by the same pipeline version
+    PIPELINE_VERSION: str = "4"
+
+    # Uploads
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024 # Multipart part size when streaming to object storage (min 5 MiB)
+    MAX_UPLOAD_SIZE_BYTES: int = 5 * 1024 * 1024 * 1024 # Uploads above this are rejected with 413
+    BATCH_MAX_FILES: int = 10000 # Files per batch upload (archive members included)
+    BATCH_UPLOAD_CONCURRENCY: int = 16 # Concurrent storage uploads per batch
+
+    # Extraction
+    # Files at or above this size are extracted in streaming mode: table rows are
+    # yielded in chunks through the cleaner and analyzer instead of being held in memory.
+    STREAMING_EXTRACTION_THRESHOLD_BYTES: int = 50 * 1024 * 1024
+    CSV_STREAM_CHUNK_ROWS: int = 5000
+    EXTRACTION_SPILL_DIR: str = "/tmp/universal_data_extractor" # Only used by parsers that need a local file
+    # PDFs are extracted page by page on a process pool (ai_agents/pdf_extractor.py)
+    PDF_PROCESS_POOL_SIZE: int = 4 # 0 or 1 = pages are extracted in the pipeline process
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_MAX_PAGES: int = 0 # Pages extracted per document (0 = all)
+    PDF_EXTRACT_TABLES: bool = True
+    PDF_OCR: bool = True # OCR pages without a text layer (needs pytesseract and the tesseract binary)
+    PDF_OCR_MIN_CHARS: int = 16 # Pages with less text than this count as having no text layer
+    PDF_OCR_DPI: int = 200
+    PDF_OCR_LANGUAGE: str = "eng"
+
+    # Cleaning
+    CLEANER_SAMPLE_SIZE: int = 200 # Values sampled per column to detect its kind
+    # Columns whose sampled distinct-value ratio is at or below this are memoized
+    CLEANER_MEMO_MAX_DISTINCT_RATIO: float = 0.5
+    CLEANER_MEMO_SIZE: int = 4096 # Max cached values per column (LRU)
+
+    # Analysis
+    # Numeric quantiles (median/p90/p99) are exact up to this many values per column, then sketched
+    ANALYZER_QUANTILE_SKETCH_SIZE: int = 2048
+    # Distinct text values tracked per column for top-value frequencies
+    ANALYZER_TOP_VALUES_CAPACITY: int = 1000
+    # Score text keywords by TF-IDF against a document-frequency index of past jobs, adding each
+    # analyzed job's text to it; off, keywords rank by frequency (stop words excluded either way)
+    KEYWORDS_TFIDF: bool = True
+    KEYWORDS_CANDIDATE_TERMS: int = 1000 # Most frequent terms of a document scored by TF-IDF
+    KEYWORDS_INDEX_MAX_TERMS: int = 5000 # Most frequent terms of a document added to the index
+    # Extractive text summaries (ai_agents/summarizer.py)
+    SUMMARY_MAX_SENTENCES: int = 5
+    SUMMARY_MAX_CHARS: int = 1500 # Whole sentences only, up to this length
+    SUMMARY_TIME_BUDGET_SECONDS: float = 10.0 # Text not scored by then is left out of the summary
+    SUMMARY_CHUNK_CHARS: int = 200_000 # Text scored per task
+    # > 1 scores chunks of large texts in a process pool of this size (ignored in daemonic processes,
+    # e.g. Celery prefork children); 0 scores them in the analyzer's process
+    SUMMARY_PROCESS_POOL_SIZE: int = 2
+
+    # Full-text search (GET /search/): Postgres tsvector + GIN index, or SQLite FTS5 locally
+    SEARCH_INDEX: bool = True # Index the text of each completed job
+    SEARCH_INDEX_MAX_CHARS: int = 200_000 # Text indexed per job (a Postgres tsvector is limited to 1 MB)
+    SEARCH_MAX_PAGE_SIZE: int = 100
+
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # For tests, CELERY_BROKER_URL="memory://" (or "sqla+sqlite:///celery.db") with
+    # CELERY_TASK_ALWAYS_EAGER=True runs jobs without Redis
+    CELERY_TASK_ALWAYS_EAGER: bool = False
+    CELERY_WORKER_POOL: str = "prefork" # prefork | threads | solo
+    CELERY_WORKER_CONCURRENCY: int = 2
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = 1 # Jobs are long-running; don't let one worker reserve many
+    CELERY_TASK_TIME_LIMIT: int = 1800 # Seconds; hard limit, enforced by the prefork pool
+    CELERY_TASK_SOFT_TIME_LIMIT: int = 1500
+
+    # Job queue
+    # "celery": jobs are published to the Celery broker (priority/tenant are ignored). "database": jobs
+    # are claimed from the jobs table by workers/db_worker.py (priorities, per-tenant fairness, leases);
+    # switching needs db_worker processes instead of Celery workers.
+    JOB_QUEUE_BACKEND: str = "celery"
+    JOB_PRIORITY_INTERACTIVE: int = 10 # Single uploads; higher priorities are claimed first
+    JOB_PRIORITY_BATCH: int = 0 # Batch uploads
+    JOB_LEASE_SECONDS: int = 300 # Renewed by the worker's heartbeat; an expired lease is re-queued
+    JOB_QUEUE_MAX_ATTEMPTS: int = 3 # Claims per job before an expired lease fails it instead
+    JOB_QUEUE_RETRY_DELAY_SECONDS: int = 30
+    JOB_QUEUE_POLL_INTERVAL: float = 1.0 # Seconds an idle worker slot waits before claiming again
+    JOB_QUEUE_CLAIM_WINDOW: int = 32 # Jobs per tenant (by priority, then age) considered for each claim
+    DB_WORKER_CONCURRENCY: int = 2
+
+    # Job progress events (GET /jobs/{job_id}/events)
+    # "postgres" fans events out across processes with NOTIFY/LISTEN; "database" through a job_events
+    # table that subscribers poll (any database); "memory" only reaches subscribers in the publishing
+    # process. "auto": postgres on Postgres, memory when the pipeline runs in the API process (eager
+    # Celery), database otherwise.
+    EVENTS_BACKEND: str = "auto"
+    EVENTS_POLL_INTERVAL: float = 0.5 # Seconds between job_events polls (EVENTS_BACKEND=database)
+    EVENTS_RETENTION_SECONDS: int = 3600 # job_events rows older than this are pruned
+    EVENTS_PROGRESS_INTERVAL: float = 1.0 # Seconds between row progress events per stage
+    EVENTS_SUBSCRIBER_QUEUE_SIZE: int = 256 # Events buffered per client; the oldest are dropped first
+    EVENTS_KEEPALIVE_SECONDS: int = 15 # Idle streams get a keep-alive (and a status re-check) this often
+
+    # Agent pipeline process pool
+    # 0 runs the agents inside the worker process (fine for the prefork pool). With the threads/solo
+    # pools, set it to the number of cores so CPU-bound stages run in separate processes.
+    PIPELINE_PROCESS_POOL_SIZE: int = 0
+    PIPELINE_MAX_TASKS_PER_CHILD: int = 50 # Recycle pool processes to release memory
+    PIPELINE_STAGE_TIME_LIMIT: int = 1500 # Seconds allowed for the agent pipeline in the process pool
+    # Persist each stage's output so retries and POST /jobs/{job_id}/reanalyze resume after the
+    # last completed stage (outputs of RESULTS_OFFLOAD_THRESHOLD_BYTES or more go to object storage)
+    PIPELINE_CHECKPOINTS: bool = True
 
     # OpenAI API Key
     OPENAI_API_KEY: str = "your_openai_api_key_here"
 
+    # LLM gateway (services/llm_gateway.py): shared by all LLM calls of a process
+    LLM_BASE_URL: str = "https://api.openai.com/v1" # Any OpenAI-compatible API, e.g. benchmarks/mock_llm_server.py
+    LLM_MODEL: str = "gpt-4o-mini"
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONCURRENCY: int = 8 # Requests in flight per process
+    LLM_MAX_IN_FLIGHT_TOKENS: int = 100_000 # Estimated prompt + output tokens in flight per process (0 = unlimited)
+    LLM_REQUESTS_PER_MINUTE: int = 500 # Token-bucket limits per process (0 = unlimited)
+    LLM_TOKENS_PER_MINUTE: int = 200_000
+    LLM_MAX_OUTPUT_TOKENS: int = 512
+    LLM_CHARS_PER_TOKEN: float = 4.0 # Estimate used for rate limiting and batching
+    LLM_MAX_RETRIES: int = 4 # For 408/409/429/5xx answers, timeouts and connection errors
+    LLM_RETRY_BASE_DELAY: float = 0.5 # Exponential backoff with full jitter (Retry-After wins when sent)
+    LLM_RETRY_MAX_DELAY: float = 20.0
+    LLM_BATCH_MAX_ITEMS: int = 16 # Small inputs packed into one request by complete_many()
+    LLM_BATCH_MAX_TOKENS: int = 3000
+    LLM_CACHE: bool = True # Persist responses (llm_responses table) and answer repeated requests from it
+    LLM_CACHE_TTL_SECONDS: int = 0 # 0 = cached responses never expire
+    PROMPTS_DIR: str = str(Path(__file__).resolve().parents[3] / "prompts") # Prompt templates (<name>.md)
+
+    # LLM analysis (ai_agents/map_reduce.py): text split into token-sized chunks, prompted
+    # concurrently (map), then partial summaries combined level by level (reduce)
+    LLM_SUMMARIES: bool = False # Abstractive summaries (the extractive summary remains the fallback)
+    LLM_KEY_FIELDS: bool = False # Key fields found in the text, added to those extracted from the file
+    LLM_CHUNK_TOKENS: int = 3000
+    LLM_CHUNK_OVERLAP_TOKENS: int = 150 # Context repeated from the previous chunk (at most a quarter of a chunk)
+    LLM_MAX_CHUNKS: int = 200 # Text beyond this many chunks is not sent
+    LLM_REDUCE_GROUP_TOKENS: int = 3000 # Partial summaries combined per reduce call
+    LLM_PARTIAL_SUMMARY_CHARS: int = 800 # Length of chunk and intermediate summaries
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+
+    # Metrics and profiling
+    # GET /metrics serves Prometheus metrics; set PROMETHEUS_MULTIPROC_DIR (environment) to a shared
+    # directory to aggregate worker and pipeline pool processes there too.
+    METRICS_TRACEMALLOC: bool = False # Trace Python allocations per stage (slow; for debugging memory)
+    METRICS_WORKER_PORT: int = 0 # workers/db_worker.py serves its own metrics on this port; 0 = off
+    PROFILER: str = "cprofile" # Used for uploads with ?profile=true: cprofile | pyinstrument (if installed)
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -37,7 +37,7 @@ def setup_logging():
     config = LogConfig()
     dictConfig(config.dict())
     logger = logging.getLogger(config.LOGGER_NAME)
-    logger.info(f"Logger 	ható{config.LOGGER_NAME}" configured with level {config.LOG_LEVEL}")
+    logger.info(f"Logger '{config.LOGGER_NAME}' configured with level {config.LOG_LEVEL}")
     return logger
 
 # Initialize logger instance for use in other modules
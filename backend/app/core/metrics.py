@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple
+import os
+import time
+import tracemalloc
+
+from sqlalchemy import event
+
+from .config import settings
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError: # Optional: without it, metrics are not recorded and /metrics answers 503
+    prometheus_client = None
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+# Prometheus metrics for the pipeline stages, storage, database and job queue, served by GET /metrics.
+# API, worker and pipeline pool processes each record their own metrics: set the PROMETHEUS_MULTIPROC_DIR
+# environment variable (a shared, empty directory) so the API's /metrics aggregates all processes on
+# the host, or give workers/db_worker.py its own endpoint with METRICS_WORKER_PORT.
+
+class _NoopMetric:
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+def _histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = ()) -> Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    if buckets:
+        return prometheus_client.Histogram(name, documentation, labelnames, buckets=buckets)
+    return prometheus_client.Histogram(name, documentation, labelnames)
+
+def _counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+_BYTES_BUCKETS = tuple(float(1024 * 1024 * 4 ** i) for i in range(8)) # 1 MiB .. 16 GiB
+
+STAGE_SECONDS = _histogram("udea_pipeline_stage_seconds", "Wall time of a pipeline stage", ("stage",), _SECONDS_BUCKETS)
+STAGE_CPU_SECONDS = _histogram("udea_pipeline_stage_cpu_seconds", "CPU time of a pipeline stage (its thread)", ("stage",), _SECONDS_BUCKETS)
+STAGE_PEAK_RSS_BYTES = _histogram(
+    "udea_pipeline_stage_peak_rss_bytes", "Process peak RSS when a pipeline stage finished", ("stage",), _BYTES_BUCKETS
+)
+STAGE_PEAK_TRACED_BYTES = _histogram(
+    "udea_pipeline_stage_peak_traced_bytes", "Peak Python allocations during a stage (METRICS_TRACEMALLOC)", ("stage",), _BYTES_BUCKETS
+)
+STAGE_ROWS = _counter("udea_pipeline_stage_rows", "Table rows processed by a pipeline stage", ("stage",))
+STAGE_CELLS = _counter("udea_pipeline_stage_cells", "Table cells processed by a pipeline stage", ("stage",))
+JOB_SECONDS = _histogram("udea_job_seconds", "Processing time of a job, claim to finish", ("status",), _SECONDS_BUCKETS)
+JOB_QUEUE_WAIT_SECONDS = _histogram("udea_job_queue_wait_seconds", "Time a job waited in the queue before a worker claimed it", (), _SECONDS_BUCKETS)
+STORAGE_SECONDS = _histogram("udea_storage_operation_seconds", "Duration of a storage call", ("operation",))
+STORAGE_BYTES = _counter("udea_storage_bytes", "Bytes transferred to and from object storage", ("direction",))
+DB_QUERY_SECONDS = _histogram("udea_db_query_seconds", "Duration of a database statement", ("statement",))
+LLM_REQUESTS = _counter("udea_llm_requests", "LLM completions by outcome (cached, coalesced, ok, retry, error)", ("template", "outcome"))
+LLM_REQUEST_SECONDS = _histogram("udea_llm_request_seconds", "Duration of an LLM API request", ("model",), _SECONDS_BUCKETS)
+LLM_TOKENS = _counter("udea_llm_tokens", "Tokens used by LLM API requests", ("model", "kind"))
+
+def peak_rss_bytes() -> int:
+    """The process's peak resident set size so far (0 if unknown)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024 # Linux reports KiB
+
+@contextmanager
+def measure_stage(stage: str) -> Iterator[Dict[str, int]]:
+    """
+    Records wall time, CPU time and peak memory of a pipeline stage. The caller sets "rows" and
+    "cells" in the yielded dict. With METRICS_TRACEMALLOC, Python allocations are traced too
+    (slow; concurrent stages in one process share the peak).
+    """
+    counts = {"rows": 0, "cells": 0}
+    if settings.METRICS_TRACEMALLOC:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield counts
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+        STAGE_CPU_SECONDS.labels(stage).observe(time.thread_time() - cpu_started)
+        STAGE_PEAK_RSS_BYTES.labels(stage).observe(peak_rss_bytes())
+        if settings.METRICS_TRACEMALLOC:
+            STAGE_PEAK_TRACED_BYTES.labels(stage).observe(tracemalloc.get_traced_memory()[1])
+        STAGE_ROWS.labels(stage).inc(counts["rows"])
+        STAGE_CELLS.labels(stage).inc(counts["cells"])
+
+@contextmanager
+def measure_storage(operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STORAGE_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+def instrument_engine(engine: Any) -> None:
+    """Times every statement run on engine, labelled by its first keyword (SELECT, UPDATE, ...)."""
+    if prometheus_client is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER").observe(
+            time.perf_counter() - started
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            started = context.connection.info.get("query_started")
+            if started:
+                started.pop()
+
+def render() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, aggregated over processes in multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+def start_http_server(port: int) -> None:
+    """Serves this process's metrics on its own port (for worker processes)."""
+    if prometheus_client is not None:
+        prometheus_client.start_http_server(port)
@@ -0,0 +1 @@
+from . import checkpoint, file, job, keyword, llm_response, search
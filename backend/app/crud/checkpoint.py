@@ -0,0 +1,84 @@
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Optional, Set
+from ..db import models
+
+def get_checkpoints(db: Session, job_ids: Iterable[Optional[int]], pipeline_version: str) -> Dict[str, models.JobCheckpoint]:
+    """
+    Checkpoints per stage for the given pipeline version. job_ids are in order of preference
+    (e.g. the job itself, then the job it reused results from); None entries are ignored.
+    """
+    job_ids = [job_id for job_id in job_ids if job_id is not None]
+    if not job_ids:
+        return {}
+    rank = {job_id: i for i, job_id in reversed(list(enumerate(job_ids)))}
+    rows = db.query(models.JobCheckpoint).filter(
+        models.JobCheckpoint.job_id.in_(job_ids),
+        models.JobCheckpoint.pipeline_version == pipeline_version
+    ).all()
+    found: Dict[str, models.JobCheckpoint] = {}
+    for row in sorted(rows, key=lambda row: rank[row.job_id]):
+        found.setdefault(row.stage, row)
+    return found
+
+def get_checkpoint(db: Session, job_id: int, stage: str, pipeline_version: str) -> Optional[models.JobCheckpoint]:
+    return db.query(models.JobCheckpoint).filter(
+        models.JobCheckpoint.job_id == job_id,
+        models.JobCheckpoint.stage == stage,
+        models.JobCheckpoint.pipeline_version == pipeline_version
+    ).first()
+
+def save_checkpoint(
+    db: Session,
+    job_id: int,
+    stage: str,
+    pipeline_version: str,
+    value: Any = None,
+    artifact_ref: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> models.JobCheckpoint:
+    """Replaces the job's checkpoint for stage (and pipeline_version) in one transaction."""
+    delete_checkpoints(db, job_id, [stage], pipeline_version=pipeline_version, commit=False)
+    db_checkpoint = models.JobCheckpoint(
+        job_id=job_id, stage=stage, pipeline_version=pipeline_version, value=value, artifact_ref=artifact_ref,
+        artifact_object=artifact_ref["object_name"] if artifact_ref else None, params=params
+    )
+    db.add(db_checkpoint)
+    db.commit()
+    return db_checkpoint
+
+def delete_checkpoints(
+    db: Session,
+    job_id: int,
+    stages: Iterable[str],
+    pipeline_version: Optional[str] = None,
+    commit: bool = True
+) -> int:
+    stmt = delete(models.JobCheckpoint).where(
+        models.JobCheckpoint.job_id == job_id, models.JobCheckpoint.stage.in_(list(stages))
+    )
+    if pipeline_version is not None:
+        stmt = stmt.where(models.JobCheckpoint.pipeline_version == pipeline_version)
+    deleted = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    if commit:
+        db.commit()
+    return deleted
+
+def delete_job_checkpoints(db: Session, job_id: int, commit: bool = True) -> Set[str]:
+    """Deletes all checkpoints of a job (of every pipeline version); returns the artifacts they referred to."""
+    objects = db.execute(
+        delete(models.JobCheckpoint)
+        .where(models.JobCheckpoint.job_id == job_id)
+        .returning(models.JobCheckpoint.artifact_object)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if commit:
+        db.commit()
+    return {object_name for object_name in objects if object_name is not None}
+
+def is_artifact_referenced(db: Session, object_name: str) -> bool:
+    """Whether any job's results or checkpoint still refers to the artifact object_name."""
+    for column in (models.JobArtifact.object_name, models.JobCheckpoint.artifact_object):
+        if db.execute(select(column).where(column == object_name).limit(1)).first() is not None:
+            return True
+    return False
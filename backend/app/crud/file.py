@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from typing import Dict, Iterable
 from ..db import models
 from ..schemas import file as file_schema # Renamed to avoid conflict
 
@@ -6,12 +7,28 @@ from ..schemas import file as file_schema # Renamed to avoid conflict
 def get_uploaded_file(db: Session, file_id: int):
     return db.query(models.UploadedFile).filter(models.UploadedFile.id == file_id).first()
 
+def get_uploaded_file_by_hash(db: Session, content_hash: str):
+    return db.query(models.UploadedFile).filter(models.UploadedFile.content_hash == content_hash).order_by(models.UploadedFile.id).first()
+
+def get_uploaded_files_by_hashes(db: Session, content_hashes: Iterable[str]) -> Dict[str, models.UploadedFile]:
+    """First stored file per content hash, for the hashes that are already known."""
+    found: Dict[str, models.UploadedFile] = {}
+    query = (
+        db.query(models.UploadedFile)
+        .filter(models.UploadedFile.content_hash.in_(set(content_hashes)))
+        .order_by(models.UploadedFile.id)
+    )
+    for db_file in query:
+        found.setdefault(db_file.content_hash, db_file)
+    return found
+
 def create_uploaded_file(db: Session, file_in: file_schema.UploadedFileCreate):
     db_file = models.UploadedFile(
         filename=file_in.filename,
         original_filename=file_in.original_filename,
         content_type=file_in.content_type,
-        file_path=file_in.file_path
+        file_path=file_in.file_path,
+        content_hash=file_in.content_hash
     )
     db.add(db_file)
     db.commit()
@@ -1,22 +1,271 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert, literal, update, select, or_, true
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.sql import func
 from ..db import models
 from ..schemas import job as job_schema # Renamed to avoid conflict
+from ..schemas import file as file_schema
 from ..db.models import JobStatus
-from typing import Any
+from ..core.config import settings
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
-def get_job(db: Session, job_id: int):
-    return db.query(models.Job).filter(models.Job.id == job_id).first()
+def get_job(db: Session, job_id: int, with_results: bool = True):
+    """with_results=False leaves the (possibly large) results column unloaded until it is accessed."""
+    query = db.query(models.Job)
+    if not with_results:
+        query = query.options(defer(models.Job.results))
+    return query.filter(models.Job.id == job_id).first()
+
+def get_result_artifacts(db: Session, job_id: int) -> Set[str]:
+    """Object names of the artifacts the job's Job.results refers to (without loading the results)."""
+    return set(db.scalars(select(models.JobArtifact.object_name).where(models.JobArtifact.job_id == job_id)).all())
+
+def _set_result_artifacts(db: Session, job_id: int, object_names: Iterable[str]) -> None:
+    db.execute(delete(models.JobArtifact).where(models.JobArtifact.job_id == job_id))
+    object_names = set(object_names)
+    if object_names:
+        db.execute(insert(models.JobArtifact), [{"job_id": job_id, "object_name": name} for name in object_names])
+
+def _copy_result_artifacts(db: Session, source_job_id: int, job_id: int) -> None:
+    db.execute(
+        insert(models.JobArtifact).from_select(
+            ["job_id", "object_name"],
+            select(literal(job_id), models.JobArtifact.object_name).where(models.JobArtifact.job_id == source_job_id)
+        )
+    )
 
 def create_job(db: Session, job_in: job_schema.JobCreate):
     db_job = models.Job(
         uploaded_file_id=job_in.uploaded_file_id,
-        status=JobStatus.PENDING
+        status=JobStatus.PENDING,
+        pipeline_version=settings.PIPELINE_VERSION,
+        batch_id=job_in.batch_id,
+        priority=settings.JOB_PRIORITY_INTERACTIVE if job_in.priority is None else job_in.priority,
+        tenant_id=job_in.tenant_id or "default",
+        profile=job_in.profile
     )
     db.add(db_job)
     db.commit()
     db.refresh(db_job)
     return db_job
 
+def get_reusable_job(db: Session, content_hash: str, content_type: Optional[str], pipeline_version: str):
+    """
+    Latest completed job for identical file content uploaded with the same content type (which
+    decides how it is extracted) and processed by the same pipeline version.
+    """
+    return (
+        db.query(models.Job)
+        .join(models.UploadedFile, models.Job.uploaded_file_id == models.UploadedFile.id)
+        .filter(
+            models.UploadedFile.content_hash == content_hash,
+            models.UploadedFile.content_type == content_type,
+            models.Job.pipeline_version == pipeline_version,
+            models.Job.status == JobStatus.COMPLETED
+        )
+        .order_by(models.Job.id.desc())
+        .first()
+    )
+
+def get_reusable_jobs(
+    db: Session, keys: Iterable[Tuple[str, Optional[str]]], pipeline_version: str
+) -> Dict[Tuple[str, Optional[str]], models.Job]:
+    """
+    get_reusable_job() for many (content hash, content type) keys in one query: latest completed
+    job per key.
+    """
+    keys = set(keys)
+    found: Dict[Tuple[str, Optional[str]], models.Job] = {}
+    query = (
+        db.query(models.Job, models.UploadedFile.content_hash, models.UploadedFile.content_type)
+        .join(models.UploadedFile, models.Job.uploaded_file_id == models.UploadedFile.id)
+        .filter(
+            models.UploadedFile.content_hash.in_({content_hash for content_hash, _ in keys}),
+            models.Job.pipeline_version == pipeline_version,
+            models.Job.status == JobStatus.COMPLETED
+        )
+        .order_by(models.Job.id.desc())
+    )
+    for db_job, content_hash, content_type in query:
+        if (content_hash, content_type) in keys:
+            found.setdefault((content_hash, content_type), db_job)
+    return found
+
+def create_batch(
+    db: Session,
+    files_in: List[file_schema.UploadedFileCreate],
+    reuse_sources: List[Optional[models.Job]],
+    batch_id: str,
+    priority: Optional[int] = None,
+    tenant_id: Optional[str] = None,
+    profile: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Inserts the uploaded files and their jobs with multi-row INSERT ... RETURNING statements and
+    commits once. Files with a reuse source get an already completed job sharing its results;
+    the others get a PENDING job.
+    Returns one dict per file, in input order, with job_id, uploaded_file_id, status and reused_from_job_id.
+    """
+    file_ids = db.scalars(
+        insert(models.UploadedFile).returning(models.UploadedFile.id, sort_by_parameter_order=True),
+        [file_in.dict() for file_in in files_in]
+    ).all()
+
+    priority = settings.JOB_PRIORITY_BATCH if priority is None else priority
+    tenant_id = tenant_id or "default"
+    pending = [i for i, source in enumerate(reuse_sources) if source is None]
+    reused = [i for i, source in enumerate(reuse_sources) if source is not None]
+    jobs: List[Dict[str, Any]] = [{} for _ in files_in]
+    if pending:
+        job_ids = db.scalars(
+            insert(models.Job).returning(models.Job.id, sort_by_parameter_order=True),
+            [
+                {"uploaded_file_id": file_ids[i], "status": JobStatus.PENDING, "pipeline_version": settings.PIPELINE_VERSION,
+                 "batch_id": batch_id, "version": 1, "priority": priority, "tenant_id": tenant_id, "profile": profile}
+                for i in pending
+            ]
+        ).all()
+        for i, job_id in zip(pending, job_ids):
+            jobs[i] = {"job_id": job_id, "uploaded_file_id": file_ids[i], "status": JobStatus.PENDING, "reused_from_job_id": None}
+    if reused:
+        job_ids = db.scalars(
+            insert(models.Job).returning(models.Job.id, sort_by_parameter_order=True),
+            [
+                {"uploaded_file_id": file_ids[i], "status": JobStatus.COMPLETED, "pipeline_version": reuse_sources[i].pipeline_version,
+                 "results": reuse_sources[i].results, "reused_from_job_id": reuse_sources[i].reused_from_job_id or reuse_sources[i].id,
+                 "batch_id": batch_id, "version": 1, "priority": priority, "tenant_id": tenant_id, "profile": False}
+                for i in reused
+            ]
+        ).all()
+        for i, job_id in zip(reused, job_ids):
+            source = reuse_sources[i]
+            _copy_result_artifacts(db, source.id, job_id)
+            jobs[i] = {"job_id": job_id, "uploaded_file_id": file_ids[i], "status": JobStatus.COMPLETED,
+                       "reused_from_job_id": source.reused_from_job_id or source.id}
+    db.commit()
+    return jobs
+
+def get_batch_jobs(db: Session, batch_id: str):
+    """(job id, uploaded file id, status, reused_from_job_id, original filename) rows of a batch; results are not loaded."""
+    return (
+        db.query(
+            models.Job.id, models.Job.uploaded_file_id, models.Job.status, models.Job.reused_from_job_id,
+            models.UploadedFile.original_filename
+        )
+        .join(models.UploadedFile, models.Job.uploaded_file_id == models.UploadedFile.id)
+        .filter(models.Job.batch_id == batch_id)
+        .order_by(models.Job.id)
+        .all()
+    )
+
+def create_reused_job(db: Session, job_in: job_schema.JobCreate, source_job: models.Job):
+    """Creates an already completed job that shares the results of source_job."""
+    db_job = models.Job(
+        uploaded_file_id=job_in.uploaded_file_id,
+        status=JobStatus.COMPLETED,
+        pipeline_version=source_job.pipeline_version,
+        results=source_job.results,
+        reused_from_job_id=source_job.reused_from_job_id or source_job.id,
+        tenant_id=job_in.tenant_id or "default"
+    )
+    db.add(db_job)
+    db.flush()
+    _copy_result_artifacts(db, source_job.id, db_job.id)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+_UNSET: Any = object()
+_TRANSITION_COLUMNS = (
+    models.Job.id, models.Job.uploaded_file_id, models.Job.status, models.Job.version,
+    models.Job.reused_from_job_id, models.Job.analysis_params, models.Job.profile,
+    models.Job.enqueued_at, models.Job.started_at, models.Job.finished_at
+)
+
+def transition_job(
+    db: Session,
+    job_id: int,
+    status: JobStatus,
+    from_statuses: Optional[Sequence[JobStatus]] = None,
+    results: Any = _UNSET,
+    lease_owner: Optional[str] = None,
+    result_artifacts: Iterable[str] = ()
+):
+    """
+    Moves a job to status in a single UPDATE ... RETURNING, optionally writing results too
+    (result_artifacts: the artifacts they refer to; a completed job's results are marked with
+    the current PIPELINE_VERSION).
+    The update only applies while the job is in one of from_statuses (if given), so concurrent
+    workers cannot both claim or finish the same job. Sets started_at/finished_at and bumps version.
+    Returns the _TRANSITION_COLUMNS row (id, uploaded_file_id, status, version, ...), or None if the job does not exist or
+    was not in an allowed status.
+    With lease_owner, the update also requires the job's queue lease to still belong to that worker.
+    Job objects already loaded in db are not refreshed.
+    """
+    values = {"status": status, "updated_at": func.now(), "version": models.Job.version + 1}
+    if status == JobStatus.PROCESSING:
+        values["started_at"] = func.now()
+        values["finished_at"] = None
+    elif status in (JobStatus.COMPLETED, JobStatus.FAILED):
+        values["finished_at"] = func.now()
+        values["lease_owner"] = None
+        values["lease_expires_at"] = None
+    if results is not _UNSET:
+        values["results"] = results
+        if status == JobStatus.COMPLETED:
+            values["pipeline_version"] = settings.PIPELINE_VERSION
+
+    stmt = update(models.Job).where(models.Job.id == job_id)
+    if from_statuses is not None:
+        stmt = stmt.where(models.Job.status.in_(list(from_statuses)))
+    if lease_owner is not None:
+        stmt = stmt.where(models.Job.lease_owner == lease_owner)
+    stmt = (
+        stmt.values(**values)
+        .returning(*_TRANSITION_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    if row is not None and results is not _UNSET:
+        _set_result_artifacts(db, job_id, result_artifacts)
+    db.commit()
+    return row
+
+def requeue_job(
+    db: Session,
+    job_id: int,
+    from_statuses: Sequence[JobStatus] = (JobStatus.COMPLETED, JobStatus.FAILED),
+    analysis_params: Any = _UNSET
+):
+    """
+    Puts a finished job back in the queue (PENDING, fresh attempts and no retry delay) in one
+    UPDATE ... RETURNING, optionally with new analyzer parameters. Its results stay readable (and
+    resumable, see services/checkpoints.py) until the rerun replaces them. Returns the same row as
+    transition_job, or None if the job does not exist or was not in from_statuses.
+    """
+    values = {
+        "status": JobStatus.PENDING,
+        "attempts": 0,
+        "available_at": None,
+        "enqueued_at": func.now(),
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "finished_at": None,
+        "updated_at": func.now(),
+        "version": models.Job.version + 1
+    }
+    if analysis_params is not _UNSET:
+        values["analysis_params"] = analysis_params
+    row = db.execute(
+        update(models.Job)
+        .where(models.Job.id == job_id, models.Job.status.in_(list(from_statuses)))
+        .values(**values)
+        .returning(*_TRANSITION_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
+    return row
+
 def update_job_status(db: Session, job_id: int, status: JobStatus):
     db_job = get_job(db, job_id)
     if db_job:
@@ -47,3 +296,160 @@ def update_job(db: Session, job_id: int, job_in: job_schema.JobUpdate):
     db.refresh(db_job)
     return db_job
 
+
+# Database job queue (JOB_QUEUE_BACKEND=database). Lease timestamps are computed by the workers
+# in UTC, so worker clocks should be kept in sync (NTP).
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _claim_candidates(db: Session, now: datetime, window: int):
+    """
+    PENDING jobs that are claimable now, as a subquery of (id, priority, tenant_id). On Postgres only
+    each tenant's first window jobs (by priority, then age) are read: the tenants with PENDING jobs
+    are found by skipping through ix_jobs_tenant_queue and a LATERAL subquery takes their jobs from
+    it, so a claim does not scan every PENDING row. No job past that is among the first window of
+    the claim order, where a tenant's jobs keep this order. SQLite returns them all.
+    """
+    Job = models.Job
+    claimable = (Job.status == JobStatus.PENDING, or_(Job.available_at.is_(None), Job.available_at <= now))
+    if db.get_bind().dialect.name != "postgresql":
+        return select(Job.id, Job.priority, Job.tenant_id).where(*claimable).subquery()
+    tenants = select(func.min(Job.tenant_id).label("tenant_id")).where(Job.status == JobStatus.PENDING).cte(
+        "pending_tenants", recursive=True
+    )
+    next_tenant = select(func.min(Job.tenant_id)).where(Job.status == JobStatus.PENDING, Job.tenant_id > tenants.c.tenant_id)
+    tenants = tenants.union_all(select(next_tenant.scalar_subquery()).where(tenants.c.tenant_id.is_not(None)))
+    tenant_jobs = (
+        select(Job.id, Job.priority, Job.tenant_id)
+        .where(*claimable, Job.tenant_id == tenants.c.tenant_id)
+        .order_by(Job.priority.desc(), Job.id)
+        .limit(window)
+        .lateral("tenant_jobs")
+    )
+    return select(tenant_jobs).select_from(tenants).join(tenant_jobs, true()).subquery()
+
+def claim_next_job(db: Session, worker_id: str, lease_seconds: int, window: int = 32) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Claims the next PENDING job for worker_id: PENDING -> PROCESSING with a lease.
+    Order: highest priority first; within a priority, tenants take turns, with tenants that already
+    have jobs PROCESSING waiting behind those that do not; then oldest first.
+    On Postgres the candidate row is locked with FOR UPDATE SKIP LOCKED, so concurrent workers
+    never wait on each other. SQLite has no row locks: the guarded UPDATE makes a lost race
+    a no-op and the next candidate is tried.
+    Returns (job id, uploaded_file_id), or None if nothing is claimable.
+    """
+    Job = models.Job
+    for _ in range(3):
+        now = _utcnow()
+        running = (
+            select(Job.tenant_id, func.count().label("running"))
+            .where(Job.status == JobStatus.PROCESSING)
+            .group_by(Job.tenant_id)
+            .subquery()
+        )
+        pending = _claim_candidates(db, now, window)
+        tenant_turn = func.row_number().over(partition_by=(pending.c.tenant_id, pending.c.priority), order_by=pending.c.id)
+        candidates = (
+            select(pending.c.id, pending.c.priority, (tenant_turn + func.coalesce(running.c.running, 0)).label("turn"))
+            .outerjoin(running, running.c.tenant_id == pending.c.tenant_id)
+            .order_by(pending.c.priority.desc(), "turn", pending.c.id)
+            .limit(window)
+            .subquery()
+        )
+        pick = (
+            select(Job.id)
+            .join(candidates, candidates.c.id == Job.id)
+            .where(Job.status == JobStatus.PENDING)
+            .order_by(candidates.c.priority.desc(), candidates.c.turn, candidates.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=Job)
+        )
+        job_id = db.execute(pick).scalar()
+        if job_id is None:
+            db.commit()
+            return None
+        row = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.PENDING)
+            .values(
+                status=JobStatus.PROCESSING,
+                lease_owner=worker_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                heartbeat_at=now,
+                attempts=Job.attempts + 1,
+                started_at=func.now(),
+                finished_at=None,
+                updated_at=func.now(),
+                version=Job.version + 1
+            )
+            .returning(Job.id, Job.uploaded_file_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        if row is not None:
+            return row.id, row.uploaded_file_id
+    return None
+
+def heartbeat_jobs(db: Session, job_ids: Iterable[int], worker_id: str, lease_seconds: int) -> Set[int]:
+    """Extends the leases worker_id holds on job_ids; returns the ids whose lease is still held."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return set()
+    now = _utcnow()
+    rows = db.execute(
+        update(models.Job)
+        .where(
+            models.Job.id.in_(job_ids),
+            models.Job.lease_owner == worker_id,
+            models.Job.status == JobStatus.PROCESSING
+        )
+        .values(lease_expires_at=now + timedelta(seconds=lease_seconds), heartbeat_at=now)
+        .returning(models.Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return set(rows)
+
+def requeue_expired_jobs(db: Session, max_attempts: int, retry_delay_seconds: int) -> Tuple[int, int]:
+    """
+    Handles PROCESSING jobs whose lease expired (their worker died or hung): back to PENDING after
+    retry_delay_seconds, or FAILED once max_attempts claims have been used.
+    Returns (requeued, failed) counts.
+    """
+    Job = models.Job
+    now = _utcnow()
+    expired = (Job.status == JobStatus.PROCESSING, Job.lease_expires_at.is_not(None), Job.lease_expires_at < now)
+    failed_ids = db.execute(
+        update(Job)
+        .where(*expired, Job.attempts >= max_attempts)
+        .values(
+            status=JobStatus.FAILED,
+            results={"error": f"Job lease expired {max_attempts} times", "step": "job_queue"},
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=func.now(),
+            updated_at=func.now(),
+            version=Job.version + 1
+        )
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if failed_ids: # The error replaced the results
+        db.execute(delete(models.JobArtifact).where(models.JobArtifact.job_id.in_(failed_ids)))
+    requeued = db.execute(
+        update(Job)
+        .where(*expired)
+        .values(
+            status=JobStatus.PENDING,
+            lease_owner=None,
+            lease_expires_at=None,
+            available_at=now + timedelta(seconds=retry_delay_seconds),
+            enqueued_at=now + timedelta(seconds=retry_delay_seconds),
+            updated_at=func.now(),
+            version=Job.version + 1
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return requeued, len(failed_ids)
@@ -0,0 +1,61 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Sequence, Tuple
+from ..db import models
+
+_LOOKUP_BATCH = 500 # Terms per IN (...) lookup
+_UPSERT_BATCH = 1000 # Terms per INSERT ... ON CONFLICT statement
+_CORPUS_ID = 1
+
+def _insert(db: Session) -> Any:
+    """INSERT with ON CONFLICT support for the session's database (Postgres, or SQLite locally)."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def get_document_frequencies(db: Session, terms: Sequence[str]) -> Tuple[int, Dict[str, int]]:
+    """(documents in the index, {term: documents containing it}) for the terms found in the index."""
+    documents = db.execute(
+        select(models.KeywordCorpus.document_count).where(models.KeywordCorpus.id == _CORPUS_ID)
+    ).scalar()
+    frequencies: Dict[str, int] = {}
+    for i in range(0, len(terms), _LOOKUP_BATCH):
+        rows = db.execute(
+            select(models.TermDocumentFrequency.term, models.TermDocumentFrequency.document_count)
+            .where(models.TermDocumentFrequency.term.in_(terms[i:i + _LOOKUP_BATCH]))
+        )
+        frequencies.update((term, count) for term, count in rows)
+    return documents or 0, frequencies
+
+def add_document(db: Session, job_id: int, terms: Sequence[str]) -> bool:
+    """
+    Adds a job's document (its distinct terms) to the index in one transaction, once per job:
+    returns False if the job was already indexed (a retry or re-analysis) or does not exist.
+    The corpus row is updated first, so concurrent additions queue behind it instead of
+    deadlocking on each other's terms.
+    """
+    claimed = db.execute(
+        update(models.Job)
+        .where(models.Job.id == job_id, models.Job.keywords_indexed_at.is_(None))
+        .values(keywords_indexed_at=func.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return False
+    insert = _insert(db)
+    corpus = insert(models.KeywordCorpus).values(id=_CORPUS_ID, document_count=1)
+    db.execute(corpus.on_conflict_do_update(
+        index_elements=[models.KeywordCorpus.id],
+        set_={"document_count": models.KeywordCorpus.document_count + 1}
+    ))
+    ordered: List[str] = sorted(set(terms))
+    for i in range(0, len(ordered), _UPSERT_BATCH):
+        batch = insert(models.TermDocumentFrequency).values(
+            [{"term": term, "document_count": 1} for term in ordered[i:i + _UPSERT_BATCH]]
+        )
+        db.execute(batch.on_conflict_do_update(
+            index_elements=[models.TermDocumentFrequency.term],
+            set_={"document_count": models.TermDocumentFrequency.document_count + 1}
+        ))
+    db.commit()
+    return True
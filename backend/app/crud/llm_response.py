@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Sequence
+from ..db import models
+
+_LOOKUP_BATCH = 500 # Keys per IN (...) lookup
+
+def _insert(db: Session) -> Any:
+    """INSERT with ON CONFLICT support for the session's database (Postgres, or SQLite locally)."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def get_responses(db: Session, keys: Sequence[str], ttl_seconds: int = 0) -> Dict[str, str]:
+    """{key: response} for the keys found in the cache (with ttl_seconds > 0, only entries younger than that)."""
+    responses: Dict[str, str] = {}
+    oldest = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds) if ttl_seconds > 0 else None
+    for i in range(0, len(keys), _LOOKUP_BATCH):
+        stmt = select(models.LLMResponse.key, models.LLMResponse.response).where(
+            models.LLMResponse.key.in_(keys[i:i + _LOOKUP_BATCH])
+        )
+        if oldest is not None:
+            stmt = stmt.where(models.LLMResponse.created_at >= oldest)
+        responses.update((key, response) for key, response in db.execute(stmt))
+    return responses
+
+def save_responses(db: Session, entries: List[Dict[str, Any]]) -> None:
+    """
+    Caches responses: entries hold key, template, model, response and optionally prompt_tokens and
+    completion_tokens. An existing entry under the same key (expired, or a concurrent request's) is replaced.
+    """
+    if not entries:
+        return
+    now = datetime.now(timezone.utc)
+    insert = _insert(db)
+    for entry in sorted(entries, key=lambda entry: entry["key"]): # Same lock order in concurrent transactions
+        values = {"prompt_tokens": None, "completion_tokens": None, **entry, "created_at": now}
+        stmt = insert(models.LLMResponse).values(**values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.LLMResponse.key],
+            set_={name: value for name, value in values.items() if name != "key"}
+        ))
+    db.commit()
@@ -0,0 +1,68 @@
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+from ..db import models
+
+_SNIPPET_START, _SNIPPET_STOP = "<b>", "</b>"
+
+# Postgres: rank the matches first, then build snippets (ts_headline re-parses the text) for the page only
+_POSTGRES_SEARCH = text(f"""
+    WITH q AS (SELECT websearch_to_tsquery('{models.SEARCH_TEXT_CONFIG}', :query) AS query),
+    hits AS (
+        SELECT d.job_id, ts_rank_cd(d.search_vector, q.query) AS rank
+        FROM search_documents d, q
+        WHERE d.search_vector @@ q.query
+        ORDER BY rank DESC, d.job_id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT d.job_id, d.filename, hits.rank,
+           ts_headline('{models.SEARCH_TEXT_CONFIG}', d.content, q.query,
+                       'MaxFragments=2, MinWords=8, MaxWords=24, FragmentDelimiter=" … ", '
+                       'StartSel={_SNIPPET_START}, StopSel={_SNIPPET_STOP}') AS snippet
+    FROM hits JOIN search_documents d ON d.job_id = hits.job_id, q
+    ORDER BY hits.rank DESC, d.job_id DESC
+""")
+
+# SQLite FTS5: bm25() is lower for better matches; a filename match weighs 5x a content match
+_SQLITE_SEARCH = text(f"""
+    SELECT rowid AS job_id, filename, -bm25(search_documents_fts, 5.0, 1.0) AS rank,
+           snippet(search_documents_fts, 1, '{_SNIPPET_START}', '{_SNIPPET_STOP}', ' … ', 24) AS snippet
+    FROM search_documents_fts
+    WHERE search_documents_fts MATCH :query
+    ORDER BY bm25(search_documents_fts, 5.0, 1.0), rowid DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+def _insert(db: Session) -> Any:
+    """INSERT with ON CONFLICT support for the session's database (Postgres, or SQLite locally)."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def _fts5_query(query: str) -> str:
+    """Terms of a user query as quoted FTS5 strings (all required), so punctuation is never FTS5 syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+def upsert_document(db: Session, job_id: int, filename: str, content: str) -> None:
+    """Indexes (or re-indexes) a job's text."""
+    stmt = _insert(db)(models.SearchDocument).values(job_id=job_id, filename=filename, content=content)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.SearchDocument.job_id],
+        set_={"filename": filename, "content": content, "indexed_at": func.now()}
+    ))
+    db.commit()
+
+def search_documents(db: Session, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Jobs whose text matches query, best first: [{"job_id", "filename", "rank", "snippet"}].
+    On Postgres, query is web search syntax ("quoted phrases", or, -excluded); on SQLite every
+    term must match. Matches are highlighted in the snippet with <b></b>.
+    """
+    params = {"query": query, "limit": limit, "offset": offset}
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(_POSTGRES_SEARCH, params)
+    else:
+        params["query"] = _fts5_query(query)
+        if not params["query"]:
+            return []
+        rows = db.execute(_SQLITE_SEARCH, params)
+    return [dict(row) for row in rows.mappings()]
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum as SQLEnum
+from sqlalchemy import DDL, Column, Boolean, Integer, String, Text, DateTime, ForeignKey, JSON, Index, UniqueConstraint, Enum as SQLEnum, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..db.base import Base
@@ -18,6 +18,7 @@ class UploadedFile(Base):
     original_filename = Column(String)
     content_type = Column(String)
     file_path = Column(String)  # Path in MinIO/Object Storage
+    content_hash = Column(String(64), index=True)  # SHA-256 of the file content, used for deduplication
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     job = relationship("Job", back_populates="uploaded_file", uselist=False)
@@ -30,7 +31,146 @@ class Job(Base):
     status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)  # Last PENDING -> PROCESSING transition
+    finished_at = Column(DateTime(timezone=True), nullable=True)  # Set on COMPLETED / FAILED
     results = Column(JSON)  # To store extracted data, analysis, etc.
+    pipeline_version = Column(String, index=True)  # settings.PIPELINE_VERSION the results were produced with
+    reused_from_job_id = Column(Integer, ForeignKey("jobs.id"), nullable=True)  # Set when results were reused
+    version = Column(Integer, nullable=False)  # Bumped by SQLAlchemy on every UPDATE; used for ETags
+    batch_id = Column(String(36), index=True, nullable=True)  # Set for jobs created by a batch upload
+    analysis_params = Column(JSON, nullable=True)  # Analyzer parameters (schemas.job.AnalysisParameters); None = defaults
+    profile = Column(Boolean, nullable=False, default=False)  # Profile the pipeline run (results["profile"])
+    keywords_indexed_at = Column(DateTime(timezone=True), nullable=True)  # Text added to the keyword index (once per job)
 
-    uploaded_file = relationship("UploadedFile", back_populates="job")
+    # Database job queue (JOB_QUEUE_BACKEND=database, see workers/db_worker.py)
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first
+    tenant_id = Column(String, nullable=False, default="default")  # Claims are shared fairly between tenants
+    available_at = Column(DateTime(timezone=True), nullable=True)  # Not claimable before this (retry backoff)
+    attempts = Column(Integer, nullable=False, default=0)  # Claims so far
+    enqueued_at = Column(DateTime(timezone=True), server_default=func.now())  # Last became claimable (queue wait metric)
+    lease_owner = Column(String, nullable=True)  # Worker holding the job while PROCESSING
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Re-queued if not renewed by then
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
 
+    uploaded_file = relationship("UploadedFile", back_populates="job", foreign_keys=[uploaded_file_id])
+
+    __table_args__ = (
+        Index("ix_jobs_queue", "status", "priority", "id"),
+        Index("ix_jobs_tenant_queue", "status", "tenant_id", text("priority DESC"), "id"),
+        Index("ix_jobs_lease_expires_at", "status", "lease_expires_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class JobCheckpoint(Base):
+    """
+    Output of one pipeline stage of a job, so a retry or re-analysis resumes after the last
+    completed stage. Large outputs live in object storage (artifact_ref), small ones inline (value).
+    Deleted once the job completes: its Job.results then holds the same outputs.
+    """
+    __tablename__ = "job_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
+    stage = Column(String(32), nullable=False)  # extraction | cleaning | analysis
+    pipeline_version = Column(String, nullable=False)
+    value = Column(JSON, nullable=True)
+    artifact_ref = Column(JSON, nullable=True)  # See services/artifacts.py
+    artifact_object = Column(String, nullable=True, index=True)  # artifact_ref["object_name"], for reference lookups
+    params = Column(JSON, nullable=True)  # Parameters the stage ran with (Job.analysis_params for analysis)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (UniqueConstraint("job_id", "stage", "pipeline_version", name="uq_job_checkpoints_stage"),)
+
+
+class JobArtifact(Base):
+    """An artifact (services/artifacts.py) a job's Job.results refers to, so references are found by an indexed lookup."""
+    __tablename__ = "job_artifacts"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    object_name = Column(String, primary_key=True, index=True)
+
+
+class TermDocumentFrequency(Base):
+    """Number of indexed documents containing a term, for TF-IDF keyword scoring (services/keyword_index.py)."""
+    __tablename__ = "term_document_frequencies"
+
+    term = Column(String(64), primary_key=True)
+    document_count = Column(Integer, nullable=False, default=0)
+
+
+class KeywordCorpus(Base):
+    """Size of the keyword index: a single row (id 1) counting the documents added to it."""
+    __tablename__ = "keyword_corpus"
+
+    id = Column(Integer, primary_key=True)
+    document_count = Column(Integer, nullable=False, default=0)
+
+
+class LLMResponse(Base):
+    """A cached LLM completion (services/llm_gateway.py), keyed by a hash of prompt template, model and input."""
+    __tablename__ = "llm_responses"
+
+    key = Column(String(64), primary_key=True)  # SHA-256 hex
+    template = Column(String, nullable=False)  # Prompt template name (prompts/<template>.md)
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class JobEvent(Base):
+    """A job progress event for EVENTS_BACKEND=database (services/events.py): subscribers poll by id; pruned after EVENTS_RETENTION_SECONDS."""
+    __tablename__ = "job_events"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, nullable=False)  # No foreign key: events are best effort
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class SearchDocument(Base):
+    """
+    Text of a completed job, for cross-job full-text search (services/search_index.py). The search
+    structures are created with the table and depend on the database: on Postgres a generated
+    tsvector column (search_vector) with a GIN index, on SQLite an FTS5 table (search_documents_fts)
+    kept in sync by triggers.
+    """
+    __tablename__ = "search_documents"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    filename = Column(String, nullable=False, default="")
+    content = Column(Text, nullable=False, default="")  # Capped at SEARCH_INDEX_MAX_CHARS
+    indexed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+SEARCH_TEXT_CONFIG = "english" # Postgres text search configuration (SQLite uses the porter tokenizer)
+
+_SEARCH_DDL = {
+    "postgresql": [
+        f"""ALTER TABLE search_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', translate(filename, '._-', '   ')), 'A') ||
+            setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', content), 'B')
+        ) STORED""",
+        "CREATE INDEX ix_search_documents_search_vector ON search_documents USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE search_documents_fts USING fts5(
+            filename, content, content='search_documents', content_rowid='job_id', tokenize='porter unicode61'
+        )""",
+        """CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN
+            INSERT INTO search_documents_fts(rowid, filename, content) VALUES (new.job_id, new.filename, new.content);
+        END""",
+        """CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN
+            INSERT INTO search_documents_fts(search_documents_fts, rowid, filename, content)
+            VALUES ('delete', old.job_id, old.filename, old.content);
+        END""",
+        """CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN
+            INSERT INTO search_documents_fts(search_documents_fts, rowid, filename, content)
+            VALUES ('delete', old.job_id, old.filename, old.content);
+            INSERT INTO search_documents_fts(rowid, filename, content) VALUES (new.job_id, new.filename, new.content);
+        END""",
+    ],
+}
+for _dialect, _statements in _SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(SearchDocument.__table__, "before_drop", DDL("DROP TABLE IF EXISTS search_documents_fts").execute_if(dialect="sqlite"))
@@ -1,18 +1,31 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from ..core import metrics
 from ..core.config import settings
 
-if settings.POSTGRES_SERVER and settings.POSTGRES_USER and settings.POSTGRES_PASSWORD and settings.POSTGRES_DB:
+if settings.SQLALCHEMY_DATABASE_URI:
+    pass # Explicitly configured (e.g. a different driver or an in-memory SQLite for tests)
+elif settings.POSTGRES_SERVER and settings.POSTGRES_USER and settings.POSTGRES_PASSWORD and settings.POSTGRES_DB:
     settings.SQLALCHEMY_DATABASE_URI = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
 else:
     # Fallback to SQLite if not all PostgreSQL settings are provided (for local dev without full setup)
     settings.SQLALCHEMY_DATABASE_URI = "sqlite:///./test.db"
     print("Warning: PostgreSQL credentials not fully provided, falling back to SQLite for DB.")
 
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI, 
-    # connect_args={"check_same_thread": False} # Only for SQLite
-)
+if settings.SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+    engine_options = {"connect_args": {"check_same_thread": False}}
+else:
+    # Connection pool: each API/worker process keeps up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    engine_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **engine_options)
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -21,4 +34,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
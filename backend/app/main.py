@@ -1,9 +1,12 @@
-from fastapi import FastAPI
-from ..app.api.v1.router import api_router
-from ..app.core.config import settings
-from ..app.db.session import engine #, SessionLocal
-from ..app.db import base as db_base # To create tables
-from ..app.core.logging_config import setup_logging # Import the setup function
+from fastapi import FastAPI, HTTPException, Response
+from .api.v1.router import api_router
+from .core import metrics
+from .core.config import settings
+from .db.session import engine #, SessionLocal
+from .db import base as db_base # To create tables
+from .db import models # Registers the models on Base.metadata
+from .core.logging_config import setup_logging # Import the setup function
+from .services import storage
 
 # Create database tables
 # In a production setup with Alembic, this would be handled by migrations
@@ -21,16 +24,12 @@ app = FastAPI(
 async def startup_event():
     logger.info("Application startup...")
     # You can add other startup logic here, like connecting to a message broker if not handled by Celery worker
-    # For example, ensure MinIO bucket exists (though file_handler does this on first use)
+    # Make sure the storage bucket exists once; the backend caches the result for later uploads
     try:
-        from ..app.services.file_handler import client as minio_client, settings as minio_settings
-        if not minio_client.bucket_exists(minio_settings.MINIO_BUCKET_NAME):
-            minio_client.make_bucket(minio_settings.MINIO_BUCKET_NAME)
-            logger.info(f"MinIO bucket 	ható{minio_settings.MINIO_BUCKET_NAME}" created.")
-        else:
-            logger.info(f"MinIO bucket 	ható{minio_settings.MINIO_BUCKET_NAME}" already exists.")
+        await storage.run_blocking(storage.get_storage_backend().ensure_bucket)
+        logger.info(f"Storage bucket '{settings.MINIO_BUCKET_NAME}' is ready ({settings.STORAGE_BACKEND} backend).")
     except Exception as e:
-        logger.error(f"Error checking/creating MinIO bucket during startup: {e}")
+        logger.error(f"Error checking/creating storage bucket during startup: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -43,6 +42,14 @@ async def health_check():
     logger.info("Health check endpoint called.")
     return {"status": "ok"}
 
+@app.get("/metrics", tags=["healthcheck"])
+def metrics_endpoint():
+    """Prometheus metrics: pipeline stages, storage, database and job queue (see core/metrics.py)."""
+    if metrics.prometheus_client is None:
+        raise HTTPException(status_code=503, detail="prometheus_client is not installed")
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type}) # Already includes the charset
+
 # For local development without Docker, you might run with uvicorn directly:
 # if __name__ == "__main__":
 #     import uvicorn
@@ -12,11 +12,13 @@ class UploadedFileCreate(UploadedFileBase):
     file_path: str
     original_filename: str
     content_type: str
+    content_hash: Optional[str] = None
 
 class UploadedFileInDBBase(UploadedFileBase):
     id: int
     filename: str
     file_path: str
+    content_hash: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Any, Dict, List
 from datetime import datetime
 from ..db.models import JobStatus # Assuming models.py is in ..db
 
@@ -16,6 +16,7 @@ class UploadedFileInDBBase(UploadedFileBase):
     id: int
     filename: str
     file_path: str
+    content_hash: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -30,6 +31,19 @@ class JobBase(BaseModel):
 
 class JobCreate(JobBase):
     uploaded_file_id: int
+    batch_id: Optional[str] = None
+    priority: Optional[int] = None # Defaults to JOB_PRIORITY_INTERACTIVE
+    tenant_id: Optional[str] = None
+    profile: bool = False # Store a profile of the pipeline run in results["profile"]
+
+class AnalysisParameters(BaseModel):
+    """Analyzer parameters for POST /jobs/{job_id}/reanalyze; None uses the server defaults."""
+    summary_max_length: Optional[int] = Field(None, ge=1, le=100_000) # SUMMARY_MAX_CHARS
+    summary_sentences: Optional[int] = Field(None, ge=1, le=100) # SUMMARY_MAX_SENTENCES
+    num_keywords: int = Field(5, ge=0, le=1000)
+    top_values: int = Field(5, ge=0, le=1000) # Most frequent values reported per text column
+    quantile_sketch_size: Optional[int] = Field(None, ge=16, le=1_000_000) # ANALYZER_QUANTILE_SKETCH_SIZE
+    top_values_capacity: Optional[int] = Field(None, ge=1, le=1_000_000) # ANALYZER_TOP_VALUES_CAPACITY
 
 class JobUpdate(BaseModel):
     status: Optional[JobStatus] = None
@@ -40,7 +54,17 @@ class JobInDBBase(JobBase):
     status: JobStatus
     created_at: datetime
     updated_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     results: Optional[Any] = None
+    pipeline_version: Optional[str] = None
+    reused_from_job_id: Optional[int] = None # Set when results were reused from an identical upload
+    version: Optional[int] = None
+    batch_id: Optional[str] = None
+    priority: Optional[int] = None
+    tenant_id: Optional[str] = None
+    attempts: Optional[int] = None
+    analysis_params: Optional[Dict[str, Any]] = None
     uploaded_file: Optional[UploadedFileSchema] = None # For response model
 
     class Config:
@@ -52,6 +76,33 @@ class JobSchema(JobInDBBase):
 class JobStatusResponse(BaseModel):
     job_id: int
     status: JobStatus
+    version: Optional[int] = None
+    updated_at: Optional[datetime] = None
     message: Optional[str] = None
     results_summary: Optional[Any] = None # e.g. link to results or brief summary
 
+class TableRowsPage(BaseModel):
+    table_name: Optional[str] = None
+    header: List[str]
+    offset: int
+    limit: int
+    total_rows: int
+    rows: List[List[Any]]
+
+
+class BatchJobSummary(BaseModel):
+    job_id: int
+    uploaded_file_id: int
+    original_filename: Optional[str] = None
+    status: JobStatus
+    reused_from_job_id: Optional[int] = None
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    jobs: List[BatchJobSummary]
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total: int
+    status_counts: Dict[JobStatus, int]
+    jobs: List[BatchJobSummary]
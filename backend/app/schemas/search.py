@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List
+
+class SearchHit(BaseModel):
+    job_id: int
+    filename: str
+    rank: float # Relevance; only comparable within one result list
+    snippet: str # Matching passages, matches wrapped in <b></b>
+
+class SearchResults(BaseModel):
+    query: str
+    offset: int
+    limit: int
+    has_more: bool
+    hits: List[SearchHit]
@@ -1,39 +1,63 @@
 # AI Agent: Data Analyzer
+import asyncio
 import json
-from typing import Dict, Any, List, Union
-import re
-import statistics # For mean, median, stdev
+from typing import Dict, Any, List, Optional, Tuple, Union
 
-# Placeholder for future LLM integration (e.g., LangChain, OpenAI client)
-# from ....app.core.config import settings
-# import openai
-# openai.api_key = settings.OPENAI_API_KEY
+from ...core.config import settings
+from ..llm_gateway import LLMError
+from . import keywords, map_reduce, summarizer
+from .column_stats import ColumnAccumulator
+from .columnar import ColumnarTable, StreamedPages, StreamedTable, as_table
 
-def generate_text_summary(text: str, max_length: int = 150) -> str:
-    """Generates a concise summary of the text. Placeholder for LLM-based summarization."""
+def generate_text_summary(text: str, max_length: Optional[int] = None, max_sentences: Optional[int] = None) -> str:
+    """
+    Generates a concise extractive summary of the text: its most representative sentences, in
+    document order, within SUMMARY_TIME_BUDGET_SECONDS (see summarizer.py).
+    """
     if not text or not isinstance(text, str):
         return ""
-    # Simple placeholder: take the first N characters/words
-    summary = text[:max_length]
-    if len(text) > max_length:
-        summary += "..."
-    # A real LLM call would be: openai.Completion.create(engine="davinci", prompt=f"Summarize this: {text}", max_tokens=60)
-    return summary
-
-def extract_keywords(text: str, num_keywords: int = 5) -> List[str]:
-    """Extracts relevant keywords from the text. Placeholder for NLP/LLM-based keyword extraction."""
+    return summarizer.summarize(text, max_sentences, max_length)
+
+async def generate_llm_text_analysis(text: str, max_length: Optional[int] = None) -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    (abstractive summary, key fields) of the text with LLM_SUMMARIES / LLM_KEY_FIELDS, both by
+    concurrent map-reduce over the same chunks (see map_reduce.py). The summary is None when
+    disabled or when a request failed, so the caller falls back to the extractive summary.
+    """
+    if not text or not isinstance(text, str) or not (settings.LLM_SUMMARIES or settings.LLM_KEY_FIELDS):
+        return None, {}
+    chunks = map_reduce.token_chunks(text)
+    summary, key_fields = await asyncio.gather(
+        map_reduce.summarize(text, max_length, chunks) if settings.LLM_SUMMARIES else asyncio.sleep(0, None),
+        map_reduce.extract_key_fields(text, chunks) if settings.LLM_KEY_FIELDS else asyncio.sleep(0, {}),
+        return_exceptions=True
+    )
+    if isinstance(summary, LLMError):
+        print(f"Analyzer Agent: LLM summary failed, using the extractive summary: {summary}")
+        summary = None
+    for result in (summary, key_fields):
+        if isinstance(result, BaseException):
+            raise result
+    return summary or None, key_fields
+
+def extract_keywords(
+    text: str,
+    num_keywords: int = 5,
+    document_frequencies: Optional[keywords.DocumentFrequencies] = None
+) -> List[str]:
+    """
+    Extracts relevant keywords from the text: stop words dropped, terms scored by TF-IDF against
+    document_frequencies (by frequency without it), see keywords.py. With document_frequencies,
+    the text is also added to that corpus.
+    """
     if not text or not isinstance(text, str):
         return []
-    # Simple placeholder: split by space, count frequency, take top N (case-insensitive)
-    words = re.findall(r"\b\w+\b", text.lower())
-    if not words:
-        return []
-    word_counts = {}
-    for word in words:
-        if len(word) > 3: # Basic filter for very short words
-            word_counts[word] = word_counts.get(word, 0) + 1
-    sorted_keywords = sorted(word_counts.items(), key=lambda item: item[1], reverse=True)
-    return [kw[0] for kw in sorted_keywords[:num_keywords]]
+    top_keywords, counts = keywords.extract_keywords(
+        text, num_keywords, document_frequencies, settings.KEYWORDS_CANDIDATE_TERMS
+    )
+    if document_frequencies is not None:
+        document_frequencies.add_document(counts)
+    return top_keywords
 
 def attempt_type_conversion(value: str) -> Union[int, float, str]:
     """Attempts to convert a string to an int or float."""
@@ -45,11 +69,69 @@ def attempt_type_conversion(value: str) -> Union[int, float, str]:
         except ValueError:
             return value # Return original string if conversion fails
 
-async def run_analysis_agent(cleaned_data: Dict[str, Any]) -> Dict[str, Any]:
+def _analyze_table(
+    table: Union[ColumnarTable, StreamedTable], table_name: str, params: Dict[str, Any], want_viz: bool
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """The table's analysis, and (if want_viz) its bar chart data when it has a numeric column to plot."""
+    quantile_sketch_size = params.get("quantile_sketch_size") or settings.ANALYZER_QUANTILE_SKETCH_SIZE
+    top_values_capacity = params.get("top_values_capacity") or settings.ANALYZER_TOP_VALUES_CAPACITY
+    # Streamed tables (see extractor_agent.stream_table_from_csv) arrive as a generator of chunks
+    chunks = table.chunks if isinstance(table, StreamedTable) else [table]
+    headers = table.header
+
+    # One single-pass accumulator per column: O(rows) time, O(columns) memory
+    accumulators = [
+        ColumnAccumulator(quantile_sketch_size, top_values_capacity)
+        for _ in headers
+    ]
+    row_count = 0
+
+    for chunk in chunks:
+        row_count += chunk.num_rows + chunk.skipped_rows
+        for accumulator, column in zip(accumulators, chunk.columns):
+            if column.is_numeric:
+                accumulator.add_column(column) # Vectorized path for typed columns
+            else:
+                for cell_value in column.values:
+                    accumulator.add(attempt_type_conversion(cell_value))
+
+    current_table_analysis = {"table_name": table_name, "column_statistics": [], "row_count": row_count}
+    viz = None
+    for col_idx, header in enumerate(headers):
+        col_stats = {"column_name": header, "inferred_type": "text"} # Default to text
+        accumulator = accumulators[col_idx]
+
+        if accumulator.count:
+            col_stats["inferred_type"] = "numeric"
+            col_stats.update(accumulator.numeric_statistics())
+
+            # For MVP viz: pick first numeric column of first table with string labels
+            if want_viz and not viz and col_idx > 0: # Ensure there's a label column
+                viz = {
+                    "title": f"{header} by {headers[0]} ({table_name})",
+                    "labels": [str(v) for v in accumulators[0].head], # Limited to 10 for viz
+                    "values": accumulator.numeric_head
+                }
+        elif accumulator.text_count: # Categorical/Text
+            col_stats["top_values_frequency"] = accumulator.text_values.most_common(params.get("top_values", 5)) # Top 5 frequent by default
+
+        current_table_analysis["column_statistics"].append(col_stats)
+    return current_table_analysis, viz
+
+async def run_analysis_agent(
+    cleaned_data: Dict[str, Any],
+    params: Optional[Dict[str, Any]] = None,
+    document_frequencies: Optional[keywords.DocumentFrequencies] = None
+) -> Dict[str, Any]:
     """
     Main function for the Data Analyzer Agent.
     Processes cleaned JSON data to derive insights.
+    params overrides the defaults of schemas.job.AnalysisParameters (summary_max_length, summary_sentences,
+    num_keywords, top_values, quantile_sketch_size, top_values_capacity).
+    document_frequencies is the corpus keywords are scored against (and the text is added to),
+    e.g. services.keyword_index.DocumentFrequencyIndex.
     """
+    params = params or {}
     print(f"Analyzer Agent: Processing cleaned data.")
     analysis_output = {
         "text_analysis": {"summary": "", "keywords": []},
@@ -59,78 +141,56 @@ async def run_analysis_agent(cleaned_data: Dict[str, Any]) -> Dict[str, Any]:
         "visualization_data": {}
     }
 
-    # 1. Textual Analysis
+    # Streamed PDF pages are drained here: their tables are analyzed page by page, their text is
+    # kept for the text analysis
     full_text = cleaned_data.get("full_text_content", "")
     if isinstance(full_text, list):
         full_text = " \n".join(filter(None,full_text)) # Join if it was an array of strings
-    
-    if full_text:
-        analysis_output["text_analysis"]["summary"] = generate_text_summary(full_text)
-        analysis_output["text_analysis"]["keywords"] = extract_keywords(full_text)
-
-    # 2. Tabular Data Analysis
     tables = cleaned_data.get("tables", [])
+    table_count = len(tables)
     first_suitable_table_for_viz = None
+    pages = cleaned_data.get("pages")
+    if isinstance(pages, StreamedPages):
+        page_texts = []
+        for page in pages.pages:
+            page_texts.append(page["text"])
+            for table in page["tables"]:
+                table_count += 1
+                table_analysis, viz = _analyze_table(table, table.name, params, first_suitable_table_for_viz is None)
+                analysis_output["table_analysis"].append(table_analysis)
+                first_suitable_table_for_viz = first_suitable_table_for_viz or viz
+        full_text = " \n".join(filter(None, page_texts))
+
+    # 1. Textual Analysis
+    if full_text:
+        llm_summary, llm_key_fields = await generate_llm_text_analysis(full_text, params.get("summary_max_length"))
+        analysis_output["text_analysis"]["summary"] = llm_summary or generate_text_summary(
+            full_text, params.get("summary_max_length"), params.get("summary_sentences")
+        )
+        if llm_key_fields: # Fields extracted from the file itself take precedence
+            analysis_output["key_field_summary"] = {**llm_key_fields, **analysis_output["key_field_summary"]}
+        analysis_output["text_analysis"]["keywords"] = extract_keywords(
+            full_text, params.get("num_keywords", 5), document_frequencies
+        )
 
+    # 2. Tabular Data Analysis
     for table_idx, table_item in enumerate(tables):
-        if not (isinstance(table_item, dict) and "data" in table_item and isinstance(table_item["data"], list)):
+        table = as_table(table_item)
+        if table is None:
             continue
-        
-        table_name = table_item.get("name", f"table_{table_idx + 1}")
-        table_data = table_item["data"]
-        if not table_data: continue
-
-        current_table_analysis = {"table_name": table_name, "column_statistics": [], "row_count": len(table_data) -1 if len(table_data)>0 else 0}
-        headers = table_data[0] if table_data else []
-        column_data_typed: Dict[str, List[Any]] = {header: [] for header in headers}
-        
-        # Skip header row for data processing
-        for row_idx, row in enumerate(table_data[1:] if len(table_data) > 1 else []):
-            if len(row) == len(headers):
-                for col_idx, cell_value in enumerate(row):
-                    column_data_typed[headers[col_idx]].append(attempt_type_conversion(cell_value))
-        
-        for col_idx, header in enumerate(headers):
-            col_stats = {"column_name": header, "inferred_type": "text"} # Default to text
-            numeric_values: List[Union[int, float]] = [v for v in column_data_typed[header] if isinstance(v, (int, float))]
-            string_values: List[str] = [str(v) for v in column_data_typed[header] if isinstance(v, str)]
-
-            if numeric_values:
-                col_stats["inferred_type"] = "numeric"
-                col_stats["count"] = len(numeric_values)
-                col_stats["sum"] = sum(numeric_values)
-                col_stats["mean"] = round(statistics.mean(numeric_values), 2) if numeric_values else 0
-                col_stats["median"] = round(statistics.median(numeric_values), 2) if numeric_values else 0
-                col_stats["min"] = min(numeric_values) if numeric_values else 0
-                col_stats["max"] = max(numeric_values) if numeric_values else 0
-                col_stats["std_dev"] = round(statistics.stdev(numeric_values), 2) if len(numeric_values) > 1 else 0
-                
-                # For MVP viz: pick first numeric column of first table with string labels
-                if not first_suitable_table_for_viz and col_idx > 0: # Ensure there's a label column
-                    label_col_data = [str(v) for v in column_data_typed[headers[0]]]
-                    if all(isinstance(v, str) for v in label_col_data):
-                        first_suitable_table_for_viz = {
-                            "title": f"{header} by {headers[0]} ({table_name})",
-                            "labels": label_col_data[:10], # Limit to 10 for viz
-                            "values": numeric_values[:10]
-                        }
-            elif string_values: # Categorical/Text
-                freq_dist = {}
-                for s_val in string_values:
-                    freq_dist[s_val] = freq_dist.get(s_val, 0) + 1
-                sorted_freq = sorted(freq_dist.items(), key=lambda item: item[1], reverse=True)
-                col_stats["top_values_frequency"] = dict(sorted_freq[:5]) # Top 5 frequent
-            
-            current_table_analysis["column_statistics"].append(col_stats)
-        analysis_output["table_analysis"].append(current_table_analysis)
+        table_analysis, viz = _analyze_table(
+            table, table.name or f"table_{table_idx + 1}", params, first_suitable_table_for_viz is None
+        )
+        analysis_output["table_analysis"].append(table_analysis)
+        first_suitable_table_for_viz = first_suitable_table_for_viz or viz
 
     # 3. Key-Field Summary (already in analysis_output["key_field_summary"])
 
     # 4. Overall Insights (Placeholder)
     if analysis_output["text_analysis"]["summary"]:
         analysis_output["overall_insights"].append(f"Document Summary: {analysis_output['text_analysis']['summary'][:50]}...")
-    if tables and analysis_output["table_analysis"]:
-        analysis_output["overall_insights"].append(f"Analyzed {len(tables)} table(s). First table ('{analysis_output['table_analysis'][0]['table_name']}') has {analysis_output['table_analysis'][0]['row_count']} data rows.")
+    if table_count and analysis_output["table_analysis"]:
+        analysis_output["overall_insights"].append(f"Analyzed {table_count} table(s). First table ('{analysis_output['table_analysis'][0]['table_name']}') has {analysis_output['table_analysis'][0]['row_count']} data rows.")
     if not analysis_output["overall_insights"]:
         analysis_output["overall_insights"].append("Basic analysis complete. No specific high-level insights generated by placeholder logic.")
 
@@ -1,18 +1,32 @@
 # AI Agent: Data Cleaner
 import re
-from typing import Dict, Any, List, Union
+import functools
+from collections import Counter
+from typing import Callable, Dict, Any, List, Tuple, Union, Iterable, Iterator
+
+from ...core.config import settings
+from .columnar import Column, ColumnarTable, StreamedPages, StreamedTable, as_table
 
 # Placeholder for future LLM integration for contextual cleaning
 # from ....app.core.config import settings
 # import openai
 # openai.api_key = settings.OPENAI_API_KEY
 
+# Patterns are compiled once at import instead of being looked up per cell
+WHITESPACE_RE = re.compile(r'\s+')
+NUMERIC_RE = re.compile(r"^-?\d*\.?\d+$")
+DATE_RE = re.compile(
+    r"^(\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}"        # 2024-05-10, 10/05/2024, 10.05.24
+    r"|[A-Za-z]{3,9}\.? \d{1,2},? \d{2,4}"       # May 10, 2024
+    r"|\d{1,2} [A-Za-z]{3,9}\.?,? \d{2,4})$"      # 10 May 2024
+)
+
 def trim_whitespace(value: str) -> str:
     """Trims leading/trailing whitespace and normalizes internal whitespace."""
     if not isinstance(value, str):
         return value
     value = value.strip()
-    value = re.sub(r'\s+', ' ', value) # Replace multiple spaces with a single space
+    value = WHITESPACE_RE.sub(' ', value) # Replace multiple spaces with a single space
     return value
 
 def clean_numeric_string(value: str) -> str:
@@ -48,13 +62,103 @@ def clean_value(value: Any) -> Any:
         cleaned_numeric_candidate = clean_numeric_string(value)
         # A simple heuristic: if it changed significantly and now looks like a number, it might be numeric
         # A more robust check would involve trying to parse as float/int
-        if cleaned_numeric_candidate != value and re.match(r"^-?\d*\.?\d+$", cleaned_numeric_candidate):
+        if cleaned_numeric_candidate != value and NUMERIC_RE.match(cleaned_numeric_candidate):
             value = cleaned_numeric_candidate
         else:
             # If not obviously numeric after cleaning, try date standardization
             value = standardize_date_string(value) # Placeholder for now
     return value
 
+# Column-wise cleaning
+# Each transform below gives exactly the same result as clean_value() for any string; the detected
+# column kind only decides which checks run first, so a wrong guess costs speed, never correctness.
+
+def _normalize_whitespace(value: str) -> str:
+    # Equivalent to trim_whitespace(): str.split() splits on the same Unicode whitespace as \s
+    return " ".join(value.split())
+
+def _clean_currency_cell(value: str) -> str:
+    value = _normalize_whitespace(value)
+    candidate = value.replace("$", "").replace(",", "")
+    if candidate != value and NUMERIC_RE.match(candidate):
+        return candidate
+    return standardize_date_string(value)
+
+def _clean_numeric_cell(value: str) -> str:
+    if NUMERIC_RE.match(value) and not value[-1].isspace():
+        return value # Already a clean number: nothing to trim or strip
+    return _clean_currency_cell(value)
+
+def _clean_text_cell(value: str) -> str:
+    value = _normalize_whitespace(value)
+    if "$" in value or "," in value:
+        return _clean_currency_cell(value)
+    return standardize_date_string(value)
+
+COLUMN_TRANSFORMS: Dict[str, Callable[[str], str]] = {
+    "numeric": _clean_numeric_cell,
+    "currency": _clean_currency_cell,
+    "date": _clean_text_cell, # Dates only need whitespace normalization until standardize_date_string is implemented
+    "text": _clean_text_cell,
+}
+
+def _cell_kind(value: str) -> str:
+    value = _normalize_whitespace(value)
+    if NUMERIC_RE.match(value):
+        return "numeric"
+    if ("$" in value or "," in value) and NUMERIC_RE.match(value.replace("$", "").replace(",", "")):
+        return "currency"
+    if DATE_RE.match(value):
+        return "date"
+    return "text"
+
+def detect_column_kind(values: List[str], sample_size: int = 200) -> Tuple[str, float]:
+    """
+    Detects a column's kind (numeric, currency, date or text) from a sample of its non-empty values.
+    Returns the kind and the sample's distinct-value ratio, used to decide whether to memoize.
+    """
+    sample = [v for v in values[:sample_size * 2] if v][:sample_size]
+    if not sample:
+        return "text", 1.0
+    kind_counts = Counter(_cell_kind(v) for v in sample)
+    kind, count = kind_counts.most_common(1)[0]
+    if kind == "numeric" and kind_counts["currency"]:
+        kind, count = "currency", count + kind_counts["currency"] # e.g. "$950" next to "$1,200"
+    distinct_ratio = len(set(sample)) / len(sample)
+    return (kind if count / len(sample) >= 0.8 else "text"), distinct_ratio
+
+def clean_column(values: List[str]) -> List[str]:
+    """
+    Cleans a whole text column at once.
+    The column kind is detected once and its transform is mapped over all cells; low-cardinality
+    columns (e.g. categories, repeated amounts) go through a bounded LRU so each distinct value is
+    cleaned only once.
+    """
+    kind, distinct_ratio = detect_column_kind(values, settings.CLEANER_SAMPLE_SIZE)
+    transform = COLUMN_TRANSFORMS[kind]
+    if distinct_ratio <= settings.CLEANER_MEMO_MAX_DISTINCT_RATIO:
+        transform = functools.lru_cache(maxsize=settings.CLEANER_MEMO_SIZE)(transform)
+    return list(map(transform, values))
+
+def clean_table(table: ColumnarTable) -> ColumnarTable:
+    """Cleans every text column of a table and infers a numeric dtype where all values allow it."""
+    cleaned_columns = []
+    for column in table.columns:
+        if column.is_numeric:
+            cleaned_columns.append(column)
+            continue
+        cleaned_columns.append(Column(clean_value(column.name), clean_column(column.values)).infer_type())
+    return ColumnarTable(table.name, cleaned_columns, table.skipped_rows)
+
+def clean_table_chunks(chunks: Iterable[ColumnarTable]) -> Iterator[ColumnarTable]:
+    """Lazily cleans a stream of table chunks, yielding one cleaned chunk at a time."""
+    for chunk in chunks:
+        yield clean_table(chunk)
+
+def clean_pages(pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for page in pages:
+        yield {**page, "text": clean_value(page["text"]), "tables": [clean_table(table) for table in page["tables"]]}
+
 async def run_cleaning_agent(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Main function for the Data Cleaner Agent.
@@ -73,18 +177,22 @@ async def run_cleaning_agent(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
     # Clean tables
     if "tables" in cleaned_data and isinstance(cleaned_data["tables"], list):
         cleaned_tables = []
-        for table in cleaned_data["tables"]:
-            if isinstance(table, dict) and "data" in table and isinstance(table["data"], list):
-                cleaned_table_data = []
-                for row in table["data"]:
-                    if isinstance(row, list):
-                        cleaned_row = [clean_value(cell) for cell in row]
-                        cleaned_table_data.append(cleaned_row)
-                cleaned_tables.append({"name": table.get("name", "unknown_table"), "data": cleaned_table_data})
+        for item in cleaned_data["tables"]:
+            table = as_table(item)
+            if isinstance(table, StreamedTable):
+                # Wrap the chunk generator so cleaning happens as the analyzer pulls rows
+                cleaned_header = [clean_value(cell) for cell in table.header]
+                cleaned_tables.append(StreamedTable(table.name, cleaned_header, clean_table_chunks(table.chunks)))
+            elif table is not None:
+                cleaned_tables.append(clean_table(table))
             else:
-                 cleaned_tables.append(table) # Append as is if structure is not as expected
+                 cleaned_tables.append(item) # Append as is if structure is not as expected
         cleaned_data["tables"] = cleaned_tables
 
+    # Streamed PDF pages are cleaned as the analyzer pulls them
+    if isinstance(cleaned_data.get("pages"), StreamedPages):
+        cleaned_data["pages"] = StreamedPages(clean_pages(cleaned_data["pages"].pages), cleaned_data["pages"].summary)
+
     # Clean key_fields
     if "key_fields" in cleaned_data and isinstance(cleaned_data["key_fields"], dict):
         cleaned_key_fields = {}
@@ -0,0 +1,206 @@
+# Single-pass column statistics used by the Data Analyzer Agent
+import math
+import random
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+Number = Union[int, float]
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch (a compact KLL variant).
+    Values are exact until `k` values have been seen; after that, sorted buffers are compacted
+    level by level so memory stays O(k) regardless of the number of values.
+    """
+
+    def __init__(self, k: int = 256, seed: int = 0):
+        self.k = max(8, k)
+        self.count = 0
+        self.compactors: List[List[Number]] = [[]]
+        self._rng = random.Random(seed) # Seeded so repeated runs over the same data agree
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, value: Number) -> None:
+        self.compactors[0].append(value)
+        self.count += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_many(self, values: Union[Sequence[Number], np.ndarray]) -> None:
+        """Same as update() per value: level 0 is filled and compacted in slices, so memory stays O(k)."""
+        start = 0
+        while start < len(values):
+            end = start + max(1, self._capacity(0) - len(self.compactors[0]))
+            chunk = values[start:end]
+            self.compactors[0].extend(chunk.tolist() if isinstance(chunk, np.ndarray) else chunk)
+            self.count += len(chunk)
+            start += len(chunk)
+            if len(self.compactors[0]) >= self._capacity(0):
+                self._compress()
+
+    def _compress(self) -> None:
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+            buf = sorted(self.compactors[level])
+            leftover = [buf.pop()] if len(buf) % 2 else [] # Keep weights exact on odd lengths
+            self.compactors[level + 1].extend(buf[self._rng.randint(0, 1)::2])
+            self.compactors[level] = leftover
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Returns the q-quantile (0 <= q <= 1), linearly interpolated while the sketch is still exact."""
+        if self.count == 0:
+            return None
+        if len(self.compactors) == 1:
+            values = sorted(self.compactors[0])
+            pos = q * (len(values) - 1)
+            lower = int(math.floor(pos))
+            upper = min(lower + 1, len(values) - 1)
+            return values[lower] + (values[upper] - values[lower]) * (pos - lower)
+        weighted = sorted(
+            (value, 1 << level)
+            for level, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+class TopValueCounter:
+    """
+    Bounded frequency counter (Misra-Gries).
+    Counts are exact while a column has at most `capacity` distinct values; beyond that,
+    the most frequent values are kept and their counts become lower bounds.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(1, capacity)
+        self.counts: Dict[str, int] = {}
+
+    def add(self, value: str) -> None:
+        if value in self.counts:
+            self.counts[value] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = 1
+        else:
+            # Decrement every counter instead of admitting the new value
+            for key in list(self.counts):
+                self.counts[key] -= 1
+                if self.counts[key] == 0:
+                    del self.counts[key]
+
+    def most_common(self, n: int) -> Dict[str, int]:
+        # sorted() is stable, so ties keep first-seen order
+        return dict(sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n])
+
+class ColumnAccumulator:
+    """
+    Accumulates statistics for one table column in a single pass:
+    count, sum, min, max, Welford mean/variance, a quantile sketch for numeric values
+    and a bounded frequency table for text values.
+    """
+
+    HEAD_SIZE = 10 # Leading values kept for visualization data
+
+    def __init__(self, sketch_size: int = 256, top_values_capacity: int = 1000):
+        self.count = 0
+        self.sum: Number = 0
+        self.min: Optional[Number] = None
+        self.max: Optional[Number] = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.quantiles = QuantileSketch(sketch_size)
+        self.text_values = TopValueCounter(top_values_capacity)
+        self.text_count = 0
+        self.head: List[Any] = []
+        self.numeric_head: List[Number] = []
+
+    def add(self, value: Any) -> None:
+        if len(self.head) < self.HEAD_SIZE:
+            self.head.append(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.add_number(value)
+        elif isinstance(value, str):
+            self.text_count += 1
+            self.text_values.add(value)
+
+    def add_number(self, value: Number) -> None:
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        self.quantiles.update(value)
+        if len(self.numeric_head) < self.HEAD_SIZE:
+            self.numeric_head.append(value)
+
+    def add_column(self, column: Any) -> None:
+        """Adds a numeric columnar.Column in bulk (nulls are skipped)."""
+        if len(self.head) < self.HEAD_SIZE:
+            self.head.extend(column.to_list(self.HEAD_SIZE - len(self.head)))
+        self.add_numbers(column.non_null_values())
+
+    def add_numbers(self, values: np.ndarray) -> None:
+        """Vectorized update with a NumPy array, merged into the running moments (Chan et al.)."""
+        n = len(values)
+        if not n:
+            return
+        if values.dtype.kind == "i" and int(np.abs(values).max()) < (2 ** 63 - 1) // n:
+            chunk_sum = int(values.sum())
+        elif values.dtype.kind == "i":
+            chunk_sum = sum(values.tolist()) # Python ints never overflow
+        else:
+            chunk_sum = float(values.sum())
+        chunk_mean = float(values.mean(dtype=np.float64))
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+
+        total = self.count + n
+        delta = chunk_mean - self._mean
+        self._m2 += chunk_m2 + delta * delta * self.count * n / total
+        self._mean += delta * n / total
+        self.count = total
+        self.sum += chunk_sum
+        chunk_min, chunk_max = values.min().item(), values.max().item()
+        if self.min is None or chunk_min < self.min:
+            self.min = chunk_min
+        if self.max is None or chunk_max > self.max:
+            self.max = chunk_max
+        self.quantiles.update_many(values)
+        if len(self.numeric_head) < self.HEAD_SIZE:
+            self.numeric_head.extend(values[:self.HEAD_SIZE - len(self.numeric_head)].tolist())
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0
+
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation (same definition as statistics.stdev)."""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0
+
+    def numeric_statistics(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": round(self.mean, 2),
+            "median": round(self.quantiles.quantile(0.5), 2),
+            "p90": round(self.quantiles.quantile(0.9), 2),
+            "p99": round(self.quantiles.quantile(0.99), 2),
+            "min": self.min,
+            "max": self.max,
+            "std_dev": round(self.std_dev, 2),
+        }
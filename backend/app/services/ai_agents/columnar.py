@@ -0,0 +1,223 @@
+# Columnar, typed table representation shared by the Extractor, Cleaner and Analyzer agents
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+NUMERIC_DTYPES = ("int64", "float64")
+
+def _has_leading_zero(value: str) -> bool:
+    # Leading zeros usually mean an identifier (zip code, account number), so keep those as text
+    digits = value.lstrip("+-")
+    return len(digits) > 1 and digits[0] == "0" and digits[1].isdigit()
+
+def _parse_int(value: str) -> Optional[int]:
+    if _has_leading_zero(value):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def _parse_float(value: str) -> Optional[float]:
+    if _has_leading_zero(value):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+class Column:
+    """
+    A single table column.
+    Text columns hold a list of str. Numeric columns hold a NumPy int64/float64 array plus a
+    boolean null mask (True = empty cell); masked slots contain 0 and are ignored by statistics.
+    """
+    __slots__ = ("name", "dtype", "values", "null_mask")
+
+    def __init__(self, name: str, values: Union[List[str], np.ndarray], dtype: str = "str", null_mask: Optional[np.ndarray] = None):
+        self.name = name
+        self.dtype = dtype
+        self.values = values
+        self.null_mask = null_mask
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.dtype in NUMERIC_DTYPES
+
+    def infer_type(self) -> "Column":
+        """
+        Returns a numeric column if every non-empty value parses as an int (or float),
+        otherwise returns self unchanged. Mixed columns, and columns with a value such as "02134"
+        (leading zero), stay text.
+        """
+        if self.is_numeric or not self.values:
+            return self
+        null_mask = np.fromiter((v == "" for v in self.values), dtype=bool, count=len(self.values))
+        if null_mask.all():
+            return self
+        for dtype, parse in (("int64", _parse_int), ("float64", _parse_float)):
+            parsed = []
+            for value, is_null in zip(self.values, null_mask):
+                number = 0 if is_null else parse(value)
+                if number is None:
+                    break
+                parsed.append(number)
+            else:
+                try:
+                    return Column(self.name, np.array(parsed, dtype=dtype), dtype, null_mask)
+                except OverflowError:
+                    return self # Integers beyond int64 stay text; the analyzer converts them per cell
+        return self
+
+    def non_null_values(self) -> np.ndarray:
+        """Numeric values without the masked (empty) cells."""
+        if self.null_mask is None or not self.null_mask.any():
+            return self.values
+        return self.values[~self.null_mask]
+
+    def to_list(self, limit: Optional[int] = None) -> List[Any]:
+        """Plain Python values (empty cells as ""), e.g. for JSON serialization."""
+        if not self.is_numeric:
+            return list(self.values[:limit])
+        values = self.values[:limit].tolist()
+        if self.null_mask is not None:
+            for idx in np.flatnonzero(self.null_mask[:limit]):
+                values[idx] = ""
+        return values
+
+class ColumnarTable:
+    """
+    A table stored column by column. Rows whose length does not match the header are
+    dropped on construction and only counted in skipped_rows.
+    """
+    __slots__ = ("name", "columns", "skipped_rows")
+
+    def __init__(self, name: str, columns: List[Column], skipped_rows: int = 0):
+        self.name = name
+        self.columns = columns
+        self.skipped_rows = skipped_rows
+
+    @property
+    def header(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    @classmethod
+    def from_rows(cls, name: str, header: Sequence[str], rows: Iterable[Sequence[str]], chunk_rows: int = 5000) -> "ColumnarTable":
+        """Builds a text table from an iterable of rows without holding more than chunk_rows rows at once."""
+        width = len(header)
+        column_values: List[List[str]] = [[] for _ in header]
+        skipped_rows = 0
+        chunk: List[Sequence[str]] = []
+
+        def flush():
+            # zip(*rows) transposes a chunk in C instead of appending cell by cell
+            for values, transposed in zip(column_values, zip(*chunk)):
+                values.extend(transposed)
+            chunk.clear()
+
+        for row in rows:
+            if len(row) != width:
+                skipped_rows += 1
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                flush()
+        flush()
+        columns = [Column(column_name, values) for column_name, values in zip(header, column_values)]
+        return cls(name, columns, skipped_rows)
+
+    @classmethod
+    def from_json(cls, table: Dict[str, Any]) -> "ColumnarTable":
+        """Builds a table from the persisted {"name": ..., "data": [header, *rows]} format."""
+        data = table.get("data") or [[]]
+        rows = ([str(cell) for cell in row] for row in data[1:] if isinstance(row, list))
+        return cls.from_rows(table.get("name", "unknown_table"), [str(h) for h in data[0]], rows)
+
+    def iter_rows(self) -> Iterator[List[Any]]:
+        return (list(row) for row in zip(*(column.to_list() for column in self.columns)))
+
+    def to_json(self) -> Dict[str, Any]:
+        """Converts to the persisted {"name": ..., "data": [header, *rows]} format."""
+        return {"name": self.name, "data": [self.header, *self.iter_rows()]}
+
+class StreamedTable:
+    """
+    A table too large to hold in memory: the header is known up front and the rows arrive
+    as a generator of ColumnarTable chunks, which can be consumed only once.
+    """
+    __slots__ = ("name", "header", "chunks")
+
+    def __init__(self, name: str, header: List[str], chunks: Iterator[ColumnarTable]):
+        self.name = name
+        self.header = header
+        self.chunks = chunks
+
+    def to_json(self) -> Dict[str, Any]:
+        # The rows were consumed by the pipeline; only metadata is persisted
+        return {"name": self.name, "header": self.header, "streamed": True}
+
+class StreamedPages:
+    """
+    A PDF too large to hold in memory: its pages arrive as a generator of {"page", "text", "tables"}
+    dicts (tables are ColumnarTables), which can be consumed only once. summary is the document's
+    pdf_pages summary, complete once the pages have been consumed.
+    """
+    __slots__ = ("pages", "summary")
+
+    def __init__(self, pages: Iterator[Dict[str, Any]], summary: Dict[str, Any]):
+        self.pages = pages
+        self.summary = summary
+
+    def to_json(self) -> Dict[str, Any]:
+        # The pages were consumed by the pipeline; only a marker is persisted
+        return {"streamed": True}
+
+def as_table(item: Any) -> Optional[Union[ColumnarTable, StreamedTable]]:
+    """Returns item as a columnar table, converting the legacy dict format; None if it is not a table."""
+    if isinstance(item, (ColumnarTable, StreamedTable)):
+        return item
+    if isinstance(item, dict) and isinstance(item.get("data"), list) and item["data"]:
+        return ColumnarTable.from_json(item)
+    return None
+
+def stage_output_to_json(stage_output: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns a JSON-serializable copy of an extraction/cleaning output.
+    This is the only place tables are converted back to lists of rows (the persistence boundary).
+    """
+    persisted = dict(stage_output)
+    persisted["tables"] = [
+        table.to_json() if isinstance(table, (ColumnarTable, StreamedTable)) else table
+        for table in stage_output.get("tables", [])
+    ]
+    if isinstance(stage_output.get("pages"), StreamedPages):
+        persisted["pages"] = stage_output["pages"].to_json()
+    return persisted
+
+def stage_output_from_json(stage_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inverse of stage_output_to_json for checkpointed outputs: tables become typed ColumnarTables
+    again (column types are re-inferred, as the cleaner does), so later stages see the same input.
+    """
+    restored = dict(stage_json)
+    tables = []
+    for item in stage_json.get("tables", []):
+        table = as_table(item)
+        if isinstance(table, ColumnarTable):
+            table = ColumnarTable(table.name, [column.infer_type() for column in table.columns], table.skipped_rows)
+        tables.append(table if table is not None else item)
+    restored["tables"] = tables
+    return restored
+
+def has_streamed_tables(stage_output: Dict[str, Any]) -> bool:
+    """Whether a stage output has streamed tables or pages (which cannot be checkpointed)."""
+    if isinstance(stage_output.get("pages"), StreamedPages):
+        return True
+    return any(isinstance(table, StreamedTable) for table in stage_output.get("tables", []))
@@ -1,78 +1,225 @@
 # AI Agent: Data Extractor
+import asyncio
 import os
+import io
 import csv
 import json
-from typing import Dict, Any, List
+import itertools
+from typing import Dict, Any, List, Iterator, Optional, Tuple, Union
+
+from ...core.config import settings
+from . import pdf_extractor
+from .columnar import ColumnarTable, StreamedPages, StreamedTable
+from .sources import ExtractionSource, as_source
 
 # Placeholder for future LLM integration (e.g., LangChain, OpenAI client)
 # from ....app.core.config import settings
 # import openai
 # openai.api_key = settings.OPENAI_API_KEY
 
-def extract_full_text_from_txt(file_path: str) -> str:
-    """Extracts all text content from a TXT file."""
+def open_text(source: ExtractionSource, newline: Optional[str] = None) -> io.TextIOWrapper:
+    """Opens a source's byte stream as UTF-8 text, decoded incrementally as it is read."""
+    return io.TextIOWrapper(source.open(), encoding="utf-8", newline=newline)
+
+def extract_full_text_from_txt(file_path: Union[str, ExtractionSource]) -> str:
+    """Extracts all text content from a TXT file (a local path or an extraction source)."""
+    source = as_source(file_path)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
+        with open_text(source) as f:
             return f.read()
     except Exception as e:
-        print(f"Error reading TXT file {file_path}: {e}")
+        print(f"Error reading TXT file {source.name}: {e}")
         return ""
 
-def extract_tables_from_csv(file_path: str) -> List[Dict[str, Any]]:
-    """Parses a CSV file and returns its content as a list of tables (in this case, one table)."""
+def extract_tables_from_csv(file_path: Union[str, ExtractionSource]) -> List[ColumnarTable]:
+    """Parses a CSV file and returns its content as a list of tables (in this case, one columnar table)."""
+    source = as_source(file_path)
     tables = []
-    table_data: List[List[str]] = []
     try:
-        with open(file_path, "r", encoding="utf-8", newline="") as f:
+        with open_text(source, newline="") as f:
             reader = csv.reader(f)
-            for row in reader:
-                table_data.append(row)
-        if table_data:
-            tables.append({
-                "name": os.path.basename(file_path),
-                "data": table_data
-            })
+            header = next(reader, None)
+            if header is not None:
+                tables.append(ColumnarTable.from_rows(source.name, header, reader, settings.CSV_STREAM_CHUNK_ROWS))
     except Exception as e:
-        print(f"Error reading CSV file {file_path}: {e}")
+        print(f"Error reading CSV file {source.name}: {e}")
     return tables
 
-async def run_extraction_agent(file_path: str, content_type: str, original_filename: str) -> Dict[str, Any]:
+def iter_csv_chunks(f, reader, name: str, header: List[str], chunk_rows: int) -> Iterator[ColumnarTable]:
+    """Yields rows from an open CSV reader as columnar chunks of at most chunk_rows rows, closing the file when done."""
+    try:
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                break
+            yield ColumnarTable.from_rows(name, header, rows, chunk_rows)
+    finally:
+        f.close()
+
+def stream_table_from_csv(file_path: Union[str, ExtractionSource], chunk_rows: Optional[int] = None) -> Optional[StreamedTable]:
+    """
+    Opens a CSV file for streaming extraction.
+    Returns a table with the header row read eagerly and the remaining rows exposed as a
+    generator of columnar chunks, so only one chunk is held in memory at a time.
+    Returns None if the file is empty or cannot be read.
+    """
+    source = as_source(file_path)
+    chunk_rows = chunk_rows or settings.CSV_STREAM_CHUNK_ROWS
+    try:
+        f = open_text(source, newline="")
+    except Exception as e:
+        print(f"Error opening CSV file {source.name}: {e}")
+        return None
+    reader = csv.reader(f)
+    try:
+        header = next(reader, None)
+    except Exception as e:
+        print(f"Error reading CSV file {source.name}: {e}")
+        header = None
+    if header is None:
+        f.close()
+        return None
+    return StreamedTable(source.name, header, iter_csv_chunks(f, reader, source.name, header, chunk_rows))
+
+def _open_pdf(source: ExtractionSource, pages: Optional[str]) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    The page numbers to extract and the pdf_pages summary to fill: page count, pages requested and
+    extracted, pages OCR'd, pages left without text, failed pages, and whether extraction completed
+    (with the error that stopped it otherwise).
+    """
+    summary = {
+        "page_count": 0, "pages_requested": 0, "pages_extracted": 0, "ocr_pages": [], "pages_without_text": [],
+        "failed_pages": [], "complete": True, "error": None
+    }
+    try:
+        summary["page_count"] = pdf_extractor.page_count(source)
+        page_numbers = pdf_extractor.parse_page_ranges(pages, summary["page_count"])
+    except Exception as e:
+        print(f"Error reading PDF file {source.name}: {e}")
+        summary.update(complete=False, error=f"{type(e).__name__}: {e}")
+        return [], summary
+    if settings.PDF_MAX_PAGES > 0:
+        page_numbers = page_numbers[:settings.PDF_MAX_PAGES]
+    summary["pages_requested"] = len(page_numbers)
+    return page_numbers, summary
+
+def iter_extracted_pages(source: ExtractionSource, page_numbers: List[int], summary: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields {"page", "text", "tables"} per extracted page (tables as ColumnarTables named
+    page_<n>_table_<k>), recording each page in summary. An error that stops the extraction is
+    recorded there too (complete=False), so a truncated document is never taken for a whole one.
+    """
+    try:
+        for page in pdf_extractor.iter_pdf_pages(source, page_numbers):
+            summary["pages_extracted"] += 1
+            if page["ocr"]:
+                summary["ocr_pages"].append(page["page"])
+            if page["error"]:
+                summary["failed_pages"].append(page["page"])
+                print(f"Error extracting page {page['page']} of PDF file {source.name}: {page['error']}")
+            elif not page["text"].strip():
+                summary["pages_without_text"].append(page["page"])
+            tables = [
+                ColumnarTable.from_rows(f"page_{page['page']}_table_{table_idx}", rows[0], rows[1:], settings.CSV_STREAM_CHUNK_ROWS)
+                for table_idx, rows in enumerate(page["tables"], 1)
+            ]
+            yield {"page": page["page"], "text": page["text"], "tables": tables}
+    except Exception as e:
+        print(f"Error reading PDF file {source.name} after {summary['pages_extracted']} pages: {e}")
+        summary.update(complete=False, error=f"{type(e).__name__}: {e}")
+
+def extract_from_pdf(file_path: Union[str, ExtractionSource], pages: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extracts a PDF page by page (see pdf_extractor.py): full_text_content is the list of page texts,
+    tables are named page_<n>_table_<k>, and pdf_pages describes the run (see _open_pdf). pages
+    selects page ranges ("1-5,8,20-"), limited to the first PDF_MAX_PAGES selected pages. Blocking.
+    """
+    source = as_source(file_path)
+    output = {"full_text_content": [], "tables": [], "key_fields": {}}
+    page_numbers, summary = _open_pdf(source, pages)
+    for page in iter_extracted_pages(source, page_numbers, summary):
+        output["full_text_content"].append(page["text"])
+        output["tables"].extend(page["tables"])
+    output["pdf_pages"] = summary
+    return output
+
+def stream_from_pdf(file_path: Union[str, ExtractionSource], pages: Optional[str] = None) -> StreamedPages:
+    """
+    Opens a PDF for streaming extraction: the pages are extracted as the cleaner and analyzer pull
+    them, so only the pages in flight are held in memory (the generator must be drained or closed).
+    Blocking (reads the page count).
+    """
+    source = as_source(file_path)
+    page_numbers, summary = _open_pdf(source, pages)
+    return StreamedPages(iter_extracted_pages(source, page_numbers, summary), summary)
+
+async def run_extraction_agent(
+    file_path: Union[str, ExtractionSource],
+    content_type: str,
+    original_filename: str,
+    streaming: Optional[bool] = None,
+    pages: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Main function for the Data Extractor Agent.
     Orchestrates extraction based on file type.
+    file_path is a local path or a sources.ExtractionSource; stored objects are read as a byte
+    stream straight from storage, without a local copy.
+    If streaming is None, it is enabled for files at or above STREAMING_EXTRACTION_THRESHOLD_BYTES.
+    CSV tables are returned as columnar.ColumnarTable objects; in streaming mode they are
+    columnar.StreamedTable objects and no full_text_content copy of the rows is built.
+    pages selects the page ranges of a PDF (all pages by default, see extract_from_pdf).
     """
-    print(f"Extractor Agent: Processing file {original_filename} ({content_type}) from path {file_path}")
+    source = as_source(file_path)
+    print(f"Extractor Agent: Processing file {original_filename} ({content_type}) from {source.name}")
     
     output_json = {
         "full_text_content": "",
         "tables": [],
         "key_fields": {}
     }
+    if streaming is None:
+        streaming = source.size() >= settings.STREAMING_EXTRACTION_THRESHOLD_BYTES
 
     if content_type == "text/plain":
-        output_json["full_text_content"] = extract_full_text_from_txt(file_path)
+        output_json["full_text_content"] = extract_full_text_from_txt(source)
         # Placeholder for LLM-based key-field extraction from TXT for MVP
         # For example, if it's a simple structured TXT, an LLM could find key-value pairs.
         # output_json["key_fields"] = {"extracted_from_txt_by_llm_placeholder": "value"}
         print(f"Extractor Agent: TXT processing complete for {original_filename}")
 
+    elif content_type == "text/csv" and streaming:
+        # Rows are consumed lazily by the cleaner and analyzer; the generator must be drained
+        # (or closed) by the caller. Joining the rows into full_text_content is skipped because
+        # it would materialize the whole file again.
+        streamed_table = stream_table_from_csv(source)
+        output_json["tables"] = [streamed_table] if streamed_table else []
+        output_json["streaming"] = True
+        print(f"Extractor Agent: CSV streaming extraction prepared for {original_filename}")
+
     elif content_type == "text/csv":
-        output_json["tables"] = extract_tables_from_csv(file_path)
+        output_json["tables"] = extract_tables_from_csv(source)
         # CSVs are primarily tables; full_text_content might be less relevant or a concatenation.
         # For simplicity, we can join all rows to form a basic text representation if needed.
-        if output_json["tables"] and output_json["tables"][0]["data"]:
-            all_rows_text = []
-            for row in output_json["tables"][0]["data"]:
+        if output_json["tables"]:
+            table = output_json["tables"][0]
+            all_rows_text = [",".join(table.header)]
+            for row in table.iter_rows():
                 all_rows_text.append(",".join(row))
             output_json["full_text_content"] = "\n".join(all_rows_text)
         print(f"Extractor Agent: CSV processing complete for {original_filename}")
 
+    elif content_type == "application/pdf" and streaming:
+        # Pages are consumed lazily by the cleaner and analyzer, as streamed CSV rows are;
+        # pdf_pages is added to the extraction results once they have been drained
+        output_json["pages"] = await asyncio.to_thread(stream_from_pdf, source, pages)
+        output_json["streaming"] = True
+        print(f"Extractor Agent: PDF streaming extraction prepared for {original_filename}")
+
     elif content_type == "application/pdf":
-        # Placeholder for PDF processing (Phase 3)
-        output_json["full_text_content"] = f"PDF processing for {original_filename} is not yet implemented (Phase 3)."
-        # output_json["tables"] = [] # Placeholder for PDF table extraction
-        # output_json["key_fields"] = {} # Placeholder for PDF key-field extraction
-        print(f"Extractor Agent: PDF processing placeholder for {original_filename}")
+        # Pages are extracted on the PDF process pool; this thread only collects them in order
+        output_json.update(await asyncio.to_thread(extract_from_pdf, source, pages))
+        print(f"Extractor Agent: PDF processing complete for {original_filename} ({output_json.get('pdf_pages', {}).get('pages_extracted', 0)} pages)")
         
     # Add other file types here (e.g., DOCX, images with OCR - Stretch Goals)
     # elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
@@ -0,0 +1,99 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+# Keyword extraction: term frequencies counted block by block over the text, scored by TF-IDF against
+# the document frequencies of past jobs (services/keyword_index.py), top k picked with a heap.
+
+# Words of 3 to 64 characters starting with a letter; numbers, single letters and longer runs are not keywords
+TOKEN_RE = re.compile(r"\b[^\W\d_]\w{2,63}\b")
+
+STOP_WORDS = frozenset("""
+about above across after again against all almost along already also although always among and another any
+anybody anyone anything anyway anywhere are aren around because been before being below between both but can
+cannot could couldn did didn does doesn doing don done down during each either else enough etc even ever every
+few for from further get gets got had hadn has hasn have haven having her here hers herself him himself his how
+however into isn its itself just least less let like made make makes many may might mine more most much must
+mustn myself near neither never nevertheless next nobody none nor not nothing now nowhere off often once one
+only onto other others otherwise our ours ourselves out over own per perhaps please put rather really said same
+say says see seem seemed seems several shall she should shouldn since some somebody someone something sometimes
+somewhere still such than that the their theirs them themselves then there therefore these they thing things
+this those though through throughout thus together too toward towards under until upon use used uses using very
+via was wasn way well were weren what whatever when whenever where whereas wherever whether which while who
+whoever whole whom whose why will with within without won would wouldn yes yet you your yours yourself
+yourselves
+""".split())
+
+class DocumentFrequencies(Protocol):
+    """Document frequencies of a corpus (see services/keyword_index.DocumentFrequencyIndex)."""
+
+    def lookup(self, terms: Sequence[str]) -> Tuple[int, Dict[str, int]]:
+        """(documents in the corpus, {term: documents containing it}) for the given terms."""
+        ...
+
+    def add_document(self, counts: Dict[str, int]) -> None:
+        """Adds a document, given its term counts, to the corpus."""
+        ...
+
+_BLOCK_CHARS = 1 << 20
+
+def _text_blocks(text: str) -> Iterator[str]:
+    """text in blocks of about _BLOCK_CHARS characters, cut at whitespace so no token is split."""
+    start = 0
+    while start < len(text):
+        end = start + _BLOCK_CHARS
+        if end < len(text):
+            cut = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+            end = cut + 1 if cut > start else end
+        yield text[start:end]
+        start = end
+
+def term_counts(text: str) -> Counter:
+    """
+    Lowercased term counts of text, stop words excluded. The text is tokenized a block at a time,
+    so only one block's lowercased copy and token list exist at once.
+    """
+    counts: Counter = Counter()
+    for block in _text_blocks(text):
+        counts.update(TOKEN_RE.findall(block.lower()))
+    for stop_word in STOP_WORDS.intersection(counts):
+        del counts[stop_word]
+    return counts
+
+def top_terms(counts: Dict[str, int], k: int) -> List[Tuple[str, int]]:
+    """The k most frequent terms (ties broken alphabetically), with a heap instead of sorting the vocabulary."""
+    return heapq.nsmallest(k, counts.items(), key=lambda item: (-item[1], item[0]))
+
+def tfidf_scores(counts: Dict[str, int], documents: int, document_frequencies: Dict[str, int]) -> Dict[str, float]:
+    """
+    Sublinear TF-IDF: (1 + log tf) * (log((1 + N) / (1 + df)) + 1). With an empty corpus every idf
+    is 1 and terms rank by frequency.
+    """
+    return {
+        term: (1 + math.log(count)) * (math.log((1 + documents) / (1 + document_frequencies.get(term, 0))) + 1)
+        for term, count in counts.items()
+    }
+
+def extract_keywords(
+    text: str,
+    num_keywords: int = 5,
+    document_frequencies: Optional[DocumentFrequencies] = None,
+    candidates: int = 1000
+) -> Tuple[List[str], Counter]:
+    """
+    The num_keywords highest-scoring terms of text, and its term counts (for indexing the document).
+    Only the candidates most frequent terms are scored by TF-IDF, which bounds the document-frequency
+    lookup on large documents; without document_frequencies, terms rank by frequency.
+    """
+    counts = term_counts(text)
+    if not counts or num_keywords <= 0:
+        return [], counts
+    if document_frequencies is None:
+        return [term for term, _ in top_terms(counts, num_keywords)], counts
+    pool = dict(top_terms(counts, max(candidates, num_keywords)))
+    documents, frequencies = document_frequencies.lookup(list(pool))
+    scores = tfidf_scores(pool, documents, frequencies)
+    best = heapq.nsmallest(num_keywords, scores.items(), key=lambda item: (-item[1], item[0]))
+    return [term for term, _ in best], counts
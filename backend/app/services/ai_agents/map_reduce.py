@@ -0,0 +1,161 @@
+import asyncio
+import json
+from typing import Awaitable, Dict, Iterable, List, Optional
+
+from ...core.config import settings
+from ..llm_gateway import LLMError, estimate_tokens, get_llm_gateway
+
+# LLM map-reduce over long texts. The text is split into chunks of about LLM_CHUNK_TOKENS tokens,
+# each repeating the last LLM_CHUNK_OVERLAP_TOKENS of the previous one, and all chunks are prompted
+# at once (map); the gateway's concurrency, in-flight token and rate limits, shared by every job of
+# the process, decide how many requests actually run. Partial summaries are then combined in groups
+# of about LLM_REDUCE_GROUP_TOKENS, all groups of a level at once, until one summary is left
+# (reduce): below the rate limits, latency grows with the number of levels (logarithmic in the text
+# length), not with the number of chunks; at them, with the tokens sent. Key fields are merged
+# without a model, in document order.
+
+CHUNK_SUMMARY_TEMPLATE = "chunk_summary"
+SUMMARY_REDUCE_TEMPLATE = "summary_reduce"
+KEY_FIELDS_TEMPLATE = "key_fields"
+
+def token_chunks(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    max_chunks: Optional[int] = None
+) -> List[str]:
+    """
+    The first max_chunks (LLM_MAX_CHUNKS) chunks of text, each of at most max_tokens estimated tokens
+    (LLM_CHUNK_TOKENS) and cut at a paragraph or sentence end where possible; each chunk after the
+    first starts overlap_tokens (LLM_CHUNK_OVERLAP_TOKENS, at most a quarter of a chunk) before the
+    previous one ended.
+    """
+    max_chunks = max_chunks or settings.LLM_MAX_CHUNKS
+    max_chars = max(int((max_tokens or settings.LLM_CHUNK_TOKENS) * settings.LLM_CHARS_PER_TOKEN), 1)
+    overlap = settings.LLM_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_chars = min(int(overlap * settings.LLM_CHARS_PER_TOKEN), max_chars // 4)
+    chunks: List[str] = []
+    start = 0
+    while start < len(text) and len(chunks) < max_chunks:
+        end = start + max_chars
+        if end < len(text):
+            cut = max(text.rfind("\n\n", start, end), text.rfind(". ", start, end))
+            if cut <= start + max_chars // 2: # No sentence end late enough: cut between words
+                cut = text.rfind(" ", start, end)
+            end = cut + 1 if cut > start + max_chars // 2 else end
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap_chars, start + 1)
+        if overlap_chars: # Start the overlap at a word
+            space = text.find(" ", start, end)
+            start = space + 1 if space != -1 else start
+    return chunks
+
+async def _gather(calls: Iterable[Awaitable[str]]) -> List[str]:
+    """Results of calls run concurrently; the first failure cancels the calls still running."""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _length_header(max_chars: int) -> str:
+    return f"Length: {max_chars} characters\n\n"
+
+def _output_tokens(max_chars: int) -> int:
+    """max_tokens for an answer of max_chars characters, with headroom (the model counts tokens, not characters)."""
+    return min(settings.LLM_MAX_OUTPUT_TOKENS, int(max_chars / settings.LLM_CHARS_PER_TOKEN * 1.5) + 16)
+
+def _truncate(summary: str, max_chars: int) -> str:
+    """summary cut to max_chars, after its last sentence end within that length if there is one."""
+    summary = summary.strip()
+    if len(summary) <= max_chars:
+        return summary
+    cut = summary.rfind(". ", 0, max_chars)
+    return summary[:cut + 1] if cut > 0 else summary[:max_chars]
+
+def _groups(summaries: List[str], group_tokens: int) -> List[List[str]]:
+    """Consecutive summaries grouped within group_tokens estimated tokens (at least two per group)."""
+    groups: List[List[str]] = []
+    group: List[str] = []
+    tokens = 0
+    for summary in summaries:
+        summary_tokens = estimate_tokens(summary)
+        if len(group) >= 2 and tokens + summary_tokens > group_tokens:
+            groups.append(group)
+            group, tokens = [], 0
+        group.append(summary)
+        tokens += summary_tokens
+    if len(group) == 1 and groups: # A last summary on its own joins the previous group
+        groups[-1].append(group[0])
+    elif group:
+        groups.append(group)
+    return groups
+
+async def summarize(text: str, max_chars: Optional[int] = None, chunks: Optional[List[str]] = None) -> str:
+    """
+    Abstractive summary of text of at most max_chars (SUMMARY_MAX_CHARS) characters, by map-reduce
+    over token_chunks(text) (or the given chunks). Raises LLMError if a request fails.
+    """
+    max_chars = max_chars or settings.SUMMARY_MAX_CHARS
+    chunks = chunks if chunks is not None else token_chunks(text)
+    if not chunks:
+        return ""
+    gateway = get_llm_gateway()
+    partial_chars = min(settings.LLM_PARTIAL_SUMMARY_CHARS, max_chars) if len(chunks) > 1 else max_chars
+    max_tokens = _output_tokens(partial_chars)
+    summaries = await _gather(
+        gateway.complete(CHUNK_SUMMARY_TEMPLATE, _length_header(partial_chars) + chunk, max_tokens=max_tokens)
+        for chunk in chunks
+    )
+    while len(summaries) > 1:
+        groups = _groups(summaries, settings.LLM_REDUCE_GROUP_TOKENS)
+        level_chars = max_chars if len(groups) == 1 else partial_chars
+        max_tokens = _output_tokens(level_chars)
+        summaries = await _gather(
+            gateway.complete(
+                SUMMARY_REDUCE_TEMPLATE,
+                _length_header(level_chars) + "\n\n".join(f"## Part {n}\n\n{summary}" for n, summary in enumerate(group, 1)),
+                max_tokens=max_tokens
+            )
+            for group in groups
+        )
+    return _truncate(summaries[0], max_chars)
+
+def _parse_key_fields(answer: str) -> Dict[str, str]:
+    """The key fields of a key_fields answer ({} unless it is a JSON object)."""
+    answer = answer.strip()
+    if answer.startswith("```"): # A fenced code block despite the instructions
+        answer = answer.strip("`").partition("\n")[2]
+    try:
+        fields = json.loads(answer)
+    except ValueError:
+        return {}
+    if not isinstance(fields, dict):
+        return {}
+    return {str(key).strip(): str(value).strip() for key, value in fields.items() if str(key).strip() and value not in (None, "")}
+
+async def extract_key_fields(text: str, chunks: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Key-value pairs stated in text, found per chunk of token_chunks(text) (or the given chunks) and
+    merged in document order: the first value of a key wins. Chunks whose request fails are skipped.
+    """
+    chunks = chunks if chunks is not None else token_chunks(text)
+    answers = await asyncio.gather(
+        *(get_llm_gateway().complete(KEY_FIELDS_TEMPLATE, chunk) for chunk in chunks),
+        return_exceptions=True
+    )
+    fields: Dict[str, str] = {}
+    for answer in answers:
+        if isinstance(answer, LLMError):
+            print(f"Key field extraction failed for a chunk: {answer}")
+            continue
+        if isinstance(answer, BaseException):
+            raise answer
+        for key, value in _parse_key_fields(answer).items():
+            fields.setdefault(key, value)
+    return fields
@@ -0,0 +1,188 @@
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pdfplumber
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import dict_value, list_value, resolve1
+from pdfminer.psparser import LIT
+
+from ...core.config import settings
+from .sources import ExtractionSource
+
+try:
+    import pytesseract
+except ImportError: # Optional: without it (and the tesseract binary), pages without a text layer stay empty
+    pytesseract = None
+
+# Page-level PDF extraction. Pages are extracted in tasks of PDF_PAGES_PER_TASK pages on a process
+# pool (PDF_PROCESS_POOL_SIZE); each task opens the document itself through source.open_seekable(),
+# so only the objects its pages need are read (ranged reads for stored objects), never the whole
+# file. Results are yielded in page order as soon as the next pages are done, with a bounded
+# number of tasks ahead, so memory does not grow with the page count. A page's text layer is used
+# when it has one; only pages without one are rendered and OCR'd.
+
+PAGE_TASKS_AHEAD = 2 # Tasks submitted per pool process beyond the one being consumed
+_PAGE, _PAGES = LIT("Page"), LIT("Pages")
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool() -> Optional[ProcessPoolExecutor]:
+    """The page extraction pool, or None when disabled or when this process may not have children."""
+    global _pdf_pool
+    if settings.PDF_PROCESS_POOL_SIZE <= 1 or multiprocessing.current_process().daemon: # e.g. a Celery prefork child
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_PROCESS_POOL_SIZE, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_pool
+
+def page_count(source: ExtractionSource) -> int:
+    """Number of pages, from the page tree's root (the pages themselves are not read)."""
+    with source.open_seekable() as f:
+        document = PDFDocument(PDFParser(f))
+        return int(resolve1(resolve1(document.catalog["Pages"])["Count"]))
+
+def parse_page_ranges(spec: Optional[str], count: int) -> List[int]:
+    """
+    1-based page numbers selected by spec, e.g. "1-5,8,20-" (open-ended ranges run to the last
+    page), in order and within 1..count; all pages if spec is empty. Raises ValueError.
+    """
+    if not spec or not spec.strip():
+        return list(range(1, count + 1))
+    selected = set()
+    for part in spec.split(","):
+        first, separator, last = part.strip().partition("-")
+        try:
+            start = int(first) if first.strip() else 1
+            end = (int(last) if last.strip() else count) if separator else start
+        except ValueError:
+            raise ValueError(f"Invalid page range '{part.strip()}' in '{spec}'")
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range '{part.strip()}' in '{spec}'")
+        selected.update(range(start, min(end, count) + 1))
+    return sorted(selected)
+
+def _find_pages(document: PDFDocument, page_numbers: Sequence[int]) -> Optional[Dict[int, PDFPage]]:
+    """
+    The pages page_numbers (1-based), found by descending the page tree with the /Count of its
+    nodes, so a task reads its own pages rather than every page before them. None if the tree
+    is not what its counts claim (the caller then walks it page by page).
+    """
+    wanted = sorted(set(page_numbers))
+    found: Dict[int, PDFPage] = {}
+
+    def node_of(ref: Any, parent: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        node = dict_value(ref).copy()
+        for name in PDFPage.INHERITABLE_ATTRS:
+            if name not in node and name in parent:
+                node[name] = parent[name]
+        return getattr(ref, "objid", None), node
+
+    def visit(ref: Any, parent: Dict[str, Any], first: int) -> int:
+        """Adds the wanted pages under ref, whose first page is number first; returns its page count."""
+        objid, node = node_of(ref, parent)
+        if node.get("Type") is _PAGE:
+            if first in wanted:
+                found[first] = PDFPage(document, objid, node, None)
+            return 1
+        if node.get("Type") is not _PAGES:
+            raise ValueError("Unexpected page tree node")
+        kids = list_value(node.get("Kids", []))
+        count = int(resolve1(node.get("Count", 0)))
+        if not any(first <= number < first + count for number in wanted):
+            return count
+        if count == len(kids): # Every kid is a page: go straight to the wanted ones
+            for number in wanted:
+                if first <= number < first + count and visit(kids[number - first], node, number) != 1:
+                    raise ValueError("Page count mismatch")
+            return count
+        number = first
+        for kid in kids:
+            number += visit(kid, node, number)
+        if number - first != count:
+            raise ValueError("Page count mismatch")
+        return count
+
+    try:
+        visit(document.catalog["Pages"], document.catalog, 1)
+    except Exception:
+        return None
+    return found if len(found) == len(wanted) else None
+
+def _open_pages(pdf: Any, page_numbers: Sequence[int]) -> List[Any]:
+    """pdfplumber pages for page_numbers of an open document."""
+    found = _find_pages(pdf.doc, page_numbers)
+    if found is None:
+        return [page for page in pdf.pages if page.page_number in set(page_numbers)]
+    return [pdfplumber.page.Page(pdf, found[number], page_number=number) for number in page_numbers]
+
+def _table_rows(table: List[List[Optional[str]]]) -> List[List[str]]:
+    """A pdfplumber table as rows of strings, padded to the widest row (merged cells come back as None)."""
+    width = max((len(row) for row in table), default=0)
+    return [[(cell or "").strip() for cell in row] + [""] * (width - len(row)) for row in table]
+
+def _ocr(page: Any) -> str:
+    image = page.to_image(resolution=settings.PDF_OCR_DPI).original
+    return pytesseract.image_to_string(image, lang=settings.PDF_OCR_LANGUAGE)
+
+def extract_pages(source: ExtractionSource, page_numbers: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    Pool task: {"page", "text", "tables" (lists of rows, header first), "ocr", "error"} for each of
+    page_numbers (1-based). A page that fails is returned empty with its error.
+    """
+    results = []
+    with source.open_seekable() as f, pdfplumber.open(f) as pdf:
+        for page_number, page in zip(page_numbers, _open_pages(pdf, page_numbers)):
+            result: Dict[str, Any] = {"page": page_number, "text": "", "tables": [], "ocr": False, "error": None}
+            try:
+                result["text"] = page.extract_text() or ""
+                if settings.PDF_EXTRACT_TABLES:
+                    result["tables"] = [rows for rows in map(_table_rows, page.extract_tables()) if len(rows) > 1]
+                if (
+                    settings.PDF_OCR and pytesseract is not None and page.images
+                    and len(result["text"].strip()) < settings.PDF_OCR_MIN_CHARS
+                ): # No text layer: a scanned page
+                    result["text"] = _ocr(page)
+                    result["ocr"] = True
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                page.close() # Drops the page's parsed objects
+            results.append(result)
+    return results
+
+def iter_pdf_pages(source: ExtractionSource, page_numbers: Sequence[int]) -> Iterator[Dict[str, Any]]:
+    """
+    extract_pages() results for page_numbers, in order, yielded as soon as the next task is done.
+    Runs the tasks on the pool when there is one, keeping PAGE_TASKS_AHEAD tasks per process queued.
+    """
+    per_task = max(settings.PDF_PAGES_PER_TASK, 1)
+    tasks = (page_numbers[i:i + per_task] for i in range(0, len(page_numbers), per_task))
+    pool = _get_pdf_pool() if len(page_numbers) > per_task else None
+    if pool is None:
+        for task in tasks:
+            yield from extract_pages(source, task)
+        return
+    pending: Deque[Future] = deque(
+        pool.submit(extract_pages, source, task)
+        for task in itertools.islice(tasks, settings.PDF_PROCESS_POOL_SIZE * (1 + PAGE_TASKS_AHEAD))
+    )
+    try:
+        while pending:
+            results = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(extract_pages, source, task))
+            yield from results
+    finally: # Stopped early (an error, or the consumer closed the generator)
+        for future in pending:
+            future.cancel()
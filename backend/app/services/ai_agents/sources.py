@@ -0,0 +1,93 @@
+# Input sources for the Data Extractor Agent
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, ContextManager, Iterator, Optional, Union
+
+from ...core.config import settings
+from ..storage import RangeReader, get_storage_backend
+
+class ExtractionSource:
+    """
+    Where the extractor reads a file from.
+    Parsers read sequentially through open(); formats that need random access use open_seekable()
+    (ranged reads for stored objects), and only parsers that need a real file path use local_path(),
+    which may spill the content to disk.
+    """
+
+    name: str
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def open(self) -> BinaryIO:
+        raise NotImplementedError
+
+    def open_seekable(self) -> BinaryIO:
+        raise NotImplementedError
+
+    def local_path(self) -> ContextManager[str]:
+        """Context manager yielding a local file path with the content."""
+        raise NotImplementedError
+
+class LocalFileSource(ExtractionSource):
+    """A file that is already on local disk."""
+
+    def __init__(self, path: str, name: Optional[str] = None):
+        self.path = path
+        self.name = name or os.path.basename(path)
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    def open_seekable(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    @contextmanager
+    def local_path(self) -> Iterator[str]:
+        yield self.path
+
+class StorageObjectSource(ExtractionSource):
+    """
+    An object in the configured storage backend, read directly without a local copy.
+    Only the object name is kept, so the source can be sent to a pipeline worker process.
+    """
+
+    def __init__(self, object_name: str, name: Optional[str] = None):
+        self.object_name = object_name
+        self.name = name or os.path.basename(object_name)
+        self._size: Optional[int] = None
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = get_storage_backend().size(self.object_name)
+        return self._size
+
+    def open(self) -> BinaryIO:
+        return get_storage_backend().open_stream(self.object_name)
+
+    def open_seekable(self) -> BinaryIO:
+        reader = RangeReader(get_storage_backend(), self.object_name, self.size())
+        return io.BufferedReader(reader, buffer_size=settings.STORAGE_RANGE_READ_SIZE)
+
+    @contextmanager
+    def local_path(self) -> Iterator[str]:
+        """Spills the object to EXTRACTION_SPILL_DIR for the duration of the block."""
+        os.makedirs(settings.EXTRACTION_SPILL_DIR, exist_ok=True)
+        suffix = os.path.splitext(self.name)[1]
+        fd, path = tempfile.mkstemp(dir=settings.EXTRACTION_SPILL_DIR, suffix=suffix)
+        os.close(fd)
+        try:
+            get_storage_backend().get_to_file(self.object_name, path)
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+def as_source(source: Union[str, ExtractionSource]) -> ExtractionSource:
+    """Accepts a local file path for backward compatibility."""
+    return LocalFileSource(source) if isinstance(source, str) else source
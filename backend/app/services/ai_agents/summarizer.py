@@ -0,0 +1,177 @@
+import heapq
+import math
+import multiprocessing
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ...core.config import settings
+from .keywords import STOP_WORDS, TOKEN_RE
+
+# Extractive summaries: sentences scored by cosine similarity of their TF-IDF term vectors to the
+# document's centroid (its most characteristic terms). The text is scored in chunks of about
+# SUMMARY_CHUNK_CHARS (map), each returning its best candidate sentences plus term statistics, so the
+# work is linear in the document size; the candidates are then re-scored against the whole
+# document's centroid and picked without near-duplicates (reduce). Chunks run in a process pool
+# with SUMMARY_PROCESS_POOL_SIZE > 1, and only those finished within the time budget are used.
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+MIN_SENTENCE_TERMS = 4 # Shorter sentences (headings, list fragments) are never picked
+MAX_SENTENCE_CHARS = 600 # Longer "sentences" are usually tables or runs without punctuation
+CENTROID_TERMS = 100 # The centroid keeps only the document's most characteristic terms
+REDUNDANCY_THRESHOLD = 0.5 # A candidate this similar to a picked sentence is skipped
+
+_summary_pool: Optional[ProcessPoolExecutor] = None
+_summary_pool_lock = threading.Lock()
+
+def _get_summary_pool() -> Optional[ProcessPoolExecutor]:
+    """The chunk scoring pool, or None when disabled or when this process may not have children."""
+    global _summary_pool
+    if settings.SUMMARY_PROCESS_POOL_SIZE <= 1 or multiprocessing.current_process().daemon: # e.g. a Celery prefork child
+        return None
+    with _summary_pool_lock:
+        if _summary_pool is None:
+            _summary_pool = ProcessPoolExecutor(
+                max_workers=settings.SUMMARY_PROCESS_POOL_SIZE, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _summary_pool
+
+def _chunks(text: str, chunk_chars: int) -> Iterator[str]:
+    """text in pieces of about chunk_chars characters, cut after a sentence end or line break where possible."""
+    start = 0
+    while start < len(text):
+        end = start + chunk_chars
+        if end < len(text):
+            cut = max(text.rfind(". ", start, end), text.rfind("\n", start, end))
+            end = cut + 1 if cut > start else end
+        yield text[start:end]
+        start = end
+
+def _terms(sentence: str) -> Counter:
+    counts = Counter(TOKEN_RE.findall(sentence.lower()))
+    for stop_word in STOP_WORDS.intersection(counts):
+        del counts[stop_word]
+    return counts
+
+def _idf(documents: int, document_frequencies: Dict[str, int]) -> Dict[str, float]:
+    return {term: math.log(documents / frequency) + 1 for term, frequency in document_frequencies.items()}
+
+def _weights(counts: Dict[str, int], idf: Dict[str, float]) -> Dict[str, float]:
+    return {term: count * idf[term] for term, count in counts.items()}
+
+def _norm(vector: Dict[str, float]) -> float:
+    return math.sqrt(sum(weight * weight for weight in vector.values()))
+
+def _centroid(totals: Dict[str, int], idf: Dict[str, float]) -> Dict[str, float]:
+    return dict(heapq.nlargest(CENTROID_TERMS, _weights(totals, idf).items(), key=lambda item: item[1]))
+
+def _cosine(vector: Dict[str, float], other: Dict[str, float], other_norm: float) -> float:
+    dot = sum(weight * other[term] for term, weight in vector.items() if term in other)
+    return dot / (_norm(vector) * other_norm) if dot else 0.0
+
+def score_chunk(chunk: str, candidates: int) -> Dict[str, Any]:
+    """
+    Map step (runs in the pool): the chunk's candidates best sentences by similarity to the chunk's
+    own centroid, as (position, sentence, term counts), and the term statistics the reduce step
+    needs: sentence count, per-term sentence frequencies and term totals.
+    """
+    sentences: List[Tuple[int, str, Counter]] = []
+    sentence_terms: List[str] = [] # Distinct terms of every sentence, counted once at the end
+    count = 0
+    for position, sentence in enumerate(SENTENCE_SPLIT_RE.split(chunk)):
+        sentence = " ".join(sentence.split())
+        counts = _terms(sentence)
+        if not counts:
+            continue
+        count += 1
+        sentence_terms.extend(counts)
+        if len(counts) >= MIN_SENTENCE_TERMS and len(sentence) <= MAX_SENTENCE_CHARS:
+            sentences.append((position, sentence, counts))
+    document_frequencies = Counter(sentence_terms)
+    totals = _terms(chunk)
+    idf = _idf(count, document_frequencies)
+    centroid = _centroid(totals, idf)
+    centroid_norm = _norm(centroid)
+    best = heapq.nlargest(candidates, sentences, key=lambda item: _cosine(_weights(item[2], idf), centroid, centroid_norm))
+    return {"candidates": best, "sentences": count, "document_frequencies": document_frequencies, "totals": totals}
+
+def _lead(text: str, max_sentences: int, max_chars: int) -> str:
+    """Fallback: the first sentences of the text."""
+    picked: List[str] = []
+    for sentence in SENTENCE_SPLIT_RE.split(text[:max_chars * 4]):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(picked) >= max_sentences or len(" ".join(picked + [sentence])) > max_chars:
+            break
+        picked.append(sentence)
+    return " ".join(picked) or text[:max_chars]
+
+def summarize(
+    text: str,
+    max_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    time_budget: Optional[float] = None
+) -> str:
+    """
+    Extractive summary of text: up to max_sentences whole sentences, in document order, at most
+    max_chars long (defaults: SUMMARY_MAX_SENTENCES, SUMMARY_MAX_CHARS). Chunks not scored within
+    time_budget seconds (SUMMARY_TIME_BUDGET_SECONDS) are left out; if none was, the summary is the
+    text's first sentences.
+    """
+    max_sentences = max_sentences or settings.SUMMARY_MAX_SENTENCES
+    max_chars = max_chars or settings.SUMMARY_MAX_CHARS
+    deadline = time.monotonic() + (settings.SUMMARY_TIME_BUDGET_SECONDS if time_budget is None else time_budget)
+    candidates = max_sentences * 3
+    chunks = list(_chunks(text, settings.SUMMARY_CHUNK_CHARS))
+    pool = _get_summary_pool() if len(chunks) > 1 else None
+
+    results: List[Tuple[int, Dict[str, Any]]] = []
+    if pool is not None:
+        futures = {pool.submit(score_chunk, chunk, candidates): index for index, chunk in enumerate(chunks)}
+        done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+        for future in not_done:
+            future.cancel()
+        results = [(futures[future], future.result()) for future in done if future.exception() is None]
+    else:
+        for index, chunk in enumerate(chunks):
+            if index and time.monotonic() >= deadline:
+                break
+            results.append((index, score_chunk(chunk, candidates)))
+    if not results:
+        return _lead(text, max_sentences, max_chars)
+
+    # Reduce: re-score every chunk's candidates against the whole document's centroid
+    documents = sum(result["sentences"] for _, result in results) or 1
+    document_frequencies: Counter = Counter()
+    totals: Counter = Counter()
+    for _, result in results:
+        document_frequencies.update(result["document_frequencies"])
+        totals.update(result["totals"])
+    idf = _idf(documents, document_frequencies)
+    centroid = _centroid(totals, idf)
+    centroid_norm = _norm(centroid)
+    scored = []
+    for index, result in results:
+        for position, sentence, counts in result["candidates"]:
+            vector = _weights(counts, idf)
+            scored.append((_cosine(vector, centroid, centroid_norm), (index, position), sentence, vector))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    picked: List[Tuple[Tuple[int, int], str, Dict[str, float]]] = []
+    length = 0
+    for score, order, sentence, vector in scored:
+        if len(picked) >= max_sentences:
+            break
+        if length + len(sentence) + len(picked) > max_chars:
+            continue
+        if any(_cosine(vector, other, _norm(other)) > REDUNDANCY_THRESHOLD for _, _, other in picked):
+            continue
+        picked.append((order, sentence, vector))
+        length += len(sentence)
+    if not picked:
+        return _lead(text, max_sentences, max_chars)
+    return " ".join(sentence for _, sentence, _ in sorted(picked, key=lambda item: item[0]))
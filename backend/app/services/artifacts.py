@@ -0,0 +1,129 @@
+from typing import Any, Dict, Optional, Set, Tuple
+import gzip
+import io
+import json
+import uuid
+
+from ..core.cache import SizedLRUCache
+from ..core.config import settings
+from .storage import get_storage_backend, run_blocking
+
+try:
+    import msgpack
+    import zstandard
+except ImportError: # Optional: fall back to gzip-compressed JSON
+    msgpack = None
+    zstandard = None
+
+# Large stage outputs are stored as compressed artifacts in object storage instead of Job.results.
+# Job.results keeps the analysis plus a reference per offloaded stage:
+#   {"extraction": {"artifact_ref": {"object_name": ..., "codec": ..., "size": ..., "stored_size": ...}}, ...}
+
+ARTIFACT_REF_KEY = "artifact_ref"
+OFFLOADABLE_STAGES = ("extraction", "cleaning")
+
+CODEC_MSGPACK_ZSTD = "msgpack+zstd"
+CODEC_JSON_GZIP = "json+gzip"
+_CODEC_EXTENSIONS = {CODEC_MSGPACK_ZSTD: "msgpack.zst", CODEC_JSON_GZIP: "json.gz"}
+
+def default_codec() -> str:
+    return CODEC_MSGPACK_ZSTD if msgpack is not None else CODEC_JSON_GZIP
+
+def encode(value: Any, codec: str) -> bytes:
+    if codec == CODEC_MSGPACK_ZSTD:
+        packed = msgpack.packb(value, use_bin_type=True)
+        return zstandard.ZstdCompressor(level=settings.ARTIFACT_COMPRESSION_LEVEL).compress(packed)
+    if codec == CODEC_JSON_GZIP:
+        serialized = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        return gzip.compress(serialized, compresslevel=min(9, settings.ARTIFACT_COMPRESSION_LEVEL))
+    raise ValueError(f"Unknown artifact codec: {codec}")
+
+def decode(data: bytes, codec: str) -> Any:
+    if codec == CODEC_MSGPACK_ZSTD:
+        if msgpack is None:
+            raise RuntimeError("Artifact uses msgpack+zstd but msgpack/zstandard are not installed")
+        return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(data), raw=False)
+    if codec == CODEC_JSON_GZIP:
+        return json.loads(gzip.decompress(data))
+    raise ValueError(f"Unknown artifact codec: {codec}")
+
+def is_artifact_ref(value: Any) -> bool:
+    return isinstance(value, dict) and ARTIFACT_REF_KEY in value
+
+def referenced_objects(results: Any) -> Set[str]:
+    """Object names of the artifacts a Job.results dict refers to."""
+    if not isinstance(results, dict):
+        return set()
+    return {value[ARTIFACT_REF_KEY]["object_name"] for value in results.values() if is_artifact_ref(value)}
+
+def artifact_object_name(job_id: int, stage: str, codec: str) -> str:
+    # Unique per write, so an artifact never changes once referenced (and can be cached by name)
+    return f"artifacts/jobs/{job_id}/{stage}-{uuid.uuid4().hex[:12]}.{_CODEC_EXTENSIONS[codec]}"
+
+def serialized_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+def store_artifact(job_id: int, stage: str, value: Any, size: Optional[int] = None) -> Dict[str, Any]:
+    """Compresses value into object storage and returns its reference (blocking)."""
+    codec = default_codec()
+    data = encode(value, codec)
+    object_name = artifact_object_name(job_id, stage, codec)
+    get_storage_backend().put_stream(object_name, io.BytesIO(data), "application/octet-stream", settings.UPLOAD_PART_SIZE)
+    return {
+        "object_name": object_name,
+        "codec": codec,
+        "size": serialized_size(value) if size is None else size, # Uncompressed JSON size
+        "stored_size": len(data),
+    }
+
+def load_artifact(ref: Dict[str, Any]) -> Any:
+    """Reads and decodes an artifact given its reference (blocking)."""
+    with get_storage_backend().open_stream(ref["object_name"]) as f:
+        return decode(f.read(), ref["codec"])
+
+def remove_artifact(object_name: str) -> None:
+    """Deletes an artifact nothing refers to any more (blocking)."""
+    get_storage_backend().remove(object_name)
+
+# Decoded artifacts, bounded by their uncompressed size (ARTIFACT_CACHE_MAX_BYTES)
+_cache = SizedLRUCache(settings.ARTIFACT_CACHE_MAX_BYTES)
+
+def load_artifact_cached(ref: Dict[str, Any]) -> Any:
+    """load_artifact() through the in-process cache; callers must not mutate the returned value."""
+    found, value = _cache.get(ref["object_name"])
+    if not found:
+        value = load_artifact(ref)
+        _cache.put(ref["object_name"], value, ref.get("size", 0))
+    return value
+
+def offload_results(job_id: int, results: Dict[str, Any], threshold: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Replaces stage outputs of at least threshold serialized bytes (RESULTS_OFFLOAD_THRESHOLD_BYTES)
+    with artifact references. The analysis is always kept inline. Blocking.
+    """
+    threshold = settings.RESULTS_OFFLOAD_THRESHOLD_BYTES if threshold is None else threshold
+    if threshold < 0:
+        return results
+    offloaded = dict(results)
+    for stage in OFFLOADABLE_STAGES:
+        value = results.get(stage)
+        if value is None or is_artifact_ref(value):
+            continue
+        size = serialized_size(value)
+        if size >= threshold:
+            offloaded[stage] = {ARTIFACT_REF_KEY: store_artifact(job_id, stage, value, size)}
+    return offloaded
+
+async def offload_results_async(job_id: int, results: Dict[str, Any]) -> Dict[str, Any]:
+    return await run_blocking(offload_results, job_id, results)
+
+async def resolve_stage(results: Optional[Dict[str, Any]], stage: str) -> Tuple[bool, Any]:
+    """
+    Returns (found, value) for a stage of Job.results, loading it from its artifact if it was offloaded.
+    """
+    if not isinstance(results, dict) or stage not in results:
+        return False, None
+    value = results[stage]
+    if is_artifact_ref(value):
+        value = await run_blocking(load_artifact_cached, value[ARTIFACT_REF_KEY])
+    return True, value
@@ -0,0 +1,147 @@
+from typing import Any, Dict, Iterable, Optional
+
+from .. import crud
+from ..core.config import settings
+from ..db import session as db_session
+from ..db.models import JobStatus
+from . import artifacts
+
+# Stage checkpoints: each pipeline stage's JSON output is persisted per (job, stage, pipeline version),
+# so a retry or re-analysis resumes after the last completed stage instead of re-reading the file.
+# Checkpoints are written from wherever the pipeline runs (worker or pipeline pool process) and
+# handed to the pipeline as plain dicts: {"stage": ..., "value": ..., "artifact_ref": ..., "params": ...}.
+# Once a job completes, its checkpoints are deleted (Job.results holds the same outputs, and a rerun
+# resumes from there) and artifacts nothing refers to any more are removed.
+
+CHECKPOINT_STAGES = ("extraction", "cleaning", "analysis")
+# Stages a rerun can take from a completed job's Job.results (its analysis parameters are not kept)
+RESULT_STAGES = ("extraction", "cleaning")
+
+def _record(stage: str, value: Any, ref: Optional[Dict[str, Any]], params: Any) -> Dict[str, Any]:
+    if artifacts.is_artifact_ref(value): # In Job.results form
+        value, ref = None, value[artifacts.ARTIFACT_REF_KEY]
+    return {"stage": stage, "value": value, "artifact_ref": ref, "params": params}
+
+def get_checkpoint_records(job_ids: Iterable[Optional[int]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Checkpoint records per stage for the current pipeline version, the first job id preferred.
+    Stages without a checkpoint are taken from the Job.results of a job that completed with this
+    version (a rerun's previous results); those of the first job's own results are checkpointed
+    again, so a failed rerun replacing the results still resumes from them. Blocking.
+    """
+    if not settings.PIPELINE_CHECKPOINTS:
+        return {}
+    job_ids = [job_id for job_id in job_ids if job_id is not None]
+    db = db_session.SessionLocal()
+    try:
+        records = {
+            stage: _record(stage, checkpoint.value, checkpoint.artifact_ref, checkpoint.params)
+            for stage, checkpoint in crud.checkpoint.get_checkpoints(db, job_ids, settings.PIPELINE_VERSION).items()
+        }
+        missing = [stage for stage in RESULT_STAGES if stage not in records]
+        for job_id in job_ids:
+            if not missing:
+                break
+            job = crud.job.get_job(db, job_id)
+            if job is None or job.pipeline_version != settings.PIPELINE_VERSION or not isinstance(job.results, dict):
+                continue
+            for stage in [stage for stage in missing if job.results.get(stage) is not None]:
+                records[stage] = record = _record(stage, job.results[stage], None, None)
+                missing.remove(stage)
+                if job_id == job_ids[0]:
+                    crud.checkpoint.save_checkpoint(
+                        db, job_id, stage, settings.PIPELINE_VERSION, value=record["value"], artifact_ref=record["artifact_ref"]
+                    )
+        return records
+    finally:
+        db.close()
+
+def can_resume(db: Any, job_ids: Iterable[Optional[int]], stage: str) -> bool:
+    """Whether get_checkpoint_records(job_ids) would return stage (without loading any output)."""
+    job_ids = [job_id for job_id in job_ids if job_id is not None]
+    if stage in crud.checkpoint.get_checkpoints(db, job_ids, settings.PIPELINE_VERSION):
+        return True
+    return stage in RESULT_STAGES and any(
+        job is not None and job.status == JobStatus.COMPLETED and job.pipeline_version == settings.PIPELINE_VERSION
+        for job in (crud.job.get_job(db, job_id, with_results=False) for job_id in job_ids)
+    )
+
+def _remove_unreferenced(db: Any, object_names: Iterable[str]) -> None:
+    for object_name in object_names:
+        try:
+            if not crud.checkpoint.is_artifact_referenced(db, object_name):
+                artifacts.remove_artifact(object_name)
+        except Exception as e:
+            print(f"Could not remove artifact {object_name}: {e}")
+
+def save_stage(job_id: int, stage: str, value: Any, params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Persists a stage output (JSON form) as the job's checkpoint and returns what Job.results should
+    hold for the stage: the value itself, or a reference to the artifact the checkpoint was stored as,
+    so a large output is uploaded once. A failed save is logged and does not fail the job. Blocking.
+    """
+    if not settings.PIPELINE_CHECKPOINTS:
+        return value
+    try:
+        ref = None
+        threshold = settings.RESULTS_OFFLOAD_THRESHOLD_BYTES
+        if stage in artifacts.OFFLOADABLE_STAGES and threshold >= 0:
+            size = artifacts.serialized_size(value)
+            if size >= threshold:
+                ref = artifacts.store_artifact(job_id, stage, value, size)
+        db = db_session.SessionLocal()
+        try:
+            replaced = crud.checkpoint.get_checkpoint(db, job_id, stage, settings.PIPELINE_VERSION)
+            replaced_objects = set()
+            if replaced is not None:
+                replaced_objects = {replaced.artifact_object} - {None}
+                db.expunge(replaced) # save_checkpoint deletes the row with a bulk statement
+            crud.checkpoint.save_checkpoint(
+                db, job_id, stage, settings.PIPELINE_VERSION, value=None if ref else value, artifact_ref=ref, params=params
+            )
+            _remove_unreferenced(db, replaced_objects)
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Could not save the {stage} checkpoint of job {job_id}: {e}")
+        return value
+    return {artifacts.ARTIFACT_REF_KEY: ref} if ref else value
+
+def release_checkpoints(job_id: int, superseded_objects: Iterable[str] = ()) -> None:
+    """
+    Run once job_id completed: deletes its checkpoints and removes the artifacts they or the job's
+    previous results (superseded_objects) referred to, unless still referenced (e.g. by the new
+    results, or a job that reused them). Failures are logged and do not fail the job. Blocking.
+    """
+    db = db_session.SessionLocal()
+    try:
+        candidates = crud.checkpoint.delete_job_checkpoints(db, job_id) | set(superseded_objects)
+        _remove_unreferenced(db, candidates)
+    except Exception as e:
+        print(f"Could not release the checkpoints of job {job_id}: {e}")
+    finally:
+        db.close()
+
+def load_stage(record: Dict[str, Any]) -> Any:
+    """The checkpointed stage output (JSON form). Blocking."""
+    if record.get("artifact_ref"):
+        return artifacts.load_artifact(record["artifact_ref"])
+    return record["value"]
+
+def result_value(record: Dict[str, Any]) -> Any:
+    """What Job.results holds for a checkpointed stage, without loading an offloaded output."""
+    if record.get("artifact_ref"):
+        return {artifacts.ARTIFACT_REF_KEY: record["artifact_ref"]}
+    return record["value"]
+
+def resume_point(records: Dict[str, Dict[str, Any]], analysis_params: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Number of leading stages (in CHECKPOINT_STAGES order) that can be skipped. The analysis
+    checkpoint only counts if it was produced with the same analysis parameters.
+    """
+    completed = 0
+    for stage in CHECKPOINT_STAGES:
+        if stage not in records or (stage == "analysis" and records[stage].get("params") != analysis_params):
+            break
+        completed += 1
+    return completed
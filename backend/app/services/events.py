@@ -0,0 +1,273 @@
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+import asyncio
+import json
+import select as select_module # sqlalchemy's select is imported below
+import threading
+import time
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, insert, select, text
+
+from ..core.config import settings
+from ..db import models, session as db_session
+
+# Job progress events, pushed to clients by GET /jobs/{job_id}/events (SSE).
+# Publishers (the orchestrator, in API or worker processes) call publish(); subscribers get an
+# async iterator of events for one job. Events are small dicts:
+#   {"job_id": 1, "type": "status", "status": "PROCESSING", "version": 3}
+#   {"job_id": 1, "type": "stage", "stage": "extraction", "tables": 2, "rows": 5000}
+#   {"job_id": 1, "type": "progress", "stage": "analysis", "rows_processed": 250000}
+# Delivery is best effort: a client that needs certainty re-reads GET /jobs/{job_id}/status.
+
+EVENT_CHANNEL = "job_events"
+EVENT_STATUS = "status"
+EVENT_STAGE = "stage"
+EVENT_PROGRESS = "progress"
+
+class Subscription:
+    """Events for one job, delivered to the event loop that subscribed. Use as an async iterator."""
+
+    def __init__(self, broker: "InProcessBroker", job_id: int, loop: asyncio.AbstractEventLoop):
+        self.job_id = job_id
+        self._broker = broker
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        # Runs in the subscriber's loop; a slow client loses its oldest events, not the newest status
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    def deliver_threadsafe(self, event: Dict[str, Any]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError: # The subscriber's loop is closed
+            self.close()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None after timeout seconds without one."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        return await self._queue.get()
+
+    def close(self) -> None:
+        self._broker.unsubscribe(self)
+
+class InProcessBroker:
+    """
+    Delivers events to subscribers in the publishing process only: the local stand-in for tests,
+    development and eager Celery, where the pipeline runs in the API process.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: int) -> Subscription:
+        """Must be called from the event loop that will consume the events."""
+        subscription = Subscription(self, job_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[job_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.job_id]
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Hands an event to this process's subscribers of its job. Thread-safe."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get("job_id"), ()))
+        for subscription in subscribers:
+            subscription.deliver_threadsafe(event)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.dispatch(event)
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fans events out across processes with Postgres NOTIFY/LISTEN on EVENT_CHANNEL.
+    Each API process runs one listener thread (started by the first subscription) on a dedicated
+    connection and dispatches notifications to its local subscribers.
+    """
+
+    def __init__(self, engine: Any):
+        super().__init__()
+        self._engine = engine
+        self._listener: Optional[threading.Thread] = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        payload = json.dumps(event, separators=(",", ":"), default=str)
+        with self._engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": EVENT_CHANNEL, "payload": payload})
+            conn.commit()
+
+    def subscribe(self, job_id: int) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(job_id)
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen_forever, name="job-events-listener", daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self) -> None:
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"Job events listener error: {e}; reconnecting.")
+                time.sleep(1)
+
+    def _listen(self) -> None:
+        raw_conn = self._engine.raw_connection()
+        try:
+            conn = raw_conn.driver_connection # psycopg2 connection
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {EVENT_CHANNEL}")
+            while True:
+                if select_module.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    try:
+                        self.dispatch(json.loads(notification.payload))
+                    except ValueError:
+                        continue
+        finally:
+            raw_conn.invalidate() # Never return a LISTENing connection to the pool
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Fans events out across processes on any database: publishers insert them into job_events, and
+    each API process polls it every EVENTS_POLL_INTERVAL seconds from one thread (started by the
+    first subscription) and dispatches new rows to its local subscribers. Publishers prune rows
+    older than EVENTS_RETENTION_SECONDS.
+    """
+
+    def __init__(self, engine: Any):
+        super().__init__()
+        self._engine = engine
+        self._poller: Optional[threading.Thread] = None
+        self._poller_lock = threading.Lock()
+        self._last_pruned = 0.0
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        now = datetime.now(timezone.utc)
+        with self._engine.connect() as conn:
+            conn.execute(insert(models.JobEvent).values(job_id=event["job_id"], payload=event, created_at=now))
+            if time.monotonic() - self._last_pruned >= settings.EVENTS_RETENTION_SECONDS / 10:
+                self._last_pruned = time.monotonic()
+                cutoff = now - timedelta(seconds=settings.EVENTS_RETENTION_SECONDS)
+                conn.execute(delete(models.JobEvent).where(models.JobEvent.created_at < cutoff))
+            conn.commit()
+
+    def subscribe(self, job_id: int) -> Subscription:
+        self._ensure_poller()
+        return super().subscribe(job_id)
+
+    def _ensure_poller(self) -> None:
+        with self._poller_lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_forever, name="job-events-poller", daemon=True)
+                self._poller.start()
+
+    def _poll_forever(self) -> None:
+        last_id = None # Only events published from now on
+        while True:
+            try:
+                with self._engine.connect() as conn:
+                    if last_id is None:
+                        last_id = conn.execute(select(func.coalesce(func.max(models.JobEvent.id), 0))).scalar()
+                    rows = conn.execute(
+                        select(models.JobEvent.id, models.JobEvent.payload)
+                        .where(models.JobEvent.id > last_id)
+                        .order_by(models.JobEvent.id)
+                    ).all()
+                for row in rows:
+                    last_id = row.id
+                    self.dispatch(row.payload)
+            except Exception as e:
+                print(f"Job events poller error: {e}; retrying.")
+            time.sleep(settings.EVENTS_POLL_INTERVAL)
+
+_broker: Optional[InProcessBroker] = None
+_broker_lock = threading.Lock()
+
+def get_event_broker() -> InProcessBroker:
+    """
+    Returns the process-wide broker selected by EVENTS_BACKEND: "postgres", "database", "memory",
+    or "auto": postgres when the database is Postgres; memory when jobs run in the API process
+    (Celery with CELERY_TASK_ALWAYS_EAGER); database otherwise, since the pipeline then publishes
+    from Celery or db_worker processes.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = settings.EVENTS_BACKEND
+                if backend == "auto":
+                    if db_session.engine.dialect.name == "postgresql":
+                        backend = "postgres"
+                    elif settings.JOB_QUEUE_BACKEND == "celery" and settings.CELERY_TASK_ALWAYS_EAGER:
+                        backend = "memory"
+                    else:
+                        backend = "database"
+                if backend == "postgres":
+                    _broker = PostgresBroker(db_session.engine)
+                elif backend == "database":
+                    _broker = DatabaseBroker(db_session.engine)
+                elif backend == "memory":
+                    _broker = InProcessBroker()
+                else:
+                    raise ValueError(f"Unknown EVENTS_BACKEND: {settings.EVENTS_BACKEND}")
+    return _broker
+
+def set_event_broker(broker: InProcessBroker) -> None:
+    """Overrides the broker (e.g. an InProcessBroker in tests)."""
+    global _broker
+    _broker = broker
+
+def publish(job_id: int, event_type: str, **fields: Any) -> None:
+    """Publishes an event for a job. Never raises: progress reporting must not fail a job."""
+    event = {"job_id": job_id, "type": event_type, **fields}
+    try:
+        get_event_broker().publish(event)
+    except Exception as e:
+        print(f"Could not publish {event_type} event for job {job_id}: {e}")
+
+def publish_status(job_id: int, status: Any, version: Optional[int] = None) -> None:
+    publish(job_id, EVENT_STATUS, status=getattr(status, "value", status), version=version)
+
+class ProgressReporter:
+    """Publishes row-count progress for a stage, at most once per EVENTS_PROGRESS_INTERVAL seconds."""
+
+    def __init__(self, job_id: int, stage: str):
+        self.job_id = job_id
+        self.stage = stage
+        self.rows_processed = 0
+        self._last_published = 0.0
+
+    def add(self, rows: int) -> None:
+        self.rows_processed += rows
+        now = time.monotonic()
+        if now - self._last_published >= settings.EVENTS_PROGRESS_INTERVAL:
+            self._last_published = now
+            publish(self.job_id, EVENT_PROGRESS, stage=self.stage, rows_processed=self.rows_processed)
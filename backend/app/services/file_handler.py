@@ -1,48 +1,301 @@
-from minio import Minio
 from minio.error import S3Error
 from ..core.config import settings
+from .storage import get_storage_backend, run_blocking
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import mimetypes
+import tarfile
+import threading
+import zipfile
 import os
 
-client = Minio(
-    settings.MINIO_ENDPOINT,
-    access_key=settings.MINIO_ACCESS_KEY,
-    secret_key=settings.MINIO_SECRET_KEY,
-    secure=settings.MINIO_USE_SSL
-)
+# All storage calls go through the configured backend (see storage.py) and are offloaded to the
+# storage thread pool, so they never block the event loop.
 
 async def save_file_to_storage(local_file_path: str, object_name: str, content_type: str = "application/octet-stream") -> str:
     """
-    Uploads a file to MinIO object storage.
+    Uploads a file to object storage.
     Returns the path (object_name) of the file in storage.
     """
-    bucket_name = settings.MINIO_BUCKET_NAME
+    try:
+        await run_blocking(get_storage_backend().put_file, object_name, local_file_path, content_type)
+        return object_name # Or f"/{bucket_name}/{object_name}" if you want full path
+    except S3Error as exc:
+        print(f"Error occurred: {exc}")
+        raise
+
+class UploadTooLargeError(Exception):
+    """Raised while streaming an upload that exceeds the configured size limit."""
 
-    # Make sure bucket exists
-    found = client.bucket_exists(bucket_name)
-    if not found:
-        client.make_bucket(bucket_name)
-    # else:
-    #     print(f"Bucket 	ható{bucket_name}" already exists")
+class HashingReader:
+    """
+    File-like wrapper used to stream an upload into object storage.
+    Counts bytes and updates a SHA-256 as the storage client reads, and stops the transfer
+    as soon as max_bytes is exceeded.
+    """
 
+    def __init__(self, stream: BinaryIO, max_bytes: Optional[int] = None):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit")
+        self._sha256.update(chunk)
+        return chunk
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+def _put_stream(stream: BinaryIO, object_name: str, content_type: str, max_bytes: Optional[int]) -> Tuple[str, str, int]:
+    reader = HashingReader(stream, max_bytes)
     try:
-        client.fput_object(
-            bucket_name, object_name, local_file_path, content_type=content_type
-        )
-        # print(f" 	ható{local_file_path}" is successfully uploaded as object 	ható{object_name}" to bucket 	ható{bucket_name}".")
-        return object_name # Or f"/{bucket_name}/{object_name}" if you want full path
+        get_storage_backend().put_stream(object_name, reader, content_type, settings.UPLOAD_PART_SIZE)
+        return object_name, reader.sha256, reader.size
+    except S3Error as exc:
+        print(f"Error occurred: {exc}")
+        raise
+
+async def save_stream_to_storage(stream: BinaryIO, object_name: str, content_type: str = "application/octet-stream", max_bytes: Optional[int] = None) -> Tuple[str, str, int]:
+    """
+    Streams a file-like object straight into object storage (multipart upload of
+    UPLOAD_PART_SIZE parts), without writing a local temp file.
+    Returns (object_name, sha256 hex digest, size in bytes).
+    """
+    return await run_blocking(_put_stream, stream, object_name, content_type, max_bytes)
+
+class ChunkPipe:
+    """
+    Bounded, thread-safe byte pipe: the event loop puts request body chunks in, the storage
+    client reads them from a worker thread. Gives backpressure without buffering the whole body.
+    """
+
+    def __init__(self, max_chunks: int = 4):
+        self._chunks = deque()
+        self._buffer = b""
+        self._max_chunks = max_chunks
+        self._closed = False
+        self._aborted = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+
+    def put(self, chunk: bytes) -> bool:
+        """Blocks while the pipe is full. Returns False if the reader gave up."""
+        with self._cond:
+            while len(self._chunks) >= self._max_chunks and not self._aborted:
+                self._cond.wait()
+            if self._aborted:
+                return False
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+            return True
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self) -> None:
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+
+    def fail(self, error: BaseException) -> None:
+        """Called by the producer instead of close(): the reader raises error rather than seeing EOF."""
+        with self._cond:
+            self._error = error
+            self._cond.notify_all()
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while size < 0 or len(self._buffer) < size:
+                while not self._chunks and not self._closed and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise IOError("Upload stream failed") from self._error
+                if not self._chunks:
+                    break # Closed and drained
+                self._buffer += self._chunks.popleft()
+                self._cond.notify_all()
+            if size < 0:
+                data, self._buffer = self._buffer, b""
+            else:
+                data, self._buffer = self._buffer[:size], self._buffer[size:]
+            return data
+
+async def save_async_stream_to_storage(chunks: AsyncIterator[bytes], object_name: str, content_type: str = "application/octet-stream", max_bytes: Optional[int] = None) -> Tuple[str, str, int]:
+    """
+    Streams an async byte iterator (e.g. a raw request body) into object storage.
+    The blocking multipart upload runs in a worker thread that reads from a bounded ChunkPipe,
+    so at most a few chunks are held in memory and nothing is written to local disk.
+    Returns (object_name, sha256 hex digest, size in bytes).
+    """
+    pipe = ChunkPipe()
+
+    def upload() -> Tuple[str, str, int]:
+        try:
+            return _put_stream(pipe, object_name, content_type, max_bytes)
+        finally:
+            pipe.abort() # Unblocks the producer if the upload failed early (e.g. size limit)
+
+    upload_task = asyncio.ensure_future(run_blocking(upload))
+    try:
+        async for chunk in chunks:
+            if not await asyncio.to_thread(pipe.put, chunk):
+                break
+    except BaseException as exc:
+        pipe.fail(exc) # Never store a truncated object (e.g. client disconnected)
+        raise
+    else:
+        pipe.close()
+    return await upload_task
+
+class BatchTooLargeError(Exception):
+    """Raised when a batch upload contains more files than BATCH_MAX_FILES."""
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+TAR_CONTENT_TYPES = ("application/x-tar", "application/gzip", "application/x-gzip", "application/x-bzip2", "application/x-xz")
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MEMBER_READ_SIZE = 1024 * 1024
+
+def is_zip(filename: str, content_type: Optional[str]) -> bool:
+    return filename.lower().endswith(".zip") or content_type in ZIP_CONTENT_TYPES
+
+def is_archive(filename: str, content_type: Optional[str]) -> bool:
+    return is_zip(filename, content_type) or filename.lower().endswith(TAR_EXTENSIONS) or content_type in TAR_CONTENT_TYPES
+
+def guess_content_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+def _is_archive_metadata(name: str) -> bool:
+    # macOS resource forks and folders added by archivers
+    return name.startswith("__MACOSX/") or os.path.basename(name).startswith("._")
+
+def iter_archive_members(fileobj: BinaryIO, filename: str, content_type: Optional[str] = None) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yields (member path, readable stream) for the regular files of a zip or tar archive, in archive order.
+    Tar archives (optionally gzip/bz2/xz compressed) are read in a single forward pass; each stream
+    is only valid until the next member is requested.
+    """
+    if is_zip(filename, content_type):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or _is_archive_metadata(info.filename):
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, member
+    else:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for info in archive:
+                if not info.isfile() or _is_archive_metadata(info.name):
+                    continue
+                yield info.name, archive.extractfile(info)
+
+def _put_members(
+    members: Iterator[Tuple[str, BinaryIO]],
+    make_object_name: Callable[[str], str],
+    max_bytes: Optional[int],
+    concurrency: int,
+    max_members: Optional[int]
+) -> List[Tuple[str, str, str, str, int]]:
+    """
+    Reads members one after another (archives only allow sequential access) and pipes each into its
+    own upload thread, so up to `concurrency` uploads are in flight at once: small files are handed
+    over whole and the reader moves on while their PUT requests complete.
+    If any upload fails, the objects already stored for the batch are removed.
+    """
+    slots = threading.Semaphore(concurrency)
+    uploads = []
+    error: Optional[BaseException] = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-upload") as pool:
+        try:
+            for original_filename, stream in members:
+                if max_members is not None and len(uploads) >= max_members:
+                    raise BatchTooLargeError(f"Batch exceeds the {max_members} file limit")
+                content_type = guess_content_type(original_filename)
+                object_name = make_object_name(original_filename)
+                pipe = ChunkPipe()
+
+                def upload(pipe=pipe, object_name=object_name, content_type=content_type):
+                    try:
+                        return _put_stream(pipe, object_name, content_type, max_bytes)
+                    finally:
+                        pipe.abort()
+                        slots.release()
+
+                slots.acquire()
+                uploads.append((original_filename, content_type, pool.submit(upload)))
+                try:
+                    while chunk := stream.read(MEMBER_READ_SIZE):
+                        if not pipe.put(chunk):
+                            break
+                except BaseException as exc:
+                    pipe.fail(exc)
+                    raise
+                pipe.close()
+        except BaseException as exc:
+            error = exc
+            for _, _, future in uploads:
+                future.cancel()
+
+    # The pool has been shut down: every upload has finished or was cancelled
+    if error is None:
+        error = next((future.exception() for _, _, future in uploads if future.exception() is not None), None)
+    if error is not None:
+        _remove_stored(uploads)
+        raise error
+    return [(original_filename, content_type, *future.result()) for original_filename, content_type, future in uploads]
+
+def _remove_stored(uploads) -> None:
+    backend = get_storage_backend()
+    for _, _, future in uploads:
+        if not future.cancelled() and future.exception() is None:
+            try:
+                backend.remove(future.result()[0])
+            except Exception as exc:
+                print(f"Error removing {future.result()[0]} after a failed batch upload: {exc}")
+
+async def save_members_to_storage(
+    members: Iterator[Tuple[str, BinaryIO]],
+    make_object_name: Callable[[str], str],
+    max_bytes: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_members: Optional[int] = None
+) -> List[Tuple[str, str, str, str, int]]:
+    """
+    Streams many files (e.g. archive members) into object storage concurrently.
+    members yields (original filename, readable stream) and is consumed in a worker thread.
+    Returns (original_filename, content_type, object_name, sha256 hex digest, size) per member, in order.
+    """
+    concurrency = concurrency or settings.BATCH_UPLOAD_CONCURRENCY
+    # Not on the storage pool: this thread waits on uploads that need threads of their own
+    return await asyncio.to_thread(_put_members, members, make_object_name, max_bytes, concurrency, max_members)
+
+async def remove_file_from_storage(object_name: str):
+    """
+    Deletes an object from storage.
+    """
+    try:
+        await run_blocking(get_storage_backend().remove, object_name)
     except S3Error as exc:
         print(f"Error occurred: {exc}")
         raise
 
 async def get_file_from_storage(object_name: str, destination_path: str):
     """
-    Downloads a file from MinIO to a local path.
+    Downloads a file from storage to a local path.
     """
-    bucket_name = settings.MINIO_BUCKET_NAME
     try:
-        client.fget_object(bucket_name, object_name, destination_path)
+        await run_blocking(get_storage_backend().get_to_file, object_name, destination_path)
         return destination_path
     except S3Error as exc:
         print(f"Error occurred: {exc}")
         raise
-
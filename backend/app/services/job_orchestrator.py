@@ -1,89 +1,340 @@
 from sqlalchemy.orm import Session
-from typing import Callable
-import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import asyncio
+import time
 
-from ....app import crud
-from ....app.db import models
-from ....app.core.config import settings
-from ....app.services import file_handler # Import file_handler
+from .. import crud
+from . import artifacts, checkpoints, events, profiling, search_index
+from .keyword_index import DocumentFrequencyIndex
+from .storage import run_blocking
+from ..db import models
+from ..core import metrics
+from ..core.config import settings
 from .ai_agents import extractor_agent, cleaner_agent, analyzer_agent # Import the actual agents
+from .ai_agents.columnar import ColumnarTable, StreamedPages, StreamedTable, has_streamed_tables, stage_output_from_json, stage_output_to_json
+from .ai_agents.sources import ExtractionSource, StorageObjectSource
 
-# from ...workers.celery_app import celery_app # Placeholder for Celery integration
+# Process pool for the CPU-bound agent stages (see PIPELINE_PROCESS_POOL_SIZE)
+_pipeline_pool: Optional[ProcessPoolExecutor] = None
+_pipeline_pool_lock = threading.Lock()
 
-# @celery_app.task # This would be uncommented if Celery is fully set up
-def process_file_job(job_id: int, db_provider: Callable[[], Session]):
+def _get_pipeline_pool() -> ProcessPoolExecutor:
+    global _pipeline_pool
+    with _pipeline_pool_lock:
+        if _pipeline_pool is None:
+            _pipeline_pool = ProcessPoolExecutor(
+                max_workers=settings.PIPELINE_PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"), # Safe to start from a threaded worker
+                max_tasks_per_child=settings.PIPELINE_MAX_TASKS_PER_CHILD,
+            )
+        return _pipeline_pool
+
+def _reset_pipeline_pool() -> None:
+    """Kills the pool's processes (e.g. after a stage timed out); a fresh pool is created on next use."""
+    global _pipeline_pool
+    with _pipeline_pool_lock:
+        pool, _pipeline_pool = _pipeline_pool, None
+    if pool is not None:
+        for process in list(pool._processes.values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _table_counts(stage_output: Dict[str, Any]) -> Dict[str, int]:
+    """Tables, in-memory rows and cells of a stage output (streamed tables are counted by the analysis)."""
+    tables = stage_output.get("tables", [])
+    in_memory = [t for t in tables if isinstance(t, ColumnarTable)]
+    return {
+        "tables": len(tables),
+        "rows": sum(t.num_rows for t in in_memory),
+        "cells": sum(t.num_rows * len(t.columns) for t in in_memory)
+    }
+
+def _count_rows(chunks: Iterable[ColumnarTable], reporter: events.ProgressReporter) -> Iterator[ColumnarTable]:
+    for chunk in chunks:
+        reporter.add(chunk.num_rows + chunk.skipped_rows)
+        yield chunk
+
+def _collect_pages(pages: Iterable[Dict[str, Any]], texts: List[str], reporter: events.ProgressReporter) -> Iterator[Dict[str, Any]]:
+    for page in pages:
+        texts.append(page["text"])
+        reporter.add(sum(table.num_rows for table in page["tables"]))
+        yield page
+
+async def _complete_stage(
+    job_id: Optional[int],
+    stage: str,
+    output: Any,
+    checkpoint: bool,
+    params: Optional[Dict[str, Any]] = None,
+    **counts: Any
+) -> Any:
+    """Publishes the stage event and checkpoints the (JSON) output; returns the stage's Job.results value."""
+    if job_id is None:
+        return output
+    events.publish(job_id, events.EVENT_STAGE, stage=stage, **counts)
+    if not checkpoint:
+        return output
+    return await run_blocking(checkpoints.save_stage, job_id, stage, output, params)
+
+async def run_agents(
+    source: Union[str, ExtractionSource],
+    content_type: str,
+    original_filename: str,
+    job_id: Optional[int] = None,
+    resume: Optional[Dict[str, Dict[str, Any]]] = None,
+    analysis_params: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Runs extraction -> cleaning -> analysis on a file (local path or source) and returns JSON-serializable results.
+    With job_id, publishes a stage event after each stage and row progress while streamed tables are analyzed,
+    and checkpoints each stage output (streamed tables cannot be checkpointed).
+    resume holds the checkpoint records of the job (see services/checkpoints.py): the stages they
+    cover are skipped, and the file is not read at all once extraction is checkpointed.
+    """
+    resume = resume or {}
+    skipped = checkpoints.resume_point(resume, analysis_params) if job_id is not None else 0
+    results: Dict[str, Any] = {}
+    for stage in checkpoints.CHECKPOINT_STAGES[:skipped]:
+        results[stage] = checkpoints.result_value(resume[stage])
+        events.publish(job_id, events.EVENT_STAGE, stage=stage, resumed=True)
+    if skipped == len(checkpoints.CHECKPOINT_STAGES):
+        return results
+    extracted_data = cleaned_data = None
+    if skipped:
+        last_stage = checkpoints.CHECKPOINT_STAGES[skipped - 1]
+        print(f"Resuming {original_filename} after the {last_stage} checkpoint")
+        restored = stage_output_from_json(await run_blocking(checkpoints.load_stage, resume[last_stage]))
+        extracted_data, cleaned_data = (restored, None) if last_stage == "extraction" else (None, restored)
+    checkpoint = job_id is not None
+
+    # 2. Run Extractor Agent
+    if extracted_data is None and cleaned_data is None:
+        with metrics.measure_stage("extraction") as measured:
+            extracted_data = await extractor_agent.run_extraction_agent(source, content_type, original_filename)
+            counts = _table_counts(extracted_data)
+            measured.update(rows=counts["rows"], cells=counts["cells"])
+        print(f"Extraction complete for {original_filename}")
+        checkpoint = checkpoint and not has_streamed_tables(extracted_data)
+        # Columnar tables are converted to JSON rows only here; streamed tables only keep their metadata
+        results["extraction"] = await _complete_stage(
+            job_id, "extraction", stage_output_to_json(extracted_data), checkpoint, **counts
+        )
+
+    # 3. Run Cleaner Agent
+    if cleaned_data is None:
+        with metrics.measure_stage("cleaning") as measured:
+            cleaned_data = await cleaner_agent.run_cleaning_agent(extracted_data)
+            counts = _table_counts(cleaned_data)
+            measured.update(rows=counts["rows"], cells=counts["cells"])
+        print(f"Cleaning complete for {original_filename}")
+        results["cleaning"] = await _complete_stage(
+            job_id, "cleaning", stage_output_to_json(cleaned_data), checkpoint, **counts
+        )
+    if job_id is not None:
+        # Streamed tables are extracted and cleaned lazily, as the analyzer pulls their chunks
+        reporter = events.ProgressReporter(job_id, "analysis")
+        cleaned_data["tables"] = [
+            StreamedTable(table.name, table.header, _count_rows(table.chunks, reporter)) if isinstance(table, StreamedTable) else table
+            for table in cleaned_data.get("tables", [])
+        ]
+    streamed_pages = cleaned_data.get("pages") if isinstance(cleaned_data.get("pages"), StreamedPages) else None
+    page_texts: List[str] = []
+    if streamed_pages is not None and job_id is not None: # Kept for the search index
+        streamed_pages.pages = _collect_pages(streamed_pages.pages, page_texts, reporter)
+
+    # 4. Run Analyzer Agent
+    # (for streamed tables, this also includes their extraction and cleaning, which happen lazily;
+    # a job's text is scored against, then added to, the keyword index)
+    keyword_index = DocumentFrequencyIndex(job_id) if job_id is not None and settings.KEYWORDS_TFIDF else None
+    with metrics.measure_stage("analysis") as measured:
+        analysis_results = await analyzer_agent.run_analysis_agent(cleaned_data, analysis_params, keyword_index)
+        table_analysis = analysis_results.get("table_analysis", [])
+        counts = {
+            "tables": len(table_analysis),
+            "rows": sum(table.get("row_count", 0) for table in table_analysis),
+            "cells": sum(table.get("row_count", 0) * len(table.get("column_statistics", [])) for table in table_analysis)
+        }
+        measured.update(rows=counts["rows"], cells=counts["cells"])
+    print(f"Analysis complete for {original_filename}")
+    if streamed_pages is not None: # Only complete now that the analyzer has drained the pages
+        results["extraction"]["pdf_pages"] = streamed_pages.summary
+    results["analysis"] = await _complete_stage(job_id, "analysis", analysis_results, checkpoint, analysis_params, **counts)
+    final_results = {stage: results[stage] for stage in checkpoints.CHECKPOINT_STAGES}
+    if job_id is not None and settings.SEARCH_INDEX:
+        final_results[search_index.SEARCH_TEXT_KEY] = search_index.document_text(
+            {"full_text_content": page_texts} if streamed_pages is not None else cleaned_data
+        )
+    return final_results
+
+def run_agent_pipeline(
+    source: Union[str, ExtractionSource],
+    content_type: str,
+    original_filename: str,
+    job_id: Optional[int] = None,
+    resume: Optional[Dict[str, Dict[str, Any]]] = None,
+    analysis_params: Optional[Dict[str, Any]] = None,
+    profile: bool = False
+) -> Dict[str, Any]:
+    """
+    Process pool entry point: runs the agents in a fresh event loop in the child process.
+    LLM calls go through the child's process-wide gateway (llm_gateway.get_llm_gateway()), which
+    outlives the loop, like in-process runs; nothing is left open per job.
+    """
+    return asyncio.run(_run_agents_profiled(source, content_type, original_filename, job_id, resume, analysis_params, profile))
+
+async def _run_agents_profiled(
+    source: Union[str, ExtractionSource],
+    content_type: str,
+    original_filename: str,
+    job_id: Optional[int],
+    resume: Optional[Dict[str, Dict[str, Any]]],
+    analysis_params: Optional[Dict[str, Any]],
+    profile: bool
+) -> Dict[str, Any]:
+    """run_agents(), under the profiler if requested (see services/profiling.py)."""
+    if not profile or job_id is None:
+        return await run_agents(source, content_type, original_filename, job_id, resume, analysis_params)
+    with profiling.profile_run(job_id) as profile_ref:
+        results = await run_agents(source, content_type, original_filename, job_id, resume, analysis_params)
+    if profile_ref:
+        results[profiling.PROFILE_RESULTS_KEY] = profile_ref
+    return results
+
+async def execute_agent_pipeline(
+    source: Union[str, ExtractionSource],
+    content_type: str,
+    original_filename: str,
+    job_id: Optional[int] = None,
+    resume: Optional[Dict[str, Dict[str, Any]]] = None,
+    analysis_params: Optional[Dict[str, Any]] = None,
+    profile: bool = False
+) -> Dict[str, Any]:
+    """
+    Runs the agent pipeline, in the process pool if one is configured.
+    Streamed tables never leave the process that reads them: the whole pipeline runs in one call,
+    and a StorageObjectSource opens its own connection to storage inside the child process.
+    Stage events from a child process only reach subscribers through a cross-process broker
+    (EVENTS_BACKEND=postgres).
+    """
+    if settings.PIPELINE_PROCESS_POOL_SIZE <= 0:
+        return await _run_agents_profiled(source, content_type, original_filename, job_id, resume, analysis_params, profile)
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        _get_pipeline_pool(), run_agent_pipeline, source, content_type, original_filename, job_id, resume, analysis_params, profile
+    )
+    try:
+        return await asyncio.wait_for(future, timeout=settings.PIPELINE_STAGE_TIME_LIMIT)
+    except asyncio.TimeoutError:
+        _reset_pipeline_pool()
+        raise TimeoutError(f"Agent pipeline exceeded {settings.PIPELINE_STAGE_TIME_LIMIT}s")
+
+def _observe_queue_wait(claimed: Any) -> None:
+    """Queue wait: from the job becoming claimable (enqueued_at) to its claim (started_at)."""
+    if claimed.enqueued_at is None or claimed.started_at is None:
+        return
+    try:
+        wait = (claimed.started_at - claimed.enqueued_at).total_seconds()
+    except TypeError: # One timestamp naive, the other aware
+        return
+    metrics.JOB_QUEUE_WAIT_SECONDS.observe(max(0.0, wait))
+
+async def process_file_job(
+    job_id: int,
+    db_provider: Callable[[], Session],
+    allow_reclaim: bool = False,
+    lease_owner: Optional[str] = None
+):
     """
     Background task to process a file associated with a job.
-    This function will be called by Celery or a similar background task runner.
+    This function is called by the Celery task in workers/tasks/jobs.py, or by the database queue
+    worker (workers/db_worker.py) for a job it has already claimed under lease_owner.
     db_provider is a callable that yields a new DB session.
+    Only a PENDING job is claimed (a PROCESSING one too if allow_reclaim, e.g. for a task redelivered
+    after its worker died), so duplicate deliveries never process a job twice. With lease_owner,
+    results are only written while the worker still holds the job's lease.
     """
     db = next(db_provider()) # Get a new DB session for this task
-    local_file_path = None # Initialize to ensure it's defined for finally block
+    started = None
     try:
-        job = crud.job.get_job(db, job_id=job_id)
-        if not job or not job.uploaded_file:
-            print(f"Job or uploaded file not found for job_id: {job_id}")
-            if job:
-                crud.job.update_job_status(db, job_id=job_id, status=models.JobStatus.FAILED)
-                crud.job.update_job_results(db, job_id=job_id, results={"error": "Job or uploaded file not found"})
-            return
+        if lease_owner is not None:
+            claimed = crud.job.get_job(db, job_id, with_results=False)
+            if claimed is None or claimed.lease_owner != lease_owner or claimed.status != models.JobStatus.PROCESSING:
+                print(f"Job {job_id} is not leased to {lease_owner}; skipping.")
+                return
+            events.publish_status(job_id, claimed.status, claimed.version)
+        else:
+            claimable = [models.JobStatus.PENDING, models.JobStatus.PROCESSING] if allow_reclaim else [models.JobStatus.PENDING]
+            claimed = crud.job.transition_job(db, job_id, models.JobStatus.PROCESSING, from_statuses=claimable)
+            if claimed is None:
+                print(f"Job {job_id} not found or not pending; skipping.")
+                return
+            events.publish_status(job_id, claimed.status, claimed.version)
+        _observe_queue_wait(claimed)
+        started = time.perf_counter()
 
-        crud.job.update_job_status(db, job_id=job_id, status=models.JobStatus.PROCESSING)
-        print(f"Processing job_id: {job_id} for file: {job.uploaded_file.original_filename}")
-
-        # 1. Get file from storage
-        temp_dir = "/tmp/universal_data_extractor"
-        os.makedirs(temp_dir, exist_ok=True)
-        local_file_path = os.path.join(temp_dir, job.uploaded_file.filename)
-        
-        await file_handler.get_file_from_storage(job.uploaded_file.file_path, local_file_path)
-        print(f"File {job.uploaded_file.filename} downloaded to {local_file_path} for processing.")
-
-        # 2. Run Extractor Agent
-        extracted_data = await extractor_agent.run_extraction_agent(
-            local_file_path, 
-            job.uploaded_file.content_type, 
-            job.uploaded_file.original_filename
-        )
-        print(f"Extraction complete for job_id: {job_id}")
+        uploaded_file = crud.file.get_uploaded_file(db, claimed.uploaded_file_id) if claimed.uploaded_file_id else None
+        if not uploaded_file:
+            print(f"Uploaded file not found for job_id: {job_id}")
+            failed = crud.job.transition_job(
+                db, job_id, models.JobStatus.FAILED, results={"error": "Job or uploaded file not found"},
+                lease_owner=lease_owner
+            )
+            if failed is not None:
+                events.publish_status(job_id, failed.status, failed.version)
+            return
+        print(f"Processing job_id: {job_id} for file: {uploaded_file.original_filename}")
 
-        # 3. Run Cleaner Agent
-        cleaned_data = await cleaner_agent.run_cleaning_agent(extracted_data)
-        print(f"Cleaning complete for job_id: {job_id}")
+        # 1. Read the file straight from storage (no local copy; parsers that need one spill on demand)
+        source = StorageObjectSource(uploaded_file.file_path, name=uploaded_file.filename)
 
-        # 4. Run Analyzer Agent
-        analysis_results = await analyzer_agent.run_analysis_agent(cleaned_data)
-        print(f"Analysis complete for job_id: {job_id}")
+        # 2-4. Run the Extractor, Cleaner and Analyzer agents, resuming after checkpointed stages
+        # (a job that reused results falls back to the checkpoints of the job it reused them from)
+        resume = checkpoints.get_checkpoint_records([job_id, claimed.reused_from_job_id])
+        final_results = await execute_agent_pipeline(
+            source,
+            uploaded_file.content_type,
+            uploaded_file.original_filename,
+            job_id,
+            resume,
+            claimed.analysis_params,
+            claimed.profile
+        )
 
-        # 5. Store results
-        final_results = {
-            "extraction": extracted_data,
-            "cleaning": cleaned_data, # Optional: could be merged or just keep final analysis
-            "analysis": analysis_results
-        }
-        crud.job.update_job_results(db, job_id=job_id, results=final_results)
-        crud.job.update_job_status(db, job_id=job_id, status=models.JobStatus.COMPLETED)
+        # 5. Store results and complete the job in one statement
+        # (large stage outputs go to object storage, Job.results keeps references)
+        search_text = final_results.pop(search_index.SEARCH_TEXT_KEY, None)
+        final_results = await artifacts.offload_results_async(job_id, final_results)
+        superseded = crud.job.get_result_artifacts(db, job_id) # A rerun's results are replaced below
+        completed = crud.job.transition_job(
+            db, job_id, models.JobStatus.COMPLETED, from_statuses=[models.JobStatus.PROCESSING], results=final_results,
+            lease_owner=lease_owner, result_artifacts=artifacts.referenced_objects(final_results)
+        )
+        if completed is None:
+            print(f"Job {job_id} was taken over or finished elsewhere; results discarded.")
+            return
+        events.publish_status(job_id, completed.status, completed.version)
+        metrics.JOB_SECONDS.labels("completed").observe(time.perf_counter() - started)
+        await run_blocking(checkpoints.release_checkpoints, job_id, superseded)
+        if search_text is not None: # None when every stage was resumed: the indexed text is unchanged
+            await run_blocking(search_index.index_job, job_id, uploaded_file.original_filename, search_text)
         print(f"Job {job_id} completed successfully.")
 
     except Exception as e:
         print(f"Error processing job {job_id}: {e}")
-        # Ensure job status is updated even if it was already FAILED by a sub-component
-        crud.job.update_job_status(db, job_id=job_id, status=models.JobStatus.FAILED)
+        db.rollback() # The session may be unusable after a failed statement
         error_details = {"error": str(e), "step": "job_orchestration"}
-        # Append to existing results if any, or create new
-        existing_results = job.results if job and job.results else {}
-        if isinstance(existing_results, dict):
-            existing_results.update(error_details) # Merge error into existing results
-            crud.job.update_job_results(db, job_id=job_id, results=existing_results)
-        else: # If results is not a dict (e.g. a list or string), overwrite with error
-            crud.job.update_job_results(db, job_id=job_id, results=error_details)
-        
+        failed = crud.job.transition_job(
+            db, job_id, models.JobStatus.FAILED,
+            from_statuses=[models.JobStatus.PENDING, models.JobStatus.PROCESSING], results=error_details,
+            lease_owner=lease_owner
+        )
+        if failed is not None:
+            events.publish_status(job_id, failed.status, failed.version)
+            if started is not None:
+                metrics.JOB_SECONDS.labels("failed").observe(time.perf_counter() - started)
+
     finally:
-        if local_file_path and os.path.exists(local_file_path):
-            try:
-                os.remove(local_file_path) # Clean up downloaded file
-                print(f"Cleaned up temporary file: {local_file_path}")
-            except OSError as e_remove:
-                print(f"Error removing temporary file {local_file_path}: {e_remove}")
         db.close()
-
@@ -0,0 +1,45 @@
+from typing import Optional, Sequence
+
+from celery import Celery, group
+
+from ..core.config import settings
+
+PROCESS_FILE_JOB_TASK = "jobs.process_file_job" # Registered by workers/tasks/jobs.py
+
+_celery_client: Optional[Celery] = None
+
+def _get_celery() -> Celery:
+    """
+    The Celery app jobs are published with. The API only produces tasks, by name, so it does not
+    import the workers package; with CELERY_TASK_ALWAYS_EAGER (tests, development) tasks run inline
+    in this process, which needs the worker's task module after all.
+    """
+    global _celery_client
+    if _celery_client is None:
+        if settings.CELERY_TASK_ALWAYS_EAGER:
+            import workers.tasks.jobs # noqa: F401 (registers the task)
+            from workers.celery_app import celery_app
+            _celery_client = celery_app
+        else:
+            _celery_client = Celery("udea_api", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
+            _celery_client.conf.update(task_serializer="json", result_serializer="json", accept_content=["json"])
+    return _celery_client
+
+def enqueue_job(job_id: int) -> None:
+    """
+    Hands a job over to the worker subsystem.
+    With JOB_QUEUE_BACKEND="database" the committed PENDING row already is the queue entry and
+    workers/db_worker.py claims it; there is nothing to publish.
+    The API process never runs the pipeline itself; with CELERY_TASK_ALWAYS_EAGER the task runs inline (tests).
+    """
+    if settings.JOB_QUEUE_BACKEND == "database":
+        return
+    _get_celery().signature(PROCESS_FILE_JOB_TASK, args=(job_id,)).apply_async()
+
+def enqueue_jobs(job_ids: Sequence[int]) -> None:
+    """Enqueues many jobs as one Celery group (a single publish round instead of one call per job)."""
+    if settings.JOB_QUEUE_BACKEND == "database":
+        return
+    if job_ids:
+        celery = _get_celery()
+        group(celery.signature(PROCESS_FILE_JOB_TASK, args=(job_id,)) for job_id in job_ids).apply_async()
@@ -0,0 +1,164 @@
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import io
+import json
+
+from ..core.cache import SizedLRUCache
+from ..core.config import settings
+from ..db.models import JobStatus
+from . import artifacts
+from .checkpoints import CHECKPOINT_STAGES
+from .storage import get_storage_backend
+
+try:
+    import orjson
+except ImportError: # Optional: fall back to the standard library encoder
+    orjson = None
+
+# Shaping of stored Job.results for the API: field projection, table row pagination and
+# serialization. Offloaded stages (see artifacts.py) are only loaded when a request actually
+# reaches into them.
+
+FINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item") and hasattr(value, "dtype"): # numpy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(value: Any) -> bytes:
+    """
+    Serializes a response body: with orjson when installed, falling back to the standard library
+    for what orjson rejects (e.g. integers beyond 64 bits).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=_json_default)
+        except TypeError: # orjson.JSONEncodeError is a TypeError
+            pass
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+# Encoded responses for jobs in a final status. Keys include Job.version, so a changed job
+# never hits a stale entry.
+_response_cache = SizedLRUCache(settings.RESULTS_RESPONSE_CACHE_MAX_BYTES)
+
+# Unprojected responses (the job, its results, one stage) of at least RESULTS_RESPONSE_STORE_MIN_BYTES
+# are also stored next to the job's artifacts, so other API processes and restarted ones serve them
+# without re-encoding. One object per job and response, starting with the version line it was encoded
+# for: a newer version overwrites it, an older one is never served.
+
+def _stored_response_name(job_id: int, variant: Tuple[Hashable, ...]) -> Optional[str]:
+    if variant in (("job",), ("results", ())):
+        name = variant[0]
+    elif len(variant) == 2 and variant[0] == "stage" and variant[1] in CHECKPOINT_STAGES:
+        name = f"stage-{variant[1]}"
+    else: # Projections: too many combinations to store
+        return None
+    return f"responses/jobs/{job_id}/{name}.json"
+
+def get_cached_response(db_job: Any, *variant: Hashable) -> Optional[bytes]:
+    found, body = _response_cache.get((db_job.id, db_job.version, variant))
+    return body if found else None
+
+def load_stored_response(db_job: Any, *variant: Hashable) -> Optional[bytes]:
+    """The response stored for the job's current version, if any (then also cached). Blocking."""
+    object_name = _stored_response_name(db_job.id, variant)
+    if object_name is None or db_job.status not in FINAL_STATUSES or settings.RESULTS_RESPONSE_STORE_MIN_BYTES < 0:
+        return None
+    try:
+        with get_storage_backend().open_stream(object_name) as f:
+            if f.readline() != b"%d\n" % db_job.version:
+                return None
+            body = f.read()
+    except Exception: # Not stored (yet), or unreadable: encode it again
+        return None
+    _response_cache.put((db_job.id, db_job.version, variant), body, len(body))
+    return body
+
+def cache_response(db_job: Any, variant: Tuple[Hashable, ...], body: bytes) -> bytes:
+    """
+    Keeps body for later requests if the job's results can no longer change, storing large
+    unprojected responses too (a failed store is logged). Blocking.
+    """
+    if db_job.status not in FINAL_STATUSES:
+        return body
+    _response_cache.put((db_job.id, db_job.version, variant), body, len(body))
+    object_name = _stored_response_name(db_job.id, variant)
+    if object_name is not None and 0 <= settings.RESULTS_RESPONSE_STORE_MIN_BYTES <= len(body):
+        try:
+            stored = io.BytesIO(b"%d\n" % db_job.version + body)
+            get_storage_backend().put_stream(object_name, stored, "application/json", settings.UPLOAD_PART_SIZE)
+        except Exception as e:
+            print(f"Could not store the {object_name} response: {e}")
+    return body
+
+def encode_response(db_job: Any, variant: Tuple[Hashable, ...], value: Any) -> bytes:
+    """encode_json(value), kept for later requests by cache_response. Blocking."""
+    return cache_response(db_job, variant, encode_json(value))
+
+def parse_fields(fields: Optional[str]) -> List[List[str]]:
+    """'analysis.table_analysis,extraction' -> [["analysis", "table_analysis"], ["extraction"]]"""
+    if not fields:
+        return []
+    return [path.split(".") for path in (f.strip() for f in fields.split(",")) if path]
+
+def _walk(value: Any, path: List[str]) -> Tuple[bool, Any]:
+    for key in path:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return False, None
+    return True, value
+
+async def project_results(results: Optional[Dict[str, Any]], paths: List[List[str]]) -> Dict[str, Any]:
+    """
+    Returns only the requested dotted paths of results, nested under the same keys.
+    List items are addressed by index and appear under that index as a key.
+    Paths that do not exist are left out.
+    """
+    projected: Dict[str, Any] = {}
+    selected: List[List[str]] = []
+    stages: Dict[str, Tuple[bool, Any]] = {}
+    for path in sorted(paths, key=len):
+        if any(path[:len(prefix)] == prefix for prefix in selected):
+            continue # Already included through a shorter path
+        stage = path[0]
+        if stage not in stages:
+            stages[stage] = await artifacts.resolve_stage(results, stage)
+        found, value = stages[stage]
+        if not found:
+            continue
+        found, value = _walk(value, path[1:])
+        if not found:
+            continue
+        target = projected
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+        selected.append(path)
+    return projected
+
+def table_rows_page(stage_output: Any, table_index: int, offset: int, limit: int) -> Dict[str, Any]:
+    """
+    Slices the rows of one table of an extraction/cleaning output.
+    Raises LookupError if the table does not exist and ValueError if its rows were not kept (streamed tables).
+    """
+    tables = stage_output.get("tables") if isinstance(stage_output, dict) else None
+    if not tables or not 0 <= table_index < len(tables):
+        raise LookupError(f"Table {table_index} not found")
+    table = tables[table_index]
+    if not isinstance(table, dict) or "data" not in table:
+        raise ValueError("Rows of this table were not retained (streamed extraction)")
+    data = table["data"] or [[]]
+    rows = data[1:]
+    return {
+        "table_name": table.get("name"),
+        "header": data[0],
+        "offset": offset,
+        "limit": limit,
+        "total_rows": len(rows),
+        "rows": rows[offset:offset + limit],
+    }
@@ -0,0 +1,47 @@
+import logging
+from typing import Dict, Sequence, Tuple
+
+from .. import crud
+from ..core.config import settings
+from ..db import session as db_session
+from .ai_agents.keywords import top_terms
+
+logger = logging.getLogger("udea_logger") # Configured by core/logging_config.py
+
+# Document-frequency index for TF-IDF keywords: how many analyzed documents contain each term.
+# It grows incrementally: each job's text is added once, when its analysis finishes, so keywords
+# favour terms that are frequent in this document but rare across past jobs. Used from wherever
+# the pipeline runs (worker or pipeline pool process).
+
+class DocumentFrequencyIndex:
+    """
+    The index as seen by one job's analysis (ai_agents.keywords.DocumentFrequencies). Blocking.
+    Index errors are logged and never fail the job: keywords then rank by frequency alone.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def lookup(self, terms: Sequence[str]) -> Tuple[int, Dict[str, int]]:
+        db = db_session.SessionLocal()
+        try:
+            return crud.keyword.get_document_frequencies(db, terms)
+        except Exception as e:
+            logger.warning(f"Could not read the keyword index for job {self.job_id}: {e}")
+            return 0, {}
+        finally:
+            db.close()
+
+    def add_document(self, counts: Dict[str, int]) -> None:
+        """Adds the job's KEYWORDS_INDEX_MAX_TERMS most frequent terms (a no-op if the job was indexed before)."""
+        if not counts:
+            return
+        terms = [term for term, _ in top_terms(counts, settings.KEYWORDS_INDEX_MAX_TERMS)]
+        db = db_session.SessionLocal()
+        try:
+            crud.keyword.add_document(db, self.job_id, terms)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not add job {self.job_id} to the keyword index: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,452 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Sequence, Tuple, TypeVar
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from .. import crud
+from ..core import metrics
+from ..core.config import settings
+from ..db import session as db_session
+
+# Shared gateway for LLM calls (any OpenAI-compatible chat completions API at LLM_BASE_URL).
+# Every call names a prompt template (prompts/<template>.md, sent as the system message) and an input
+# (the user message). The gateway bounds the requests in flight (LLM_MAX_CONCURRENCY) and the tokens
+# they carry (LLM_MAX_IN_FLIGHT_TOKENS), spaces them with token buckets for the provider's request
+# and token rate limits, retries throttled and failed requests with exponential backoff and full
+# jitter, coalesces identical calls in flight and answers repeated calls from a persistent cache
+# (models.LLMResponse) keyed by a hash of template, model and input. complete_many() packs small
+# inputs into batch requests.
+# One gateway per process: get_llm_gateway(). Its requests run on an event loop of its own (a daemon
+# thread), and calls made from any other event loop, such as the asyncio.run() of each job in a worker,
+# are handed over to it: every job of the process shares its limits, connections and in-flight calls.
+
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+BATCH_INSTRUCTIONS = """
+
+## Batched Inputs
+
+The user message holds {count} independent inputs, each under a "### Input <n>" heading. Apply the
+instructions above to each input on its own. Answer with only a JSON array of {count} strings, the
+n-th string being your complete answer for input n."""
+
+class LLMError(Exception):
+    """An LLM request was rejected, or still failed after LLM_MAX_RETRIES retries."""
+
+@lru_cache(maxsize=None)
+def load_prompt(template: str) -> Tuple[str, str]:
+    """(text, SHA-256 of the text) of prompts/<template>.md under PROMPTS_DIR."""
+    text = (Path(settings.PROMPTS_DIR) / f"{template}.md").read_text(encoding="utf-8")
+    return text, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate for rate limiting and batching (LLM_CHARS_PER_TOKEN characters per token)."""
+    return int(len(text) / settings.LLM_CHARS_PER_TOKEN) + 1
+
+def cache_key(prompt_digest: str, model: str, text: str, max_tokens: int, temperature: float) -> str:
+    payload = json.dumps([prompt_digest, model, text, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """The Retry-After header in seconds, if the server sent one as a number."""
+    try:
+        return max(float(response.headers["retry-after"]), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter: retrying clients spread out instead of retrying in step."""
+    return random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+def _parse_batch(content: str, count: int) -> Optional[List[str]]:
+    """The answers of a batch response, or None unless it is a JSON array of count answers."""
+    content = content.strip()
+    if content.startswith("```"): # A fenced code block despite the instructions
+        content = content.strip("`").partition("\n")[2]
+    try:
+        answers = json.loads(content)
+    except ValueError:
+        return None
+    if not isinstance(answers, list) or len(answers) != count:
+        return None
+    return [answer if isinstance(answer, str) else json.dumps(answer, ensure_ascii=False) for answer in answers]
+
+BURST_SECONDS = 10 # Token buckets hold this many seconds' allowance: providers enforce limits over short windows too
+
+class TokenBucket:
+    """Allows per_minute units per minute on average, in bursts of up to BURST_SECONDS' allowance. 0 = unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * BURST_SECONDS, 1.0) if per_minute > 0 else 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock() # Waiters are served in order
+
+    async def acquire(self, amount: float = 1) -> None:
+        if self.capacity <= 0:
+            return
+        amount = min(amount, self.capacity) # A request larger than the bucket waits for a full one
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class InFlightTokens:
+    """Bounds the estimated tokens of requests in flight (0 = unlimited); a larger request runs alone."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def hold(self, amount: int) -> AsyncIterator[None]:
+        if self.limit <= 0:
+            yield
+            return
+        amount = min(amount, self.limit)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.used + amount <= self.limit)
+            self.used += amount
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.used -= amount
+                self._condition.notify_all()
+
+T = TypeVar("T")
+
+def _start_loop_thread() -> asyncio.AbstractEventLoop:
+    """A new event loop running in a daemon thread until it is stopped."""
+    loop = asyncio.new_event_loop()
+
+    def run() -> None:
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    threading.Thread(target=run, name="llm-gateway", daemon=True).start()
+    return loop
+
+class LLMGateway:
+    """
+    LLM client. With dedicated_loop, its requests run on an event loop of its own and it can be
+    called from any event loop and thread; otherwise all calls must come from one event loop.
+    Use get_llm_gateway() rather than creating one per call.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        dedicated_loop: bool = False
+    ):
+        self.model = model or settings.LLM_MODEL
+        self._loop = _start_loop_thread() if dedicated_loop else None
+        self._client = httpx.AsyncClient(
+            base_url=(base_url or settings.LLM_BASE_URL).rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key or settings.OPENAI_API_KEY}"},
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=settings.LLM_MAX_CONCURRENCY),
+            transport=transport,
+        )
+        self._slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._in_flight_tokens = InFlightTokens(settings.LLM_MAX_IN_FLIGHT_TOKENS)
+        self._request_bucket = TokenBucket(settings.LLM_REQUESTS_PER_MINUTE)
+        self._token_bucket = TokenBucket(settings.LLM_TOKENS_PER_MINUTE)
+        self._in_flight: Dict[str, asyncio.Future] = {} # cache key -> pending answer
+
+    async def _on_own_loop(self, coroutine: Awaitable[T]) -> T:
+        """Awaits coroutine on the gateway's loop (the limits and futures belong to it)."""
+        if self._loop is None or asyncio.get_running_loop() is self._loop:
+            return await coroutine
+        # Cancelling the caller cancels the call on the gateway's loop too
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self._loop))
+
+    async def aclose(self) -> None:
+        """Closes the HTTP client and stops the dedicated loop, if any."""
+        await self._on_own_loop(self._client.aclose())
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def complete(
+        self,
+        template: str,
+        text: str,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.0
+    ) -> str:
+        """The model's answer to text under the template's instructions. Raises LLMError."""
+        return (await self.complete_many(template, [text], model, max_tokens, temperature))[0]
+
+    async def complete_many(
+        self,
+        template: str,
+        texts: Sequence[str],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.0
+    ) -> List[str]:
+        """
+        Answers for each of texts, in order, as complete() would give them. Inputs not cached or in
+        flight are packed into requests of up to LLM_BATCH_MAX_ITEMS inputs and LLM_BATCH_MAX_TOKENS
+        estimated tokens; a batch whose answer cannot be split is retried input by input. Raises
+        LLMError if any input fails.
+        """
+        return await self._on_own_loop(self._complete_many(template, texts, model, max_tokens, temperature))
+
+    async def _complete_many(
+        self,
+        template: str,
+        texts: Sequence[str],
+        model: Optional[str],
+        max_tokens: Optional[int],
+        temperature: float
+    ) -> List[str]:
+        model = model or self.model
+        max_tokens = max_tokens or settings.LLM_MAX_OUTPUT_TOKENS
+        prompt, digest = load_prompt(template)
+        keys = [cache_key(digest, model, text, max_tokens, temperature) for text in texts]
+
+        # Claim the keys nobody else is resolving; identical calls in flight share one answer
+        answers: Dict[str, asyncio.Future] = {}
+        claimed: Dict[str, str] = {}
+        loop = asyncio.get_running_loop()
+        for key, text in zip(keys, texts):
+            if key in answers:
+                continue
+            if key in self._in_flight:
+                metrics.LLM_REQUESTS.labels(template, "coalesced").inc()
+                answers[key] = self._in_flight[key]
+                continue
+            answers[key] = self._in_flight[key] = loop.create_future()
+            answers[key].add_done_callback(lambda answer, key=key: self._settled(key, answer))
+            claimed[key] = text
+
+        if claimed:
+            try:
+                cached = await self._cache_get(list(claimed))
+                for key, answer in cached.items():
+                    metrics.LLM_REQUESTS.labels(template, "cached").inc()
+                    answers[key].set_result(answer)
+                    del claimed[key]
+                batches = self._batches(list(claimed.items()))
+                await asyncio.gather(*(
+                    self._resolve_batch(template, prompt, batch, answers, model, max_tokens, temperature)
+                    for batch in batches
+                ))
+            finally: # Never leave claimed keys pending, e.g. when this call is cancelled
+                for key in claimed:
+                    if not answers[key].done():
+                        answers[key].set_exception(LLMError("The request was cancelled"))
+        return list(await asyncio.gather(*(asyncio.shield(answers[key]) for key in keys)))
+
+    def _settled(self, key: str, answer: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if not answer.cancelled():
+            answer.exception() # Errors reach the callers awaiting it; not an unretrieved exception when there are none
+
+    def _batches(self, items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """items packed greedily, in order, into batches within the item and token limits."""
+        batches: List[List[Tuple[str, str]]] = []
+        batch: List[Tuple[str, str]] = []
+        tokens = 0
+        for item in items:
+            item_tokens = estimate_tokens(item[1])
+            if batch and (len(batch) >= settings.LLM_BATCH_MAX_ITEMS or tokens + item_tokens > settings.LLM_BATCH_MAX_TOKENS):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(item)
+            tokens += item_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _resolve_batch(
+        self,
+        template: str,
+        prompt: str,
+        batch: List[Tuple[str, str]],
+        answers: Dict[str, asyncio.Future],
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> None:
+        """Requests a batch's answers and sets them (or the error) on the batch's futures."""
+        if len(batch) > 1:
+            user = "\n\n".join(f"### Input {n}\n\n{text}" for n, (_, text) in enumerate(batch, 1))
+            try:
+                content, _ = await self._request(
+                    template, prompt + BATCH_INSTRUCTIONS.format(count=len(batch)), user,
+                    model, max_tokens * len(batch), temperature
+                )
+            except LLMError as e:
+                content = None
+                print(f"LLM batch of {len(batch)} '{template}' inputs failed, retrying them one by one: {e}")
+            results = _parse_batch(content, len(batch)) if content is not None else None
+            if results is not None:
+                await self._cache_put([
+                    {"key": key, "template": template, "model": model, "response": result}
+                    for (key, _), result in zip(batch, results)
+                ])
+                for (key, _), result in zip(batch, results):
+                    answers[key].set_result(result)
+                return
+        await asyncio.gather(*(
+            self._resolve_one(template, prompt, key, text, answers[key], model, max_tokens, temperature)
+            for key, text in batch
+        ))
+
+    async def _resolve_one(
+        self,
+        template: str,
+        prompt: str,
+        key: str,
+        text: str,
+        answer: asyncio.Future,
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> None:
+        try:
+            content, usage = await self._request(template, prompt, text, model, max_tokens, temperature)
+        except LLMError as e:
+            answer.set_exception(e)
+            return
+        await self._cache_put([{
+            "key": key, "template": template, "model": model, "response": content,
+            "prompt_tokens": usage.get("prompt_tokens"), "completion_tokens": usage.get("completion_tokens"),
+        }])
+        answer.set_result(content)
+
+    async def _request(
+        self,
+        template: str,
+        system: str,
+        user: str,
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Tuple[str, Dict[str, Any]]:
+        """(answer, token usage) of one chat completion, retried with backoff. Raises LLMError."""
+        body = {
+            "model": model,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        tokens = estimate_tokens(system) + estimate_tokens(user) + max_tokens
+        error = ""
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            retry_after = None
+            async with self._in_flight_tokens.hold(tokens), self._slots:
+                await self._request_bucket.acquire(1)
+                await self._token_bucket.acquire(tokens)
+                started = time.perf_counter()
+                try:
+                    response = await self._client.post("/chat/completions", json=body)
+                except httpx.TransportError as e: # Includes timeouts
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    metrics.LLM_REQUEST_SECONDS.labels(model).observe(time.perf_counter() - started)
+                    if response.status_code < 400:
+                        try:
+                            data = response.json()
+                            content = data["choices"][0]["message"]["content"]
+                        except (ValueError, KeyError, IndexError, TypeError) as e:
+                            metrics.LLM_REQUESTS.labels(template, "error").inc()
+                            raise LLMError(f"Unexpected response from the LLM API: {e!r}")
+                        usage = data.get("usage") or {}
+                        metrics.LLM_TOKENS.labels(model, "prompt").inc(usage.get("prompt_tokens") or 0)
+                        metrics.LLM_TOKENS.labels(model, "completion").inc(usage.get("completion_tokens") or 0)
+                        metrics.LLM_REQUESTS.labels(template, "ok").inc()
+                        return content or "", usage
+                    error = f"HTTP {response.status_code}: {response.text[:200]}"
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+                    retry_after = _retry_after(response)
+            if attempt < settings.LLM_MAX_RETRIES:
+                metrics.LLM_REQUESTS.labels(template, "retry").inc()
+                await asyncio.sleep(retry_after if retry_after is not None else _backoff(attempt)) # Not holding a slot
+        metrics.LLM_REQUESTS.labels(template, "error").inc()
+        raise LLMError(f"LLM request for '{template}' failed: {error}")
+
+    async def _cache_get(self, keys: List[str]) -> Dict[str, str]:
+        if not settings.LLM_CACHE:
+            return {}
+        return await asyncio.to_thread(_cache_get, keys)
+
+    async def _cache_put(self, entries: List[Dict[str, Any]]) -> None:
+        if settings.LLM_CACHE:
+            await asyncio.to_thread(_cache_put, entries)
+
+def _cache_get(keys: List[str]) -> Dict[str, str]:
+    """Cached responses for keys. A cache failure is logged and treated as a miss. Blocking."""
+    db = db_session.SessionLocal()
+    try:
+        return crud.llm_response.get_responses(db, keys, settings.LLM_CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"Could not read the LLM response cache: {e}")
+        return {}
+    finally:
+        db.close()
+
+def _cache_put(entries: List[Dict[str, Any]]) -> None:
+    """Caches responses. A cache failure is logged and never fails the call. Blocking."""
+    db = db_session.SessionLocal()
+    try:
+        crud.llm_response.save_responses(db, entries)
+    except Exception as e:
+        db.rollback()
+        print(f"Could not write the LLM response cache: {e}")
+    finally:
+        db.close()
+
+_gateway: Optional[LLMGateway] = None
+_gateway_pid: Optional[int] = None
+_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> LLMGateway:
+    """
+    This process's gateway, created on first use with a dedicated event loop, so the limits hold
+    across all the jobs the process runs, whichever event loop they call it from.
+    """
+    global _gateway, _gateway_pid
+    with _gateway_lock:
+        if _gateway is None or _gateway_pid != os.getpid(): # A forked child cannot use its parent's loop thread
+            _gateway, _gateway_pid = LLMGateway(dedicated_loop=True), os.getpid()
+        return _gateway
+
+def set_llm_gateway(gateway: LLMGateway) -> None:
+    """Makes gateway this process's gateway (e.g. one with a test transport)."""
+    global _gateway, _gateway_pid
+    with _gateway_lock:
+        _gateway, _gateway_pid = gateway, os.getpid()
+
+async def close_llm_gateway() -> None:
+    """Closes this process's gateway, if it has one (e.g. when a worker shuts down); the next call creates a new one."""
+    global _gateway
+    with _gateway_lock:
+        gateway, _gateway = (_gateway, None) if _gateway_pid == os.getpid() else (None, None)
+    if gateway is not None:
+        await gateway.aclose()
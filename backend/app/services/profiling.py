@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+import cProfile
+import io
+import marshal
+import uuid
+
+from ..core.config import settings
+from .storage import get_storage_backend
+
+try:
+    import pyinstrument
+except ImportError: # Optional: PROFILER=pyinstrument falls back to cProfile
+    pyinstrument = None
+
+# Per-job profiles, requested with ?profile=true on upload. The report is stored in object storage and
+# referenced from Job.results["profile"]; download it with GET /jobs/{job_id}/profile.
+#   cprofile:     a pstats dump (python -m pstats <file>, snakeviz, ...)
+#   pyinstrument: an HTML report
+
+PROFILE_RESULTS_KEY = "profile"
+_FORMATS = {"cprofile": ("prof", "application/octet-stream"), "pyinstrument": ("html", "text/html")}
+
+def profiler_name() -> str:
+    if settings.PROFILER == "pyinstrument" and pyinstrument is not None:
+        return "pyinstrument"
+    return "cprofile"
+
+@contextmanager
+def profile_run(job_id: int) -> Iterator[Dict[str, Any]]:
+    """
+    Profiles the enclosed code in this thread and stores the report; the yielded dict is then filled
+    with its reference (object_name, format, content_type, size). Storing is blocking and a failure
+    to store is only logged.
+    """
+    name = profiler_name()
+    if name == "pyinstrument":
+        profiler = pyinstrument.Profiler(async_mode="enabled")
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    info: Dict[str, Any] = {}
+    try:
+        yield info
+    finally:
+        if name == "pyinstrument":
+            profiler.stop()
+            data = profiler.output_html().encode("utf-8")
+        else:
+            profiler.disable()
+            profiler.create_stats()
+            data = marshal.dumps(profiler.stats) # The pstats file format, as Profile.dump_stats writes it
+        extension, content_type = _FORMATS[name]
+        object_name = f"profiles/jobs/{job_id}/{uuid.uuid4().hex[:12]}.{extension}"
+        try:
+            get_storage_backend().put_stream(object_name, io.BytesIO(data), content_type, settings.UPLOAD_PART_SIZE)
+            info.update({"object_name": object_name, "format": name, "content_type": content_type, "size": len(data)})
+        except Exception as e:
+            print(f"Could not store the profile of job {job_id}: {e}")
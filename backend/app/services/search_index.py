@@ -0,0 +1,32 @@
+import logging
+from typing import Any, Dict, Optional
+
+from .. import crud
+from ..core.config import settings
+from ..db import session as db_session
+
+logger = logging.getLogger("udea_logger") # Configured by core/logging_config.py
+
+# Cross-job full-text search (GET /search/): the cleaned text of each completed job is indexed when
+# process_file_job completes it (search structures: see models.SearchDocument). run_agents hands the
+# text over under SEARCH_TEXT_KEY in its results; process_file_job removes it before storing them.
+
+SEARCH_TEXT_KEY = "search_text"
+
+def document_text(stage_output: Dict[str, Any]) -> str:
+    """The text to index for a (cleaned) stage output, capped at SEARCH_INDEX_MAX_CHARS."""
+    text = stage_output.get("full_text_content") or ""
+    if isinstance(text, list):
+        text = " \n".join(filter(None, text))
+    return text[:settings.SEARCH_INDEX_MAX_CHARS].replace("\x00", "") # Postgres text cannot hold NUL
+
+def index_job(job_id: int, filename: str, text: Optional[str]) -> None:
+    """Adds or replaces a job's document in the index. A failure is logged and does not fail the job. Blocking."""
+    db = db_session.SessionLocal()
+    try:
+        crud.search.upsert_document(db, job_id, filename or "", text or "")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not index job {job_id} for search: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,334 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Optional
+import asyncio
+import functools
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+import certifi
+import urllib3
+from minio import Minio
+
+from ..core import metrics
+from ..core.config import settings
+
+# Object storage abstraction.
+# Backends expose blocking primitives; async callers go through run_blocking(), which runs them on
+# a bounded thread pool so transfers never stall the event loop.
+
+class StorageBackend:
+    """Blocking object storage primitives. Object names are keys inside the configured bucket."""
+
+    def ensure_bucket(self) -> None:
+        raise NotImplementedError
+
+    def put_stream(self, object_name: str, stream: BinaryIO, content_type: str, part_size: int) -> None:
+        """Stores everything read from stream (until EOF) under object_name."""
+        raise NotImplementedError
+
+    def put_file(self, object_name: str, local_file_path: str, content_type: str) -> None:
+        raise NotImplementedError
+
+    def get_to_file(self, object_name: str, destination_path: str) -> None:
+        raise NotImplementedError
+
+    def open_stream(self, object_name: str) -> BinaryIO:
+        """Opens the object for sequential reading. The caller must close the returned stream."""
+        raise NotImplementedError
+
+    def read_range(self, object_name: str, offset: int, length: int) -> bytes:
+        """Returns up to length bytes starting at offset (fewer at the end of the object)."""
+        raise NotImplementedError
+
+    def size(self, object_name: str) -> int:
+        raise NotImplementedError
+
+    def remove(self, object_name: str) -> None:
+        raise NotImplementedError
+
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+class _ResponseReader(io.RawIOBase):
+    """Raw reader over a urllib3 response that hands the connection back to the pool on close."""
+
+    def __init__(self, response: Any):
+        self._response = response
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._response.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._response.close()
+            self._response.release_conn()
+        super().close()
+
+class RangeReader(io.RawIOBase):
+    """
+    Seekable read-only view of a stored object backed by ranged reads.
+    Wrap it in io.BufferedReader so small reads are served from one larger range request.
+    """
+
+    def __init__(self, backend: "StorageBackend", object_name: str, size: Optional[int] = None):
+        self._backend = backend
+        self._object_name = object_name
+        self._size = backend.size(object_name) if size is None else size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if self._pos < 0:
+            raise ValueError("Negative seek position")
+        return self._pos
+
+    def readinto(self, buffer: Any) -> int:
+        length = min(len(buffer), self._size - self._pos)
+        if length <= 0:
+            return 0
+        data = self._backend.read_range(self._object_name, self._pos, length)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+class MinioStorageBackend(StorageBackend):
+    """
+    MinIO/S3 backend with a tuned HTTP connection pool.
+    Bucket existence is checked once and cached instead of on every upload.
+    """
+
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self._bucket_ready = False
+        self._bucket_lock = threading.Lock()
+        http_client = urllib3.PoolManager(
+            # One connection per storage thread (plus MinIO's parallel multipart part uploads)
+            maxsize=settings.STORAGE_HTTP_POOL_SIZE,
+            block=False,
+            timeout=urllib3.Timeout(connect=10, read=settings.STORAGE_HTTP_TIMEOUT),
+            retries=urllib3.Retry(
+                total=settings.STORAGE_HTTP_RETRIES, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+            ),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        )
+        self.client = Minio(
+            settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_USE_SSL,
+            http_client=http_client,
+        )
+
+    def ensure_bucket(self) -> None:
+        if self._bucket_ready:
+            return
+        with self._bucket_lock:
+            if not self._bucket_ready:
+                if not self.client.bucket_exists(self.bucket_name):
+                    self.client.make_bucket(self.bucket_name)
+                self._bucket_ready = True
+
+    def put_stream(self, object_name: str, stream: BinaryIO, content_type: str, part_size: int) -> None:
+        self.ensure_bucket()
+        # length=-1: size unknown, the client reads part_size bytes per part until EOF
+        self.client.put_object(self.bucket_name, object_name, stream, length=-1, part_size=part_size, content_type=content_type)
+
+    def put_file(self, object_name: str, local_file_path: str, content_type: str) -> None:
+        self.ensure_bucket()
+        self.client.fput_object(self.bucket_name, object_name, local_file_path, content_type=content_type)
+
+    def get_to_file(self, object_name: str, destination_path: str) -> None:
+        self.client.fget_object(self.bucket_name, object_name, destination_path)
+
+    def open_stream(self, object_name: str) -> BinaryIO:
+        response = self.client.get_object(self.bucket_name, object_name)
+        return io.BufferedReader(_ResponseReader(response), buffer_size=STREAM_BUFFER_SIZE)
+
+    def read_range(self, object_name: str, offset: int, length: int) -> bytes:
+        if length <= 0:
+            return b""
+        response = self.client.get_object(self.bucket_name, object_name, offset=offset, length=length)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def size(self, object_name: str) -> int:
+        return self.client.stat_object(self.bucket_name, object_name).size
+
+    def remove(self, object_name: str) -> None:
+        self.client.remove_object(self.bucket_name, object_name)
+
+class LocalStorageBackend(StorageBackend):
+    """Stores objects as files under LOCAL_STORAGE_ROOT/<bucket>/ (tests and local development)."""
+
+    def __init__(self, root: str, bucket_name: str):
+        self.base_dir = os.path.join(root, bucket_name)
+
+    def _path(self, object_name: str) -> str:
+        path = os.path.abspath(os.path.join(self.base_dir, object_name))
+        if not path.startswith(os.path.abspath(self.base_dir) + os.sep):
+            raise ValueError(f"Invalid object name: {object_name}")
+        return path
+
+    def ensure_bucket(self) -> None:
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def put_stream(self, object_name: str, stream: BinaryIO, content_type: str, part_size: int) -> None:
+        path = self._path(object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial object
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := stream.read(part_size):
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def put_file(self, object_name: str, local_file_path: str, content_type: str) -> None:
+        with open(local_file_path, "rb") as f:
+            self.put_stream(object_name, f, content_type, 1024 * 1024)
+
+    def get_to_file(self, object_name: str, destination_path: str) -> None:
+        shutil.copyfile(self._path(object_name), destination_path)
+
+    def open_stream(self, object_name: str) -> BinaryIO:
+        return open(self._path(object_name), "rb")
+
+    def read_range(self, object_name: str, offset: int, length: int) -> bytes:
+        with open(self._path(object_name), "rb") as f:
+            f.seek(offset)
+            return f.read(max(0, length))
+
+    def size(self, object_name: str) -> int:
+        return os.path.getsize(self._path(object_name))
+
+    def remove(self, object_name: str) -> None:
+        os.remove(self._path(object_name))
+
+class _MeteredReader(io.RawIOBase):
+    """Counts the bytes read from a stream into the storage bytes metric."""
+
+    def __init__(self, stream: BinaryIO, direction: str):
+        self._stream = stream
+        self._bytes = metrics.STORAGE_BYTES.labels(direction)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        read = self._stream.readinto(buffer)
+        if read:
+            self._bytes.inc(read)
+        return read
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._bytes.inc(len(data))
+        return data
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close()
+        super().close()
+
+class MeteredStorageBackend(StorageBackend):
+    """Wraps a backend to record call durations and transferred bytes (udea_storage_* metrics)."""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+
+    def ensure_bucket(self) -> None:
+        with metrics.measure_storage("ensure_bucket"):
+            self.backend.ensure_bucket()
+
+    def put_stream(self, object_name: str, stream: BinaryIO, content_type: str, part_size: int) -> None:
+        with metrics.measure_storage("put"):
+            self.backend.put_stream(object_name, _MeteredReader(stream, "write"), content_type, part_size)
+
+    def put_file(self, object_name: str, local_file_path: str, content_type: str) -> None:
+        with metrics.measure_storage("put"):
+            self.backend.put_file(object_name, local_file_path, content_type)
+        metrics.STORAGE_BYTES.labels("write").inc(os.path.getsize(local_file_path))
+
+    def get_to_file(self, object_name: str, destination_path: str) -> None:
+        with metrics.measure_storage("get"):
+            self.backend.get_to_file(object_name, destination_path)
+        metrics.STORAGE_BYTES.labels("read").inc(os.path.getsize(destination_path))
+
+    def open_stream(self, object_name: str) -> BinaryIO:
+        # Times the request; the transfer is counted as the caller reads
+        with metrics.measure_storage("open"):
+            stream = self.backend.open_stream(object_name)
+        return io.BufferedReader(_MeteredReader(stream, "read"), buffer_size=STREAM_BUFFER_SIZE)
+
+    def read_range(self, object_name: str, offset: int, length: int) -> bytes:
+        with metrics.measure_storage("read_range"):
+            data = self.backend.read_range(object_name, offset, length)
+        metrics.STORAGE_BYTES.labels("read").inc(len(data))
+        return data
+
+    def size(self, object_name: str) -> int:
+        with metrics.measure_storage("stat"):
+            return self.backend.size(object_name)
+
+    def remove(self, object_name: str) -> None:
+        with metrics.measure_storage("remove"):
+            self.backend.remove(object_name)
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=settings.STORAGE_MAX_WORKERS, thread_name_prefix="storage")
+
+def get_storage_backend() -> StorageBackend:
+    """Returns the process-wide backend selected by STORAGE_BACKEND ("minio" or "local")."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.STORAGE_BACKEND == "local":
+                    backend = LocalStorageBackend(settings.LOCAL_STORAGE_ROOT, settings.MINIO_BUCKET_NAME)
+                elif settings.STORAGE_BACKEND == "minio":
+                    backend = MinioStorageBackend(settings.MINIO_BUCKET_NAME)
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+                _backend = MeteredStorageBackend(backend)
+    return _backend
+
+def set_storage_backend(backend: StorageBackend) -> None:
+    """Overrides the backend (e.g. a LocalStorageBackend in tests)."""
+    global _backend
+    _backend = backend if isinstance(backend, MeteredStorageBackend) else MeteredStorageBackend(backend)
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs a blocking storage call on the bounded storage thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,197 @@
+"""
+Synthetic corpus for the pipeline benchmarks: CSV tables, plain-text documents and PDFs.
+
+Files are deterministic for a given seed, so benchmark runs (and their baselines) compare like
+with like. CSV columns are a mix of an integer id, low-cardinality categories, plain numbers,
+currency amounts ("$1,234.56", the cleaner's currency path) and dates in several formats (its
+date pattern); cells get stray whitespace now and then for the whitespace normalization.
+PDFs are written directly (no PDF library): pages of text, some with a ruled table, and a share
+of "scanned" pages holding only an image (no text layer).
+
+Usage (from backend/):
+    python -m benchmarks.corpus csv /tmp/bench.csv --rows 100000 --columns 10 --cardinality 50
+    python -m benchmarks.corpus txt /tmp/bench.txt --size-mb 20
+    python -m benchmarks.corpus pdf /tmp/bench.pdf --pages 1000 --table-ratio 0.2 --scanned-ratio 0.05
+"""
+import argparse
+import csv
+import random
+import zlib
+from typing import BinaryIO, List
+
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+_WORDS = (
+    "system design service request latency throughput cache queue worker storage database index "
+    "partition replica schema table column document report analysis pipeline stage batch stream "
+    "customer order invoice payment account region product category supplier warehouse shipment "
+    "the a of and to in for on with by from is are was be this that it as at or an which"
+).split()
+
+def column_kinds(columns: int, currency_ratio: float, date_ratio: float) -> List[str]:
+    """Kinds of the columns after the id: currency and date shares first, the rest alternate category/number."""
+    others = max(columns - 1, 0)
+    currency = min(round(others * currency_ratio), others)
+    dates = min(round(others * date_ratio), others - currency)
+    rest = others - currency - dates
+    return ["currency"] * currency + ["date"] * dates + [("category", "number")[i % 2] for i in range(rest)]
+
+def _date(rng: random.Random) -> str:
+    year, month, day = rng.randint(2015, 2025), rng.randint(1, 12), rng.randint(1, 28)
+    style = rng.randrange(4)
+    if style == 0:
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    if style == 1:
+        return f"{month:02d}/{day:02d}/{year:04d}"
+    if style == 2:
+        return f"{_MONTHS[month - 1]} {day}, {year}"
+    return f"{day} {_MONTHS[month - 1][:3]} {year}"
+
+def _cell(kind: str, rng: random.Random, categories: List[str]) -> str:
+    if kind == "currency":
+        return f"${rng.uniform(0, 100000):,.2f}"
+    if kind == "date":
+        return _date(rng)
+    if kind == "number":
+        return f"{rng.gauss(500, 150):.3f}"
+    value = rng.choice(categories)
+    return f"  {value} " if rng.random() < 0.05 else value
+
+def generate_csv(
+    path: str,
+    rows: int,
+    columns: int = 8,
+    cardinality: int = 50,
+    currency_ratio: float = 0.25,
+    date_ratio: float = 0.25,
+    seed: int = 0
+) -> int:
+    """Writes a CSV with a header, rows data rows and columns columns; returns its size in bytes."""
+    rng = random.Random(seed)
+    kinds = column_kinds(columns, currency_ratio, date_ratio)
+    categories = [f"{rng.choice(_WORDS)}_{i}" for i in range(max(cardinality, 1))]
+    header = ["id"] + [f"{kind}_{i}" for i, kind in enumerate(kinds)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in range(rows):
+            writer.writerow([str(row)] + [_cell(kind, rng, categories) for kind in kinds])
+        return f.tell()
+
+def generate_txt(path: str, size_mb: float, seed: int = 0) -> int:
+    """Writes about size_mb MiB of word-salad paragraphs; returns the size in bytes."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            sentences = []
+            for _ in range(rng.randint(3, 8)):
+                words = rng.choices(_WORDS, k=rng.randint(6, 20))
+                sentences.append(" ".join(words).capitalize() + ".")
+            paragraph = " ".join(sentences) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+    return written
+
+def _pdf_string(text: str) -> str:
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def _pdf_page_content(rng: random.Random, table: bool) -> bytes:
+    """Content stream of a text page: about 40 lines of prose, or 20 lines and a 4-column ruled table."""
+    lines = []
+    for _ in range(20 if table else 40):
+        words = rng.choices(_WORDS, k=rng.randint(8, 14))
+        lines.append(" ".join(words).capitalize() + ".")
+    ops = ["BT /F1 10 Tf 14 TL 50 790 Td"] + [f"{_pdf_string(line)} Tj T*" for line in lines] + ["ET"]
+    if table:
+        rows, columns, width, height, left, top = 12, 4, 120, 18, 50, 480
+        ops.append("0.5 w")
+        for r in range(rows + 1):
+            ops.append(f"{left} {top - r * height} m {left + columns * width} {top - r * height} l S")
+        for c in range(columns + 1):
+            ops.append(f"{left + c * width} {top} m {left + c * width} {top - rows * height} l S")
+        for r in range(rows):
+            cells = ["item", "region", "quantity", "amount"] if r == 0 else [
+                f"{rng.choice(_WORDS)}_{r}", rng.choice(_WORDS), str(rng.randint(1, 500)), f"${rng.uniform(0, 10000):,.2f}"
+            ]
+            for c, cell in enumerate(cells):
+                ops.append(f"BT /F1 9 Tf {left + c * width + 4} {top - (r + 1) * height + 5} Td {_pdf_string(cell)} Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+def generate_pdf(path: str, pages: int, table_ratio: float = 0.2, scanned_ratio: float = 0.05, seed: int = 0) -> int:
+    """
+    Writes a PDF of pages A4 pages: text pages, table_ratio of them with a ruled table, and
+    scanned_ratio of image-only pages; returns its size in bytes. Written object by object, so
+    memory does not grow with pages.
+    """
+    rng = random.Random(seed)
+    offsets: List[int] = []
+
+    def write_object(f: BinaryIO, number: int, body: bytes, stream: bytes = b"") -> None:
+        offsets.append(f.tell())
+        assert len(offsets) == number
+        f.write(f"{number} 0 obj\n".encode() + body)
+        if stream:
+            f.write(b"\nstream\n" + stream + b"\nendstream")
+        f.write(b"\nendobj\n")
+
+    # Objects: 1 catalog, 2 page tree, 3 font, 4 scan image, then a page and its content per page
+    page_numbers = [5 + 2 * i for i in range(pages)]
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        write_object(f, 1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{number} 0 R" for number in page_numbers)
+        write_object(f, 2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        write_object(f, 3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        scan = zlib.compress(bytes(rng.randrange(160, 256) for _ in range(200 * 280)))
+        write_object(f, 4, (
+            f"<< /Type /XObject /Subtype /Image /Width 200 /Height 280 /ColorSpace /DeviceGray "
+            f"/BitsPerComponent 8 /Filter /FlateDecode /Length {len(scan)} >>"
+        ).encode(), scan)
+        for number in page_numbers:
+            roll = rng.random()
+            if roll < scanned_ratio:
+                content = b"q 595 0 0 842 0 0 cm /Im1 Do Q"
+            else:
+                content = _pdf_page_content(rng, roll < scanned_ratio + table_ratio)
+            content = zlib.compress(content)
+            write_object(f, number, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {number + 1} 0 R "
+                f"/Resources << /Font << /F1 3 0 R >> /XObject << /Im1 4 0 R >> >> >>"
+            ).encode())
+            write_object(f, number + 1, f"<< /Length {len(content)} /Filter /FlateDecode >>".encode(), content)
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        f.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        return f.tell()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+    csv_parser = subparsers.add_parser("csv")
+    csv_parser.add_argument("path")
+    csv_parser.add_argument("--rows", type=int, default=100000)
+    csv_parser.add_argument("--columns", type=int, default=8)
+    csv_parser.add_argument("--cardinality", type=int, default=50)
+    csv_parser.add_argument("--currency-ratio", type=float, default=0.25)
+    csv_parser.add_argument("--date-ratio", type=float, default=0.25)
+    csv_parser.add_argument("--seed", type=int, default=0)
+    txt_parser = subparsers.add_parser("txt")
+    txt_parser.add_argument("path")
+    txt_parser.add_argument("--size-mb", type=float, default=10)
+    txt_parser.add_argument("--seed", type=int, default=0)
+    pdf_parser = subparsers.add_parser("pdf")
+    pdf_parser.add_argument("path")
+    pdf_parser.add_argument("--pages", type=int, default=100)
+    pdf_parser.add_argument("--table-ratio", type=float, default=0.2)
+    pdf_parser.add_argument("--scanned-ratio", type=float, default=0.05)
+    pdf_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.kind == "pdf":
+        size = generate_pdf(args.path, args.pages, args.table_ratio, args.scanned_ratio, args.seed)
+    elif args.kind == "csv":
+        size = generate_csv(args.path, args.rows, args.columns, args.cardinality, args.currency_ratio, args.date_ratio, args.seed)
+    else:
+        size = generate_txt(args.path, args.size_mb, args.seed)
+    print(f"Wrote {args.path} ({size / 1024 / 1024:.1f} MB)")
@@ -0,0 +1,139 @@
+"""
+LLM gateway load test against the mock API (benchmarks/mock_llm_server.py).
+
+Runs, with a temporary SQLite response cache:
+  - distinct:  --calls concurrent complete() calls with distinct inputs (concurrency bound, rate limits)
+  - cached:    the same calls again (answered from the cache, no requests)
+  - coalesced: --calls concurrent identical calls (one request)
+  - batched:   complete_many() over --calls small inputs (packed into batch requests)
+  - failures:  --calls distinct calls with --failure-rate of requests failing with 429/503 (retries)
+  - document:  map-reduce summary and key fields of a --pages page document (ai_agents/map_reduce.py)
+  - jobs:      --jobs other documents of that size at once, each in its own event loop and thread
+               like worker job slots, through the one gateway (its limits hold across jobs)
+and reports, per scenario, wall time, requests the API received, the highest number in flight,
+failures and calls that failed after all retries. By default the mock runs in this process (httpx ASGI transport); --url targets a running
+server instead, e.g. `uvicorn benchmarks.mock_llm_server:app --port 8010` and --url http://127.0.0.1:8010/v1.
+
+Rate limits are off unless LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE are set; other gateway
+settings come from the environment as usual.
+
+Usage (from backend/):
+    python -m benchmarks.llm_gateway_load --calls 500 --latency 0.05
+    LLM_MAX_CONCURRENCY=16 LLM_REQUESTS_PER_MINUTE=600 python -m benchmarks.llm_gateway_load
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+_WORKDIR = tempfile.mkdtemp(prefix="udea-llm-bench-")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{os.path.join(_WORKDIR, 'llm.db')}")
+# No rate limits unless set in the environment: they would dominate the timings
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+
+import httpx
+
+from app.core.config import settings
+from app.db import base, session as db_session
+from app.services import llm_gateway
+from app.services.ai_agents import map_reduce
+from benchmarks import corpus, mock_llm_server
+
+TEMPLATE = "analyzer"
+PAGE_BYTES = 3000 # About one page of prose
+
+async def _document(path: str) -> List[Any]:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    chunks = map_reduce.token_chunks(text)
+    return list(await asyncio.gather(map_reduce.summarize(text, chunks=chunks), map_reduce.extract_key_fields(text, chunks)))
+
+def _jobs(paths: List[str]) -> List[Any]:
+    """_document() of each of paths in a thread of its own, each with its own event loop (asyncio.run per job)."""
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        futures = [executor.submit(asyncio.run, _document(path)) for path in paths]
+    answers: List[Any] = []
+    for future in futures:
+        try:
+            answers.extend(future.result())
+        except Exception as e:
+            answers.append(e)
+    return answers
+
+async def _mock(client: Optional[httpx.AsyncClient], path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    if client is None: # In process
+        if path == "/reset":
+            mock_llm_server.config.update(body or {})
+            mock_llm_server._reset_stats()
+        return dict(mock_llm_server.stats)
+    response = await (client.post(path, json=body or {}) if path == "/reset" else client.get(path))
+    response.raise_for_status()
+    return response.json()
+
+async def main(calls: int, latency: float, failure_rate: float, pages: int, jobs: int, url: Optional[str]) -> None:
+    base.Base.metadata.create_all(bind=db_session.engine)
+    if url:
+        gateway = llm_gateway.LLMGateway(base_url=url, dedicated_loop=True)
+        control: Optional[httpx.AsyncClient] = httpx.AsyncClient(base_url=url.rstrip("/").rsplit("/v1", 1)[0])
+    else:
+        gateway = llm_gateway.LLMGateway(
+            base_url="http://mock-llm/v1", transport=httpx.ASGITransport(app=mock_llm_server.app), dedicated_loop=True
+        )
+        control = None
+    llm_gateway.set_llm_gateway(gateway) # For map_reduce
+    document = os.path.join(_WORKDIR, "document.txt")
+    corpus.generate_txt(document, pages * PAGE_BYTES / (1024 * 1024))
+    job_documents = [os.path.join(_WORKDIR, f"job-{i}.txt") for i in range(1, jobs + 1)]
+    for seed, path in enumerate(job_documents, 1):
+        corpus.generate_txt(path, pages * PAGE_BYTES / (1024 * 1024), seed)
+    distinct = [f"Document {i}: quarterly revenue grew in region {i % 7} while costs fell." for i in range(calls)]
+
+    scenarios: List[tuple] = [
+        ("distinct", 0.0, lambda: asyncio.gather(*(gateway.complete(TEMPLATE, text) for text in distinct), return_exceptions=True)),
+        ("cached", 0.0, lambda: asyncio.gather(*(gateway.complete(TEMPLATE, text) for text in distinct), return_exceptions=True)),
+        ("coalesced", 0.0, lambda: asyncio.gather(*(gateway.complete(TEMPLATE, "The same input") for _ in range(calls)), return_exceptions=True)),
+        ("batched", 0.0, lambda: gateway.complete_many(TEMPLATE, [f"Short note {i}" for i in range(calls)])),
+        ("failures", failure_rate, lambda: asyncio.gather(*(gateway.complete(TEMPLATE, f"Retry {text}") for text in distinct), return_exceptions=True)),
+        ("document", 0.0, lambda: _document(document)),
+        ("jobs", 0.0, lambda: asyncio.to_thread(_jobs, job_documents)),
+    ]
+    print(
+        f"{'scenario':<10} {'seconds':>8} {'answers':>8} {'requests':>9} {'batches':>8} {'in flight':>10} {'failures':>9} {'errors':>7}"
+        f"   (LLM_MAX_CONCURRENCY={settings.LLM_MAX_CONCURRENCY}, latency {latency}s)"
+    )
+    try:
+        for name, rate, run in scenarios:
+            await _mock(control, "/reset", {"latency": latency, "failure_rate": rate})
+            started = time.perf_counter()
+            answers = await run()
+            elapsed = time.perf_counter() - started
+            errors = sum(isinstance(answer, Exception) for answer in answers) # Failed after LLM_MAX_RETRIES retries
+            stats = await _mock(control, "/stats")
+            print(
+                f"{name:<10} {elapsed:>8.2f} {len(answers):>8} {stats['requests']:>9} {stats['batch_requests']:>8} "
+                f"{stats['max_in_flight']:>10} {stats['failures']:>9} {errors:>7}"
+            )
+        print(f"(document: {pages} pages; jobs: {jobs} documents, {stats['requests'] * latency:.2f}s of API latency if their requests ran one by one)")
+    finally:
+        await gateway.aclose()
+        if control is not None:
+            await control.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock API latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.3, help="Share of failing requests in the failures scenario")
+    parser.add_argument("--pages", type=int, default=200, help="Size of the document scenario's text")
+    parser.add_argument("--jobs", type=int, default=4, help="Documents run at once in the jobs scenario")
+    parser.add_argument("--url", help="A running mock API, e.g. http://127.0.0.1:8010/v1")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.calls, args.latency, args.failure_rate, args.pages, args.jobs, args.url))
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
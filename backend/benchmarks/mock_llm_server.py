@@ -0,0 +1,98 @@
+"""
+Mock OpenAI-compatible chat completions API for exercising the LLM gateway without a provider.
+
+POST /v1/chat/completions answers after a configurable latency, fails a configurable share of
+requests with 429 or 503 (with Retry-After), and answers batch requests (the gateway's
+"### Input <n>" sections) with a JSON array and prompts asking for a JSON object with one. It
+records requests, failures and the highest number of requests it saw in flight:
+  GET  /stats   the counters
+  POST /reset   clears the counters; an optional JSON body updates the settings below
+Settings (also from the environment at startup): MOCK_LLM_LATENCY seconds, MOCK_LLM_FAILURE_RATE
+(0..1), MOCK_LLM_RETRY_AFTER seconds.
+
+Usage (from backend/):
+    uvicorn benchmarks.mock_llm_server:app --port 8010
+    LLM_BASE_URL=http://127.0.0.1:8010/v1 ...
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+INPUT_HEADING_RE = re.compile(r"^### Input (\d+)\n\n", re.MULTILINE)
+
+config: Dict[str, float] = {
+    "latency": float(os.environ.get("MOCK_LLM_LATENCY", "0.05")),
+    "failure_rate": float(os.environ.get("MOCK_LLM_FAILURE_RATE", "0")),
+    "retry_after": float(os.environ.get("MOCK_LLM_RETRY_AFTER", "0.05")),
+}
+stats: Dict[str, int] = {}
+
+def _reset_stats() -> None:
+    stats.update({"requests": 0, "batch_requests": 0, "batched_inputs": 0, "failures": 0, "in_flight": 0, "max_in_flight": 0})
+
+_reset_stats()
+
+app = FastAPI(title="Mock LLM API")
+
+def _answer(text: str) -> str:
+    """A deterministic stand-in answer for an input."""
+    words = text.split()
+    return f"[{hashlib.sha256(text.encode('utf-8')).hexdigest()[:8]}] {' '.join(words[:12])}"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Any:
+    body = await request.json()
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(config["latency"])
+        if random.random() < config["failure_rate"]:
+            stats["failures"] += 1
+            status = random.choice((429, 503))
+            return JSONResponse(
+                {"error": {"message": "Mock failure", "code": status}},
+                status_code=status, headers={"Retry-After": str(config["retry_after"])}
+            )
+        system, user = body["messages"][0]["content"], body["messages"][-1]["content"]
+        if "### Input 1" in user and "JSON array" in system:
+            inputs = INPUT_HEADING_RE.split(user)[2::2]
+            stats["batch_requests"] += 1
+            stats["batched_inputs"] += len(inputs)
+            content = json.dumps([_answer(text.strip()) for text in inputs])
+        elif "single JSON object" in system: # e.g. prompts/key_fields.md
+            content = json.dumps({"Mock Field": _answer(user)})
+        else:
+            content = _answer(user)
+        return {
+            "id": "mock",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": (len(system) + len(user)) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(system) + len(user) + len(content)) // 4,
+            },
+        }
+    finally:
+        stats["in_flight"] -= 1
+
+@app.get("/stats")
+async def get_stats() -> Dict[str, Any]:
+    return {**stats, "config": config}
+
+@app.post("/reset")
+async def reset(request: Request) -> Dict[str, Any]:
+    body = await request.body()
+    if body:
+        config.update({name: float(value) for name, value in json.loads(body).items() if name in config})
+    _reset_stats()
+    return {**stats, "config": config}
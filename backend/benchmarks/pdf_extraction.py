@@ -0,0 +1,73 @@
+"""
+PDF extraction benchmark: pages per second by page pool size.
+
+Generates a synthetic PDF (benchmarks/corpus.py: text pages, ruled tables and image-only pages)
+and extracts it through extractor_agent.extract_from_pdf, from the local file or, with --storage,
+from the local-filesystem storage backend through ranged reads (as jobs read uploads), once per
+--pool-sizes value (0 = in this process). Reports wall time, pages per second and the peak
+resident memory of this process and of its largest pool process so far (getrusage maxrss).
+
+Usage (from backend/):
+    python -m benchmarks.pdf_extraction --pages 1000 --pool-sizes 0 4 8
+    python -m benchmarks.pdf_extraction --pages 200 --pages-spec 1-50,150- --storage
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import resource
+from typing import List, Optional
+
+# Pool processes re-import this module: they reuse the parent's directory through the environment
+_WORKDIR = os.environ.get("UDEA_PDF_BENCH_DIR") or tempfile.mkdtemp(prefix="udea-pdf-bench-")
+os.environ.update({
+    "UDEA_PDF_BENCH_DIR": _WORKDIR, "STORAGE_BACKEND": "local", "LOCAL_STORAGE_ROOT": os.path.join(_WORKDIR, "storage")
+})
+
+from app.core.config import settings
+from app.services.ai_agents import extractor_agent, pdf_extractor
+from app.services.ai_agents.sources import LocalFileSource, StorageObjectSource
+from app.services.storage import get_storage_backend
+from benchmarks import corpus
+
+def main(pages: int, pool_sizes: List[int], pages_spec: Optional[str], storage: bool) -> None:
+    path = os.path.join(_WORKDIR, "bench.pdf")
+    size = corpus.generate_pdf(path, pages)
+    source = LocalFileSource(path)
+    if storage:
+        backend = get_storage_backend()
+        backend.ensure_bucket()
+        backend.put_file("bench.pdf", path, "application/pdf")
+        source = StorageObjectSource("bench.pdf")
+    print(f"{pages} pages, {size / 1024 / 1024:.1f} MB, {settings.PDF_PAGES_PER_TASK} pages per task, source: {type(source).__name__}")
+    print(f"{'pool':>5} {'seconds':>8} {'pages/s':>8} {'extracted':>10} {'tables':>7} {'peak MB':>8} {'pool MB':>8}")
+    for pool_size in pool_sizes:
+        settings.PDF_PROCESS_POOL_SIZE = pool_size
+        if pool_size > 1: # Start the pool's processes before timing
+            list(pdf_extractor._get_pdf_pool().map(abs, range(pool_size * 4)))
+        started = time.perf_counter()
+        output = extractor_agent.extract_from_pdf(source, pages_spec)
+        elapsed = time.perf_counter() - started
+        if pdf_extractor._pdf_pool is not None: # Children count in RUSAGE_CHILDREN once they have exited
+            pdf_extractor._pdf_pool.shutdown()
+            pdf_extractor._pdf_pool = None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+        pool_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        extracted = output.get("pdf_pages", {}).get("pages_extracted", 0)
+        print(
+            f"{pool_size:>5} {elapsed:>8.2f} {extracted / elapsed:>8.1f} {extracted:>10} "
+            f"{len(output['tables']):>7} {peak:>8.1f} {pool_peak:>8.1f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--pages-spec", help='Page ranges to extract, e.g. "1-50,150-"')
+    parser.add_argument("--storage", action="store_true", help="Read the PDF from storage with ranged reads")
+    args = parser.parse_args()
+    try:
+        main(args.pages, args.pool_sizes, args.pages_spec, args.storage)
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
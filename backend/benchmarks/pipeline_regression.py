@@ -0,0 +1,257 @@
+"""
+Agent pipeline benchmark with stored baselines: fails when throughput or memory regresses.
+
+Generates a synthetic corpus (benchmarks/corpus.py) and measures, for a CSV and a TXT file:
+  - each agent on its own (extraction, cleaning, analysis; the CSV through the in-memory path)
+  - the whole job through process_file_job: claim, extraction from storage, cleaning, analysis,
+    checkpoints, result offloading and completion (the CSV also with streaming extraction)
+against a temporary SQLite database and the local-filesystem storage backend, in this process
+(PIPELINE_PROCESS_POOL_SIZE=0). Time is the best of --runs runs; memory is the peak of Python
+allocations during one extra run under tracemalloc.
+
+Results are compared with benchmarks/pipeline_baselines.json: the run fails (exit status 1) when a
+step's throughput drops, or its peak memory grows, by more than --threshold (memory increases
+below --memory-floor-mb are ignored). Baselines are only comparable on the same corpus settings
+and similar hardware; record new ones with --update-baselines after an intended change.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline_regression
+    python -m benchmarks.pipeline_regression --rows 200000 --txt-mb 20 --runs 5 --update-baselines
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# The application reads its settings at import: point it at a throwaway database and storage root
+_WORKDIR = tempfile.mkdtemp(prefix="udea-bench-")
+os.environ.update({
+    "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(_WORKDIR, 'bench.db')}",
+    "STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_ROOT": os.path.join(_WORKDIR, "storage"),
+    "PIPELINE_PROCESS_POOL_SIZE": "0",
+    "EVENTS_BACKEND": "memory",
+    "METRICS_TRACEMALLOC": "False",
+})
+
+from app import crud, schemas
+from app.core.config import settings
+from app.db import base, models, session as db_session
+from app.services.ai_agents import analyzer_agent, cleaner_agent, extractor_agent
+from app.services.job_orchestrator import process_file_job
+from app.services.storage import get_storage_backend
+
+from . import corpus
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_baselines.json")
+
+Measurement = Dict[str, Optional[float]]
+
+async def _timed(step: Callable[[], Awaitable[Any]]) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = await step()
+    return time.perf_counter() - started, result
+
+async def _traced(step: Callable[[], Awaitable[Any]]) -> Tuple[int, Any]:
+    """Peak Python allocations of step, above what was allocated before it."""
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = await step()
+    return tracemalloc.get_traced_memory()[1] - before, result
+
+async def _agent_steps(path: str, content_type: str, name: str, measure: Callable) -> Dict[str, Any]:
+    """Runs the three agents in sequence, each measured separately; returns {stage: measure(...)[0]}."""
+    measured: Dict[str, Any] = {}
+    measured["extraction"], extracted = await measure(
+        lambda: extractor_agent.run_extraction_agent(path, content_type, name, streaming=False)
+    )
+    measured["cleaning"], cleaned = await measure(lambda: cleaner_agent.run_cleaning_agent(extracted))
+    measured["analysis"], _ = await measure(lambda: analyzer_agent.run_analysis_agent(cleaned))
+    return measured
+
+def _store_file(path: str, content_type: str) -> int:
+    """Uploads the file to storage and registers it; returns the uploaded file's id."""
+    object_name = f"bench/{os.path.basename(path)}"
+    with open(path, "rb") as f:
+        get_storage_backend().put_stream(object_name, f, content_type, settings.UPLOAD_PART_SIZE)
+    db = db_session.SessionLocal()
+    try:
+        uploaded_file = crud.file.create_uploaded_file(db, schemas.file.UploadedFileCreate(
+            filename=os.path.basename(path), original_filename=os.path.basename(path),
+            content_type=content_type, file_path=object_name
+        ))
+        return uploaded_file.id
+    finally:
+        db.close()
+
+def _job_step(uploaded_file_id: int) -> Callable[[], Awaitable[None]]:
+    """A step that processes a fresh job for the uploaded file (no checkpoints to resume from)."""
+    async def step() -> None:
+        db = db_session.SessionLocal()
+        try:
+            job_id = crud.job.create_job(db, schemas.job.JobCreate(uploaded_file_id=uploaded_file_id)).id
+        finally:
+            db.close()
+        await process_file_job(job_id, db_session.get_db)
+        db = db_session.SessionLocal()
+        try:
+            job = crud.job.get_job(db, job_id, with_results=False)
+            if job.status != models.JobStatus.COMPLETED:
+                raise RuntimeError(f"Benchmark job {job_id} ended {job.status}")
+        finally:
+            db.close()
+    return step
+
+def _measurement(seconds: float, peak_bytes: int, size_bytes: int, rows: int) -> Measurement:
+    return {
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(size_bytes / 1024 / 1024 / seconds, 3),
+        "rows_per_s": round(rows / seconds, 1) if rows else None,
+        "peak_mb": round(peak_bytes / 1024 / 1024, 2),
+    }
+
+async def run_benchmarks(files: Dict[str, Tuple[str, str, int]], runs: int) -> Dict[str, Measurement]:
+    """files maps a scenario ("csv", "txt") to (path, content_type, data rows); returns {"scenario/step": measurement}."""
+    results: Dict[str, Measurement] = {}
+    for scenario, (path, content_type, rows) in files.items():
+        size_bytes = os.path.getsize(path)
+        name = os.path.basename(path)
+        uploaded_file_id = _store_file(path, content_type)
+        steps: List[Tuple[str, Callable[[], Awaitable[Any]], Optional[int]]] = [("job", _job_step(uploaded_file_id), None)]
+        if scenario == "csv":
+            steps.append(("job-streamed", _job_step(uploaded_file_id), 0))
+
+        best: Dict[str, float] = {}
+        for _ in range(runs):
+            timings = await _agent_steps(path, content_type, name, _timed)
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+            for step_name, step, streaming_threshold in steps:
+                seconds, _ = await _timed(_with_streaming_threshold(step, streaming_threshold))
+                best[step_name] = min(seconds, best.get(step_name, seconds))
+
+        tracemalloc.start()
+        try:
+            peaks = await _agent_steps(path, content_type, name, _traced)
+            for step_name, step, streaming_threshold in steps:
+                peaks[step_name], _ = await _traced(_with_streaming_threshold(step, streaming_threshold))
+        finally:
+            tracemalloc.stop()
+
+        for step_name, seconds in best.items():
+            results[f"{scenario}/{step_name}"] = _measurement(seconds, peaks[step_name], size_bytes, rows)
+    return results
+
+def _with_streaming_threshold(step: Callable[[], Awaitable[Any]], threshold: Optional[int]) -> Callable[[], Awaitable[Any]]:
+    """step, run with STREAMING_EXTRACTION_THRESHOLD_BYTES temporarily set (None keeps the configured one)."""
+    if threshold is None:
+        return step
+
+    async def wrapped() -> Any:
+        configured = settings.STREAMING_EXTRACTION_THRESHOLD_BYTES
+        settings.STREAMING_EXTRACTION_THRESHOLD_BYTES = threshold
+        try:
+            return await step()
+        finally:
+            settings.STREAMING_EXTRACTION_THRESHOLD_BYTES = configured
+    return wrapped
+
+def compare(
+    results: Dict[str, Measurement],
+    baselines: Dict[str, Measurement],
+    threshold: float,
+    memory_floor_mb: float
+) -> List[str]:
+    """Regressions of results against baselines, as messages."""
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        if result["mb_per_s"] < baseline["mb_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{key}: throughput {result['mb_per_s']:.2f} MB/s, baseline {baseline['mb_per_s']:.2f} MB/s "
+                f"({result['mb_per_s'] / baseline['mb_per_s'] - 1:+.0%})"
+            )
+        growth = result["peak_mb"] - baseline["peak_mb"]
+        if growth > memory_floor_mb and result["peak_mb"] > baseline["peak_mb"] * (1 + threshold):
+            regressions.append(f"{key}: peak memory {result['peak_mb']:.1f} MB, baseline {baseline['peak_mb']:.1f} MB (+{growth:.1f} MB)")
+    return regressions
+
+def print_table(results: Dict[str, Measurement], baselines: Dict[str, Measurement]) -> None:
+    print(f"{'step':<22} {'seconds':>9} {'MB/s':>9} {'rows/s':>11} {'peak MB':>9} {'vs MB/s':>9} {'vs peak':>9}")
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        rows_per_s = f"{result['rows_per_s']:>11.0f}" if result["rows_per_s"] else f"{'-':>11}"
+        if baseline:
+            speed = f"{result['mb_per_s'] / baseline['mb_per_s'] - 1:>+9.0%}"
+            memory = f"{result['peak_mb'] - baseline['peak_mb']:>+9.1f}"
+        else:
+            speed = memory = f"{'new':>9}"
+        print(f"{key:<22} {result['seconds']:>9.3f} {result['mb_per_s']:>9.2f} {rows_per_s} {result['peak_mb']:>9.1f} {speed} {memory}")
+
+def main(args: argparse.Namespace) -> int:
+    config = {
+        "rows": args.rows, "columns": args.columns, "cardinality": args.cardinality,
+        "currency_ratio": args.currency_ratio, "date_ratio": args.date_ratio, "txt_mb": args.txt_mb, "seed": args.seed,
+    }
+    stored: Dict[str, Any] = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            stored = json.load(f)
+    baselines = stored.get("results", {}) if stored.get("config") == config else {}
+    if stored and not baselines and not args.update_baselines:
+        print(f"The baselines in {args.baselines} were recorded with {stored.get('config')}; nothing to compare with.")
+
+    base.Base.metadata.create_all(db_session.engine)
+    get_storage_backend().ensure_bucket()
+    csv_path = os.path.join(_WORKDIR, "bench.csv")
+    txt_path = os.path.join(_WORKDIR, "bench.txt")
+    corpus.generate_csv(csv_path, args.rows, args.columns, args.cardinality, args.currency_ratio, args.date_ratio, args.seed)
+    corpus.generate_txt(txt_path, args.txt_mb, args.seed)
+    files = {"csv": (csv_path, "text/csv", args.rows), "txt": (txt_path, "text/plain", 0)}
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")): # The agents log every step
+        results = asyncio.run(run_benchmarks(files, args.runs))
+    print_table(results, baselines)
+
+    if args.update_baselines:
+        environment = {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()}
+        with open(args.baselines, "w") as f:
+            json.dump({"config": config, "environment": environment, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baselines written to {args.baselines}")
+        return 0
+    regressions = compare(results, baselines, args.threshold, args.memory_floor_mb)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--cardinality", type=int, default=50)
+    parser.add_argument("--currency-ratio", type=float, default=0.25)
+    parser.add_argument("--date-ratio", type=float, default=0.25)
+    parser.add_argument("--txt-mb", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--memory-floor-mb", type=float, default=2.0, help="Ignore peak memory increases below this")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+    try:
+        status = main(args)
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
+    sys.exit(status)
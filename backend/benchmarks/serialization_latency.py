@@ -0,0 +1,125 @@
+"""
+Job results serialization benchmark: response_model validation vs. the cached fast path.
+
+Stores a COMPLETED job with results of roughly 1, 10 and 50 MB (serialized) in an
+in-memory SQLite database and requests it through the API:
+  - response_model: the previous read_job (JobSchema response_model, validated and
+    encoded by FastAPI on every request)
+  - fast path:      GET /jobs/{job_id} (serialized once with orjson, cached bytes
+    served directly afterwards)
+  - stored:         the same, with the in-process cache emptied before each request, as for
+    another API process: the bytes stored next to the job's artifacts (local storage backend)
+Reports p50/p99 request latency in milliseconds.
+
+Usage (from backend/):
+    python -m benchmarks.serialization_latency --sizes-mb 1 10 50 --runs 30
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.api.v1.router import api_router
+from app.db import base, models, session as db_session
+from app.services import job_results
+from app.services.storage import LocalStorageBackend, set_storage_backend
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_db():
+    db = BenchSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+legacy_router = APIRouter()
+
+@legacy_router.get("/legacy/jobs/{job_id}", response_model=schemas.job.JobSchema)
+def legacy_read_job(job_id: int, db: Session = Depends(get_db)) -> Any:
+    return crud.job.get_job(db, job_id=job_id)
+
+def make_results(size_mb: int) -> Dict[str, Any]:
+    """Extraction/cleaning/analysis results shaped like the pipeline's, about size_mb serialized."""
+    rows_needed = size_mb * 1024 * 1024 // 2 // 60 # ~60 bytes per row, table stored twice
+    header = ["id", "name", "amount", "date", "category"]
+    rows = [[str(i), f"customer {i}", f"{i * 1.37:.2f}", "2024-01-15", f"cat{i % 17}"] for i in range(rows_needed)]
+    table = {"name": "bench.csv", "data": [header, *rows]}
+    return {
+        "extraction": {"full_text_content": "", "tables": [table], "key_fields": {}},
+        "cleaning": {"full_text_content": "", "tables": [table], "key_fields": {}},
+        "analysis": {"overall_insights": [f"Analyzed 1 table(s) with {rows_needed} data rows."]},
+    }
+
+def create_job(size_mb: int) -> int:
+    db = BenchSession()
+    try:
+        db_file = models.UploadedFile(filename="bench.csv", original_filename="bench.csv", content_type="text/csv", file_path="bench.csv")
+        db.add(db_file)
+        db.flush()
+        db_job = models.Job(uploaded_file_id=db_file.id, status=models.JobStatus.COMPLETED, results=make_results(size_mb))
+        db.add(db_job)
+        db.commit()
+        return db_job.id
+    finally:
+        db.close()
+
+def measure(client: TestClient, url: str, runs: int, before: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    client.get(url) # Warm-up (and first serialization for the fast path)
+    timings = []
+    for _ in range(runs):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {"p50": statistics.median(timings), "p99": percentiles[98], "bytes": len(response.content)}
+
+def clear_response_cache() -> None:
+    job_results._response_cache = job_results.SizedLRUCache(job_results._response_cache.max_bytes)
+
+def main(sizes_mb, runs: int) -> None:
+    storage_root = tempfile.mkdtemp(prefix="udea-serialization-bench-")
+    backend = LocalStorageBackend(storage_root, "bench")
+    backend.ensure_bucket()
+    set_storage_backend(backend)
+    base.Base.metadata.create_all(engine)
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+    app.include_router(legacy_router)
+    app.dependency_overrides[db_session.get_db] = get_db
+    client = TestClient(app)
+
+    print(f"{'size':>6} {'path':<16} {'p50 ms':>10} {'p99 ms':>10} {'body MB':>9}")
+    try:
+        for size_mb in sizes_mb:
+            job_id = create_job(size_mb)
+            paths = (
+                ("response_model", f"/legacy/jobs/{job_id}", None),
+                ("fast path", f"/api/v1/jobs/jobs/{job_id}", None),
+                ("stored", f"/api/v1/jobs/jobs/{job_id}", clear_response_cache),
+            )
+            for name, url, before in paths:
+                result = measure(client, url, runs, before)
+                print(f"{size_mb:>4}MB {name:<16} {result['p50']:>10.1f} {result['p99']:>10.1f} {result['bytes'] / 1024 / 1024:>9.1f}")
+    finally:
+        shutil.rmtree(storage_root, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+    main(args.sizes_mb, args.runs)
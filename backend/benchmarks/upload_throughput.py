@@ -0,0 +1,65 @@
+"""
+Upload throughput benchmark: temp-file upload vs. streaming upload.
+
+Compares the old upload path (copy the upload to /tmp, then fput_object) with
+file_handler.save_stream_to_storage (multipart put_object straight from the stream).
+Runs against whatever MINIO_ENDPOINT points at, e.g. a local S3 stand-in:
+    docker run -p 9000:9000 minio/minio server /data
+    # or: moto_server -p 9000
+
+Usage (from backend/):
+    python -m benchmarks.upload_throughput --size-mb 256 --runs 3
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from app.services import file_handler
+
+async def temp_file_upload(source_path: str) -> None:
+    object_name = f"bench-{uuid.uuid4()}"
+    temp_file_path = os.path.join(tempfile.gettempdir(), object_name)
+    with open(source_path, "rb") as src, open(temp_file_path, "wb") as buffer:
+        shutil.copyfileobj(src, buffer)
+    try:
+        await file_handler.save_file_to_storage(temp_file_path, object_name, "application/octet-stream")
+    finally:
+        os.remove(temp_file_path)
+    await file_handler.remove_file_from_storage(object_name)
+
+async def streaming_upload(source_path: str) -> None:
+    object_name = f"bench-{uuid.uuid4()}"
+    with open(source_path, "rb") as src:
+        await file_handler.save_stream_to_storage(src, object_name, "application/octet-stream")
+    await file_handler.remove_file_from_storage(object_name)
+
+async def main(size_mb: int, runs: int) -> None:
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+        source_path = f.name
+    try:
+        print(f"{'path':<12} {'median s':>10} {'MB/s':>10} {'extra disk MB':>14}")
+        for name, upload, extra_disk_mb in (("temp-file", temp_file_upload, size_mb), ("streaming", streaming_upload, 0)):
+            await upload(source_path) # Warm-up (bucket creation, connections)
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                await upload(source_path)
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            print(f"{name:<12} {median:>10.2f} {size_mb / median:>10.1f} {extra_disk_mb:>14}")
+    finally:
+        os.remove(source_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.runs))
@@ -0,0 +1,34 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Settings are read when app modules are first imported: point them at throwaway storage first
+_TMP_DIR = tempfile.mkdtemp(prefix="udea-tests-")
+atexit.register(shutil.rmtree, _TMP_DIR, ignore_errors=True)
+os.environ.update({
+    "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}",
+    "STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_ROOT": os.path.join(_TMP_DIR, "storage"),
+    "EVENTS_BACKEND": "memory",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "CELERY_TASK_ALWAYS_EAGER": "true",
+    "LLM_REQUESTS_PER_MINUTE": "0",
+    "LLM_TOKENS_PER_MINUTE": "0",
+})
+
+import pytest
+
+from app.db import base, models, session as db_session # noqa: F401 (models registers the tables)
+
+@pytest.fixture
+def db():
+    """A session on empty tables."""
+    base.Base.metadata.drop_all(db_session.engine)
+    base.Base.metadata.create_all(db_session.engine)
+    session = db_session.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
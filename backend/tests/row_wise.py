@@ -0,0 +1,56 @@
+"""
+The original row-by-row cleaner and table analyzer (before the columnar rewrite), kept as the
+reference the columnar agents must agree with.
+"""
+import statistics
+from typing import Any, Dict, List
+
+from app.services.ai_agents.analyzer_agent import attempt_type_conversion
+from app.services.ai_agents.cleaner_agent import clean_value
+
+def clean_rows(data: List[List[str]]) -> List[List[Any]]:
+    return [[clean_value(cell) for cell in row] for row in data if isinstance(row, list)]
+
+def analyze_table(table_name: str, table_data: List[List[Any]]) -> Dict[str, Any]:
+    analysis = {"table_name": table_name, "column_statistics": [], "row_count": len(table_data) - 1 if table_data else 0}
+    headers = table_data[0] if table_data else []
+    typed: Dict[str, List[Any]] = {header: [] for header in headers}
+    for row in table_data[1:]:
+        if len(row) == len(headers):
+            for col_idx, cell_value in enumerate(row):
+                typed[headers[col_idx]].append(attempt_type_conversion(cell_value))
+
+    for header in headers:
+        col_stats: Dict[str, Any] = {"column_name": header, "inferred_type": "text"}
+        numeric_values = [v for v in typed[header] if isinstance(v, (int, float))]
+        string_values = [str(v) for v in typed[header] if isinstance(v, str)]
+        if numeric_values:
+            col_stats["inferred_type"] = "numeric"
+            col_stats["count"] = len(numeric_values)
+            col_stats["sum"] = sum(numeric_values)
+            col_stats["mean"] = round(statistics.mean(numeric_values), 2)
+            col_stats["median"] = round(statistics.median(numeric_values), 2)
+            col_stats["min"] = min(numeric_values)
+            col_stats["max"] = max(numeric_values)
+            col_stats["std_dev"] = round(statistics.stdev(numeric_values), 2) if len(numeric_values) > 1 else 0
+        elif string_values:
+            frequencies: Dict[str, int] = {}
+            for value in string_values:
+                frequencies[value] = frequencies.get(value, 0) + 1
+            col_stats["top_values_frequency"] = dict(sorted(frequencies.items(), key=lambda item: item[1], reverse=True)[:5])
+        analysis["column_statistics"].append(col_stats)
+    return analysis
+
+def assert_same_analysis(actual: Dict[str, Any], expected: Dict[str, Any]) -> None:
+    """Compares a table analysis with the row-wise one: same keys' values, floats to within rounding."""
+    assert actual["table_name"] == expected["table_name"]
+    assert actual["row_count"] == expected["row_count"]
+    assert len(actual["column_statistics"]) == len(expected["column_statistics"])
+    for got, want in zip(actual["column_statistics"], expected["column_statistics"]):
+        assert got["column_name"] == want["column_name"]
+        assert got["inferred_type"] == want["inferred_type"], got["column_name"]
+        for key, value in want.items():
+            if isinstance(value, float) or key in ("mean", "median", "std_dev", "sum"):
+                assert abs(got[key] - value) <= 0.011 + abs(value) * 1e-9, (got["column_name"], key)
+            else:
+                assert got[key] == value, (got["column_name"], key)
@@ -0,0 +1,119 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud
+from app.core.config import settings
+from app.db.models import Job, JobStatus, UploadedFile
+from app.main import app
+
+BATCH = "/api/v1/jobs/uploadfiles/batch/"
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_BACKEND", "database") # Keep the jobs PENDING instead of running them inline
+    with TestClient(app) as client:
+        yield client
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def tar_bytes(members, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def stored_objects():
+    base_dir = os.path.join(settings.LOCAL_STORAGE_ROOT, settings.MINIO_BUCKET_NAME)
+    return {name for _, _, names in os.walk(base_dir) for name in names} if os.path.isdir(base_dir) else set()
+
+def upload(client, *files):
+    return client.post(BATCH, files=[("files", file) for file in files])
+
+def test_batch_creates_one_job_per_file(db, client):
+    before = stored_objects()
+    response = upload(
+        client,
+        ("a.csv", b"x,y\n1,2\n", "text/csv"),
+        ("b.txt", b"hello", "text/plain"),
+        ("c.csv", b"x,y\n1,2\n", "text/csv"), # Same content as a.csv
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [job["original_filename"] for job in body["jobs"]] == ["a.csv", "b.txt", "c.csv"]
+    assert all(job["status"] == JobStatus.PENDING.value for job in body["jobs"])
+
+    jobs = {job.id: job for job in db.query(Job).filter(Job.batch_id == body["batch_id"])}
+    assert set(jobs) == {job["job_id"] for job in body["jobs"]}
+    assert {job.priority for job in jobs.values()} == {settings.JOB_PRIORITY_BATCH}
+    files = {f.id: f for f in db.query(UploadedFile)}
+    a, b, c = (files[job["uploaded_file_id"]] for job in body["jobs"])
+    assert (a.content_type, b.content_type) == ("text/csv", "text/plain")
+    assert a.file_path == c.file_path != b.file_path # Identical content shares one stored object
+    assert stored_objects() - before == {a.file_path, b.file_path}
+
+    status = client.get(f"/api/v1/jobs/batches/{body['batch_id']}").json()
+    assert status["total"] == 3 and status["status_counts"] == {JobStatus.PENDING.value: 3}
+
+def test_batch_reuses_completed_results(db, client):
+    first = upload(client, ("a.csv", b"x\n1\n", "text/csv")).json()["jobs"][0]
+    crud.job.transition_job(db, first["job_id"], JobStatus.PROCESSING)
+    crud.job.transition_job(db, first["job_id"], JobStatus.COMPLETED, results={"analysis": {}}, result_artifacts={"artifact"})
+
+    again, new = upload(client, ("copy.csv", b"x\n1\n", "text/csv"), ("new.csv", b"x\n2\n", "text/csv")).json()["jobs"]
+    assert again["status"] == JobStatus.COMPLETED.value and again["reused_from_job_id"] == first["job_id"]
+    assert new["status"] == JobStatus.PENDING.value and new["reused_from_job_id"] is None
+    assert crud.job.get_job(db, again["job_id"]).results == {"analysis": {}}
+    assert crud.job.get_result_artifacts(db, again["job_id"]) == {"artifact"}
+
+@pytest.mark.parametrize("name, archive", [
+    ("data.zip", zip_bytes({"top.csv": b"a\n1\n", "dir/nested/deep.txt": b"deep", "dir/": b"", "__MACOSX/._top.csv": b"", "dir/._x": b""})),
+    ("data.tar.gz", tar_bytes({"top.csv": b"a\n1\n", "dir/nested/deep.txt": b"deep", "__MACOSX/._top.csv": b""})),
+    ("data.tar", tar_bytes({"top.csv": b"a\n1\n", "dir/nested/deep.txt": b"deep"}, mode="w")),
+])
+def test_archives_are_expanded(db, client, name, archive):
+    response = upload(client, (name, archive, "application/octet-stream"), ("plain.txt", b"plain", "text/plain"))
+    assert response.status_code == 200
+    jobs = response.json()["jobs"]
+    assert [job["original_filename"] for job in jobs] == ["top.csv", "dir/nested/deep.txt", "plain.txt"]
+    content_types = [crud.file.get_uploaded_file(db, job["uploaded_file_id"]).content_type for job in jobs]
+    assert content_types == ["text/csv", "text/plain", "text/plain"]
+
+def test_empty_archive_is_rejected(db, client):
+    assert upload(client, ("empty.zip", zip_bytes({}), "application/zip")).status_code == 400
+    assert upload(client, ("empty.tar", tar_bytes({}, mode="w"), "application/x-tar")).status_code == 400
+    assert db.query(Job).count() == 0
+
+def test_too_many_members_are_rejected(db, client, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 3)
+    before = stored_objects()
+    response = upload(client, ("many.zip", zip_bytes({f"f{i}.txt": f"{i}".encode() for i in range(4)}), "application/zip"))
+    assert response.status_code == 413 and "3 file limit" in response.json()["detail"]
+    assert stored_objects() == before # The members stored before the limit was hit are removed
+    assert db.query(Job).count() == 0
+    assert upload(client, ("three.zip", zip_bytes({f"f{i}.txt": f"{i}".encode() for i in range(3)}), "application/zip")).status_code == 200
+
+def test_one_failed_file_fails_the_batch(db, client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_BYTES", 10)
+    before = stored_objects()
+    response = upload(client, ("small.txt", b"ok", "text/plain"), ("big.txt", b"x" * 11, "text/plain"), ("late.txt", b"ok too", "text/plain"))
+    assert response.status_code == 413
+    assert stored_objects() == before
+    assert db.query(Job).count() == db.query(UploadedFile).count() == 0
+
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_BYTES", 10 ** 6)
+    corrupt = upload(client, ("broken.zip", b"PK\x03\x04 not really a zip", "application/zip"))
+    assert corrupt.status_code == 500
+    assert stored_objects() == before
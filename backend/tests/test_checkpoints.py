@@ -0,0 +1,105 @@
+import pytest
+
+from app import crud
+from app.core.config import settings
+from app.db.models import JobStatus
+from app.schemas.job import JobCreate
+from app.services import artifacts, checkpoints
+from app.services.storage import get_storage_backend
+
+EXTRACTION = {"tables": [{"name": "t", "columns": ["a"], "rows": [["1"], ["2"]]}], "text": "x" * 100}
+CLEANING = {"tables": [{"name": "t", "columns": ["a"], "rows": [[1], [2]]}]}
+ANALYSIS = {"summary": "two rows"}
+
+@pytest.fixture(autouse=True)
+def offload_extraction(monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_CHECKPOINTS", True)
+    monkeypatch.setattr(settings, "RESULTS_OFFLOAD_THRESHOLD_BYTES", 100) # The extraction is offloaded, cleaning is not
+    get_storage_backend().ensure_bucket()
+
+def new_job(db):
+    return crud.job.create_job(db, JobCreate(uploaded_file_id=1))
+
+def stored(object_name):
+    try:
+        get_storage_backend().size(object_name)
+        return True
+    except FileNotFoundError:
+        return False
+
+def run_pipeline(db, job_id):
+    """Checkpoints every stage and completes the job, as the orchestrator does; returns the results."""
+    results = {
+        "extraction": checkpoints.save_stage(job_id, "extraction", EXTRACTION),
+        "cleaning": checkpoints.save_stage(job_id, "cleaning", CLEANING),
+        "analysis": checkpoints.save_stage(job_id, "analysis", ANALYSIS, {"top_values": 3}),
+    }
+    superseded = crud.job.get_result_artifacts(db, job_id)
+    crud.job.transition_job(db, job_id, JobStatus.PROCESSING)
+    crud.job.transition_job(
+        db, job_id, JobStatus.COMPLETED, results=results, result_artifacts=artifacts.referenced_objects(results)
+    )
+    checkpoints.release_checkpoints(job_id, superseded)
+    return results
+
+def test_offloaded_stage_is_uploaded_once_and_referenced(db):
+    job_id = new_job(db).id
+    value = checkpoints.save_stage(job_id, "extraction", EXTRACTION)
+    object_name = value[artifacts.ARTIFACT_REF_KEY]["object_name"]
+    assert checkpoints.save_stage(job_id, "cleaning", CLEANING) == CLEANING
+    assert crud.checkpoint.is_artifact_referenced(db, object_name)
+    assert not crud.checkpoint.is_artifact_referenced(db, object_name[:-3])
+
+def test_completed_job_keeps_no_checkpoints(db):
+    job_id = new_job(db).id
+    results = run_pipeline(db, job_id)
+    object_name = results["extraction"][artifacts.ARTIFACT_REF_KEY]["object_name"]
+    assert crud.checkpoint.get_checkpoints(db, [job_id], settings.PIPELINE_VERSION) == {}
+    assert crud.job.get_result_artifacts(db, job_id) == {object_name}
+    assert stored(object_name) # Job.results refers to it
+
+def test_rerun_resumes_from_results(db):
+    job_id = new_job(db).id
+    results = run_pipeline(db, job_id)
+    assert checkpoints.can_resume(db, [job_id], "cleaning")
+    assert not checkpoints.can_resume(db, [job_id], "analysis")
+
+    records = checkpoints.get_checkpoint_records([job_id])
+    assert set(records) == {"extraction", "cleaning"}
+    assert checkpoints.result_value(records["extraction"]) == results["extraction"]
+    assert checkpoints.load_stage(records["extraction"]) == EXTRACTION
+    assert checkpoints.load_stage(records["cleaning"]) == CLEANING
+    # Checkpointed again: a failed rerun replacing the results still resumes from them
+    assert set(crud.checkpoint.get_checkpoints(db, [job_id], settings.PIPELINE_VERSION)) == {"extraction", "cleaning"}
+    crud.job.transition_job(db, job_id, JobStatus.FAILED, results={"error": "analysis broke"})
+    assert set(checkpoints.get_checkpoint_records([job_id])) == {"extraction", "cleaning"}
+
+def test_results_of_another_pipeline_version_are_not_resumed(db, monkeypatch):
+    job_id = new_job(db).id
+    run_pipeline(db, job_id)
+    monkeypatch.setattr(settings, "PIPELINE_VERSION", "next")
+    assert checkpoints.get_checkpoint_records([job_id]) == {}
+    assert not checkpoints.can_resume(db, [job_id], "cleaning")
+
+def test_superseded_artifacts_are_removed_unless_reused(db):
+    job_id = new_job(db).id
+    first = run_pipeline(db, job_id)["extraction"][artifacts.ARTIFACT_REF_KEY]["object_name"]
+    reused = crud.job.create_reused_job(db, JobCreate(uploaded_file_id=2), crud.job.get_job(db, job_id))
+    assert crud.job.get_result_artifacts(db, reused.id) == {first}
+
+    crud.checkpoint.delete_job_checkpoints(db, job_id) # A rerun that extracts again
+    second = run_pipeline(db, job_id)["extraction"][artifacts.ARTIFACT_REF_KEY]["object_name"]
+    assert second != first
+    assert stored(first) # Still the reused job's results
+
+    other_id = new_job(db).id
+    third = run_pipeline(db, other_id)["extraction"][artifacts.ARTIFACT_REF_KEY]["object_name"]
+    crud.checkpoint.delete_job_checkpoints(db, other_id)
+    run_pipeline(db, other_id)
+    assert not stored(third)
+
+def test_replaced_checkpoint_artifact_is_removed(db):
+    job_id = new_job(db).id
+    first = checkpoints.save_stage(job_id, "extraction", EXTRACTION)[artifacts.ARTIFACT_REF_KEY]["object_name"]
+    second = checkpoints.save_stage(job_id, "extraction", EXTRACTION)[artifacts.ARTIFACT_REF_KEY]["object_name"]
+    assert not stored(first) and stored(second)
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.ai_agents import cleaner_agent
+from app.services.ai_agents.cleaner_agent import clean_column, clean_table, clean_value, detect_column_kind
+from app.services.ai_agents.columnar import ColumnarTable
+from row_wise import clean_rows
+
+# Every kind of cell, including ones a column of another kind would not expect
+CELLS = [
+    "", " ", "42", "-3.5", ".5", "007", "1 ", " 12 ", "1,000", "$1,200.50", " $ 950 ", "$", ",", "$-5", "$1.2.3",
+    "1,2,3", "2024-05-10", " May  10,\t2024 ", "10/05/2024", "10 May 2024", "hello   world", " nbsp ",
+    "café", "　wide space　", "line\nbreak", "tab\tend\t", "a,b", "USD 5", "5$", "-", "1e5",
+]
+KIND_SAMPLES = {
+    "numeric": ["1", "2", "3.5", "-4"],
+    "currency": ["$1,200", "$950", "1,000", "$3"],
+    "date": ["2024-05-10", "May 10, 2024", "10/05/2024"],
+    "text": ["alpha", "beta", "gamma"],
+}
+
+@pytest.mark.parametrize("kind", KIND_SAMPLES)
+def test_clean_column_matches_clean_value(kind):
+    # Enough samples to pin the detected kind, then every cell type through that kind's transform
+    values = KIND_SAMPLES[kind] * 100 + CELLS
+    assert detect_column_kind(values)[0] == kind
+    assert clean_column(values) == [clean_value(v) for v in values]
+
+def test_memoized_columns_match_clean_value(monkeypatch):
+    monkeypatch.setattr(settings, "CLEANER_MEMO_MAX_DISTINCT_RATIO", 1.0) # Memoize every column
+    monkeypatch.setattr(settings, "CLEANER_MEMO_SIZE", 4) # Smaller than the distinct values, so entries get evicted
+    values = (CELLS + [" $1,200 ", "text  value", "3"] * 20) * 3
+    assert clean_column(values) == [clean_value(v) for v in values]
+
+def test_blank_columns():
+    assert detect_column_kind(["", "", ""]) == ("text", 1.0)
+    assert clean_column(["", " ", "\t"]) == ["", "", ""]
+    assert clean_column([]) == []
+
+def test_clean_table_matches_row_wise():
+    header = ["  id ", "amount", "price", "mixed", "blank"]
+    rows = [[str(i), f" {i * 10} " if i % 3 else "", f"${i},{i:03d}.50", CELLS[i % len(CELLS)], ""] for i in range(1, 91)]
+    table = clean_table(ColumnarTable.from_rows("t", header, iter(rows)))
+    expected = clean_rows([header, *rows])
+    assert table.header == expected[0]
+    for idx, column in enumerate(table.columns):
+        want = [row[idx] for row in expected[1:]]
+        if column.is_numeric:
+            assert column.to_list() == [float(v) if "." in v else int(v) if v else "" for v in want]
+        else:
+            assert column.to_list() == want
+    assert [column.dtype for column in table.columns] == ["int64", "int64", "float64", "str", "str"]
+
+def test_cleaning_agent_matches_row_wise():
+    data = [["a", "b"], [" $1,000 ", "x  y"], ["", " May 10, 2024"], ["$5", ""]]
+    extracted = {"full_text_content": "  some   text ", "tables": [{"name": "t", "data": data}, "not a table"]}
+    cleaned = asyncio.run(cleaner_agent.run_cleaning_agent(extracted))
+    assert cleaned["full_text_content"] == "some text"
+    assert cleaned["tables"][1] == "not a table"
+    assert cleaned["tables"][0].to_json()["data"] == [["a", "b"], [1000, "x y"], ["", "May 10, 2024"], [5, ""]]
+    assert clean_rows(data)[1:] == [["1000", "x y"], ["", "May 10, 2024"], ["5", ""]]
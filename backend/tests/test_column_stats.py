@@ -0,0 +1,93 @@
+from collections import Counter
+
+import numpy as np
+
+from app.services.ai_agents.column_stats import ColumnAccumulator, QuantileSketch, TopValueCounter
+
+def rank_error(sorted_values, estimate, q):
+    """How far (as a fraction of the stream) the estimate's rank is from the q-quantile's."""
+    low = np.searchsorted(sorted_values, estimate, side="left") / len(sorted_values)
+    high = np.searchsorted(sorted_values, estimate, side="right") / len(sorted_values)
+    return 0.0 if low <= q <= high else min(abs(q - low), abs(q - high))
+
+def test_quantile_rank_error_on_a_large_stream():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.normal(100, 15, 150_000), rng.exponential(40, 100_000), rng.integers(0, 50, 50_000)])
+    rng.shuffle(values)
+    sketch = QuantileSketch(256)
+    for chunk in np.array_split(values, 37):
+        sketch.update_many(chunk)
+    assert sketch.count == len(values)
+    assert sum(len(compactor) for compactor in sketch.compactors) < 256 * 4
+    sorted_values = np.sort(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert rank_error(sorted_values, sketch.quantile(q), q) < 0.02, q
+
+def test_sketch_is_exact_while_small():
+    values = [5, 1, 4, 2, 3]
+    sketch = QuantileSketch(64)
+    sketch.update_many(values)
+    for q in (0, 0.25, 0.5, 0.9, 1):
+        assert sketch.quantile(q) == np.quantile(values, q)
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_update_many_matches_update_and_stays_bounded():
+    values = np.random.default_rng(2).integers(0, 1_000_000, 50_000)
+    one_by_one, bulk = QuantileSketch(64, seed=3), QuantileSketch(64, seed=3)
+    for value in values.tolist():
+        one_by_one.update(value)
+
+    overflows = []
+    compress = bulk._compress
+    def tracking_compress():
+        overflows.append(len(bulk.compactors[0]) - bulk._capacity(0))
+        compress()
+    bulk._compress = tracking_compress
+    bulk.update_many(values)
+    assert bulk.compactors == one_by_one.compactors
+    assert max(overflows) <= 0 # Level 0 never holds more than its capacity
+
+def test_top_values_are_exact_within_capacity():
+    values = [f"v{i % 40}" for i in range(1000)] + ["v1"] * 30
+    counter = TopValueCounter(capacity=50)
+    for value in values:
+        counter.add(value)
+    expected = Counter(values)
+    assert counter.counts == expected
+    assert list(counter.most_common(3)) == ["v1", "v0", "v2"]
+
+def test_top_values_keep_heavy_hitters_beyond_capacity():
+    rng = np.random.default_rng(4)
+    values = [f"rare{i}" for i in rng.integers(0, 5000, 20_000)] + ["hot"] * 3000 + ["warm"] * 1500
+    rng.shuffle(values)
+    capacity = 100
+    counter = TopValueCounter(capacity)
+    for value in values:
+        counter.add(value)
+    expected = Counter(values)
+    error_bound = len(values) / (capacity + 1)
+    assert list(counter.most_common(2)) == ["hot", "warm"]
+    for value, count in counter.counts.items():
+        assert expected[value] - error_bound <= count <= expected[value]
+
+def test_merged_moments_match_numpy():
+    rng = np.random.default_rng(5)
+    floats = rng.normal(1e6, 250.0, 100_000)
+    accumulator = ColumnAccumulator()
+    for chunk in np.array_split(floats[:-100], 13):
+        accumulator.add_numbers(chunk)
+    for value in floats[-100:].tolist(): # Row-wise Welford updates after the chunk merges
+        accumulator.add(value)
+    assert accumulator.count == len(floats)
+    assert np.isclose(accumulator.sum, floats.sum(), rtol=1e-12)
+    assert np.isclose(accumulator.mean, floats.mean(), rtol=1e-12)
+    assert np.isclose(accumulator.std_dev, floats.std(ddof=1), rtol=1e-9)
+    assert (accumulator.min, accumulator.max) == (floats.min(), floats.max())
+
+def test_integer_sums_are_exact():
+    big = np.array([2 ** 62, 2 ** 62, 2 ** 62, -5], dtype=np.int64)
+    accumulator = ColumnAccumulator()
+    accumulator.add_numbers(big)
+    accumulator.add_numbers(np.arange(10, dtype=np.int64))
+    assert accumulator.sum == 3 * 2 ** 62 - 5 + 45
+    assert isinstance(accumulator.sum, int)
@@ -0,0 +1,72 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.ai_agents import analyzer_agent, cleaner_agent
+from app.services.ai_agents.columnar import (
+    Column, ColumnarTable, StreamedTable, has_streamed_tables, stage_output_from_json, stage_output_to_json
+)
+from row_wise import analyze_table, assert_same_analysis, clean_rows
+
+MIXED = [
+    ["name", "amount", "zip", "mixed", "price", "when"],
+    ["alpha", "10", "02134", "1", " $1,200.50 ", "2024-05-10"],
+    ["beta", "-3", "10001", "two", "$950", "May 10, 2024"],
+    ["gamma", "7", "00501", "3.5", "12.25", ""],
+    ["delta", "", "60601", "", "$ 3", "10/05/2024"],
+    ["too", "short"],
+]
+NULL_HEAVY = [
+    ["label", "value", "empty", "sparse_text"],
+    *[[f"r{i}", str(i) if i % 7 == 0 else "", "", "x" if i % 11 == 0 else ""] for i in range(200)],
+]
+HEADER_ONLY = [["a", "b"]]
+TABLES = {"mixed": MIXED, "null_heavy": NULL_HEAVY, "header_only": HEADER_ONLY}
+
+def test_infer_type():
+    assert Column("c", ["1", "", "-2"]).infer_type().dtype == "int64"
+    assert Column("c", ["1", "2.5"]).infer_type().dtype == "float64"
+    for values in (["1", "x"], ["02134", "10001"], ["", ""], [str(2 ** 70)], ["1", "0.5", "007"]):
+        assert Column("c", values).infer_type().dtype == "str", values
+    column = Column("c", ["4", "", "6"]).infer_type()
+    assert column.null_mask.tolist() == [False, True, False]
+    assert column.non_null_values().tolist() == [4, 6]
+    assert column.to_list() == [4, "", 6]
+
+def test_from_rows_drops_ragged_rows():
+    table = ColumnarTable.from_rows("t", ["a", "b"], iter([["1", "2"], ["3"], ["5", "6"], ["7", "8", "9"]]), chunk_rows=1)
+    assert table.num_rows == 2 and table.skipped_rows == 2
+    assert table.to_json() == {"name": "t", "data": [["a", "b"], ["1", "2"], ["5", "6"]]}
+
+@pytest.mark.parametrize("data", TABLES.values(), ids=TABLES.keys())
+def test_json_round_trip_keeps_rows(data):
+    table = ColumnarTable.from_json({"name": "t", "data": data})
+    assert table.to_json()["data"] == [row for row in data if len(row) == len(data[0])]
+
+def test_stage_output_round_trip_restores_types():
+    cleaned = asyncio.run(cleaner_agent.run_cleaning_agent({"tables": [{"name": "t", "data": MIXED}]}))
+    persisted = stage_output_to_json(cleaned)
+    assert isinstance(persisted["tables"][0], dict)
+    restored = stage_output_from_json(persisted)["tables"][0]
+    original = cleaned["tables"][0]
+    assert [column.dtype for column in restored.columns] == [column.dtype for column in original.columns]
+    assert restored.to_json() == original.to_json()
+
+def test_streamed_tables_are_not_checkpointed():
+    streamed = StreamedTable("t", ["a"], iter([]))
+    assert has_streamed_tables({"tables": [streamed]})
+    assert stage_output_to_json({"tables": [streamed]})["tables"] == [{"name": "t", "header": ["a"], "streamed": True}]
+    assert not has_streamed_tables({"tables": [ColumnarTable("t", [Column("a", np.array([1]), "int64")])]})
+
+@pytest.mark.parametrize("name", TABLES)
+def test_analysis_matches_row_wise(name):
+    data = TABLES[name]
+    cleaned = asyncio.run(cleaner_agent.run_cleaning_agent({"tables": [{"name": name, "data": data}]}))
+    analysis = asyncio.run(analyzer_agent.run_analysis_agent(cleaned))
+    assert len(analysis["table_analysis"]) == 1
+    assert_same_analysis(analysis["table_analysis"][0], analyze_table(name, clean_rows(data)))
+
+def test_empty_table_is_skipped():
+    analysis = asyncio.run(analyzer_agent.run_analysis_agent({"tables": [{"name": "empty", "data": []}]}))
+    assert analysis["table_analysis"] == []
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import socket
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.db import session as db_session
+from app.services import events
+
+class StopListening(Exception):
+    pass
+
+class FakeListenConnection:
+    """A psycopg2-like connection whose socket becomes readable when a notification is queued."""
+
+    def __init__(self, payloads):
+        self._reader, self._writer = socket.socketpair()
+        self._payloads = list(payloads)
+        self.autocommit = False
+        self.notifies = []
+        self.executed = []
+        self._writer.send(b"x")
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, statement):
+                connection.executed.append(statement)
+        return Cursor()
+
+    def poll(self):
+        self._reader.recv(1)
+        if not self._payloads:
+            raise StopListening()
+        self.notifies.append(SimpleNamespace(payload=self._payloads.pop(0)))
+        self._writer.send(b"x")
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+
+class FakeEngine:
+    def __init__(self, connection):
+        self.connection = connection
+        self.invalidated = False
+
+    def raw_connection(self):
+        engine = self
+        return SimpleNamespace(driver_connection=self.connection, invalidate=lambda: setattr(engine, "invalidated", True))
+
+def test_postgres_listener_dispatches_notifications():
+    events_sent = [{"job_id": 1, "type": "status", "status": "PROCESSING"}, {"job_id": 2, "type": "status"}]
+    connection = FakeListenConnection([json.dumps(event) for event in events_sent] + ["not json"])
+    engine = FakeEngine(connection)
+    broker = events.PostgresBroker(engine)
+    received = []
+    broker.dispatch = received.append
+    try:
+        broker._listen()
+    except StopListening:
+        pass
+    finally:
+        connection.close()
+    assert connection.autocommit is True
+    assert connection.executed == [f"LISTEN {events.EVENT_CHANNEL}"]
+    assert received == events_sent
+    assert engine.invalidated # The LISTENing connection never goes back to the pool
+
+def test_database_broker_delivers_across_brokers(db, monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_POLL_INTERVAL", 0.01)
+    publisher = events.DatabaseBroker(db_session.engine)
+    subscriber = events.DatabaseBroker(db_session.engine)
+
+    async def main():
+        subscription = subscriber.subscribe(7)
+        try:
+            await asyncio.sleep(0.1) # Let the poller note where the table ends
+            publisher.publish({"job_id": 8, "type": "status", "status": "PENDING"})
+            publisher.publish({"job_id": 7, "type": "status", "status": "COMPLETED"})
+            return await subscription.get(timeout=5)
+        finally:
+            subscription.close()
+    assert asyncio.run(main()) == {"job_id": 7, "type": "status", "status": "COMPLETED"}
+
+def test_memory_broker_delivers_to_the_subscribed_job():
+    broker = events.InProcessBroker()
+
+    async def main():
+        subscription = broker.subscribe(1)
+        broker.publish({"job_id": 2, "type": "stage"})
+        broker.publish({"job_id": 1, "type": "stage", "stage": "extraction"})
+        try:
+            return await subscription.get(timeout=1), await subscription.get(timeout=0.05)
+        finally:
+            subscription.close()
+    assert asyncio.run(main()) == ({"job_id": 1, "type": "stage", "stage": "extraction"}, None)
@@ -0,0 +1,69 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import crud
+from app.core.config import settings
+from app.db.models import JobStatus
+from app.schemas.file import UploadedFileCreate
+from app.schemas.job import JobCreate
+from app.services import job_queue
+from app.services.storage import get_storage_backend
+
+CSV = b"name,amount\n" + b"".join(b"n%d,%d\n" % (i, i) for i in range(50))
+
+@pytest.fixture
+def celery_queue(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_BACKEND", "celery")
+    monkeypatch.setattr(job_queue, "_celery_client", None)
+    yield
+    job_queue._celery_client = None
+
+def new_job(db, name):
+    backend = get_storage_backend()
+    backend.ensure_bucket()
+    backend.put_stream(name, io.BytesIO(CSV), "text/csv", settings.UPLOAD_PART_SIZE)
+    uploaded = crud.file.create_uploaded_file(
+        db, UploadedFileCreate(filename=name, file_path=name, original_filename=name, content_type="text/csv")
+    )
+    return crud.job.create_job(db, JobCreate(uploaded_file_id=uploaded.id)).id
+
+def status(db, job_id):
+    db.expire_all()
+    return crud.job.get_job(db, job_id, with_results=False).status
+
+def test_eager_celery_runs_jobs_inline(db, celery_queue, monkeypatch):
+    monkeypatch.setattr(settings, "CELERY_TASK_ALWAYS_EAGER", True)
+    job_id = new_job(db, "one.csv")
+    job_queue.enqueue_job(job_id)
+    assert status(db, job_id) == JobStatus.COMPLETED
+
+    job_ids = [new_job(db, "two.csv"), new_job(db, "three.csv")]
+    job_queue.enqueue_jobs(job_ids)
+    assert [status(db, job_id) for job_id in job_ids] == [JobStatus.COMPLETED, JobStatus.COMPLETED]
+
+def test_jobs_are_published_by_task_name(celery_queue, monkeypatch):
+    monkeypatch.setattr(settings, "CELERY_TASK_ALWAYS_EAGER", False)
+    job_queue.enqueue_job(1)
+    job_queue.enqueue_jobs([2, 3])
+    celery = job_queue._get_celery()
+    with celery.connection_for_read() as connection:
+        queue = connection.SimpleQueue("celery")
+        messages = [queue.get(timeout=1) for _ in range(3)]
+        queue.close()
+    assert [message.headers["task"] for message in messages] == [job_queue.PROCESS_FILE_JOB_TASK] * 3
+    assert sorted(message.decode()[0][0] for message in messages) == [1, 2, 3]
+
+def test_database_queue_publishes_nothing(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_BACKEND", "database")
+    monkeypatch.setattr(job_queue, "_get_celery", lambda: pytest.fail("published to Celery"))
+    job_queue.enqueue_job(1)
+    job_queue.enqueue_jobs([1, 2])
+
+def test_api_does_not_import_the_workers():
+    code = "import sys, app.main; sys.exit('workers' in sys.modules)"
+    env = {**os.environ, "CELERY_TASK_ALWAYS_EAGER": "false"}
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
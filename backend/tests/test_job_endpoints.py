@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud
+from app.db.models import JobStatus
+from app.main import app
+from app.schemas.job import JobCreate
+
+JOBS = "/api/v1/jobs/jobs"
+RESULTS = {
+    "extraction": {"full_text_content": "a,b\n1,2", "tables": []},
+    "analysis": {"summary": "two columns", "table_analysis": [{"table_name": "t", "row_count": 1}, {"table_name": "u", "row_count": 7}]},
+}
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as client:
+        yield client
+
+def completed_job(db, results):
+    job_id = crud.job.create_job(db, JobCreate(uploaded_file_id=1)).id
+    crud.job.transition_job(db, job_id, JobStatus.PROCESSING)
+    crud.job.transition_job(db, job_id, JobStatus.COMPLETED, results=results)
+    return job_id
+
+@pytest.mark.parametrize("path", ["", "/status", "/results", "/results?fields=analysis.summary", "/results/analysis"])
+def test_if_none_match_answers_304(db, client, path):
+    job_id = completed_job(db, RESULTS)
+    url = f"{JOBS}/{job_id}{path}"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"') and first.headers["cache-control"] == "no-cache"
+
+    for if_none_match in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        cached = client.get(url, headers={"If-None-Match": if_none_match})
+        assert cached.status_code == 304 and cached.content == b""
+        assert cached.headers["etag"] == etag
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_representations_have_distinct_etags(db, client):
+    job_id = completed_job(db, RESULTS)
+    urls = ["", "/status", "/results", "/results?fields=analysis", "/results?fields=extraction", "/results/analysis"]
+    etags = {client.get(f"{JOBS}/{job_id}{url}").headers["etag"] for url in urls}
+    assert len(etags) == len(urls)
+
+def test_fields_projection(db, client):
+    job_id = completed_job(db, RESULTS)
+    projected = client.get(f"{JOBS}/{job_id}/results", params={"fields": "analysis.summary, analysis.table_analysis.1.row_count,missing.key"})
+    assert projected.json() == {"analysis": {"summary": "two columns", "table_analysis": {"1": {"row_count": 7}}}}
+    nested = client.get(f"{JOBS}/{job_id}/results", params={"fields": "analysis.summary,analysis"})
+    assert nested.json() == {"analysis": RESULTS["analysis"]} # The shorter path already includes the longer one
+    assert client.get(f"{JOBS}/{job_id}/results").json() == RESULTS
+    assert client.get(f"{JOBS}/{job_id}/results", params={"fields": ""}).json() == RESULTS
+
+def test_version_bump_invalidates_cached_responses(db, client):
+    job_id = completed_job(db, RESULTS)
+    urls = [f"{JOBS}/{job_id}/results", f"{JOBS}/{job_id}/results?fields=analysis.summary", f"{JOBS}/{job_id}"]
+    before = {url: client.get(url) for url in urls}
+
+    crud.job.requeue_job(db, job_id)
+    crud.job.transition_job(db, job_id, JobStatus.PROCESSING)
+    crud.job.transition_job(db, job_id, JobStatus.COMPLETED, results={**RESULTS, "analysis": {"summary": "rerun"}})
+
+    for url, old in before.items():
+        new = client.get(url, headers={"If-None-Match": old.headers["etag"]})
+        assert new.status_code == 200 and new.headers["etag"] != old.headers["etag"]
+    assert client.get(urls[0]).json()["analysis"] == {"summary": "rerun"}
+    assert client.get(urls[1]).json() == {"analysis": {"summary": "rerun"}}
+    assert client.get(urls[2]).json()["status"] == JobStatus.COMPLETED.value
+
+def test_unknown_job_and_stage(db, client):
+    job_id = completed_job(db, RESULTS)
+    assert client.get(f"{JOBS}/12345").status_code == 404
+    assert client.get(f"{JOBS}/12345/results").status_code == 404
+    assert client.get(f"{JOBS}/{job_id}/results/cleaning").status_code == 404
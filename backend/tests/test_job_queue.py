@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, update
+
+from app import crud
+from app.db import models
+from app.db.models import JobStatus
+
+def add_jobs(db, *jobs):
+    """Inserts jobs given as dicts of column values (PENDING, priority 0, tenant "default" by default); returns their ids."""
+    ids = []
+    for job in jobs:
+        values = {"status": JobStatus.PENDING, "priority": 0, "tenant_id": "default", "version": 1, "attempts": 0, **job}
+        ids.append(db.execute(insert(models.Job).values(**values).returning(models.Job.id)).scalar())
+    db.commit()
+    return ids
+
+def claim_all(db, window=32):
+    claimed = []
+    while (row := crud.job.claim_next_job(db, "worker", 60, window)) is not None:
+        claimed.append(row[0])
+    return claimed
+
+def get_job(db, job_id):
+    db.expire_all()
+    return crud.job.get_job(db, job_id)
+
+def test_claims_highest_priority_first(db):
+    low, high, normal = add_jobs(db, {"priority": 0}, {"priority": 10}, {"priority": 5})
+    assert claim_all(db) == [high, normal, low]
+
+def test_tenants_take_turns_within_a_priority(db):
+    a1, a2, a3, b1 = add_jobs(db, {"tenant_id": "a"}, {"tenant_id": "a"}, {"tenant_id": "a"}, {"tenant_id": "b"})
+    assert claim_all(db) == [a1, b1, a2, a3]
+
+def test_tenants_with_running_jobs_wait(db):
+    add_jobs(db, {"tenant_id": "a", "status": JobStatus.PROCESSING})
+    a1, b1 = add_jobs(db, {"tenant_id": "a"}, {"tenant_id": "b"})
+    assert claim_all(db) == [b1, a1]
+
+def test_small_window_keeps_the_order(db):
+    jobs = [{"tenant_id": tenant, "priority": priority} for priority in (0, 5) for tenant in "abc" for _ in range(4)]
+    add_jobs(db, *jobs)
+    full = claim_all(db)
+    db.execute(update(models.Job).values(status=JobStatus.PENDING, lease_owner=None))
+    db.commit()
+    assert claim_all(db, window=2) == full
+
+def test_jobs_in_backoff_are_not_claimed(db):
+    later = datetime.now(timezone.utc) + timedelta(minutes=5)
+    add_jobs(db, {"available_at": later})
+    assert crud.job.claim_next_job(db, "worker", 60) is None
+
+def test_claim_takes_a_lease(db):
+    job_id, = add_jobs(db, {})
+    assert crud.job.claim_next_job(db, "worker", 60) == (job_id, None)
+    job = get_job(db, job_id)
+    assert job.status == JobStatus.PROCESSING
+    assert job.lease_owner == "worker"
+    assert job.attempts == 1
+    assert job.lease_expires_at is not None
+    assert crud.job.claim_next_job(db, "other", 60) is None
+
+def test_heartbeat_only_extends_own_leases(db):
+    mine, theirs = add_jobs(db, {}, {})
+    crud.job.claim_next_job(db, "worker", 60)
+    crud.job.claim_next_job(db, "other", 60)
+    assert crud.job.heartbeat_jobs(db, [mine, theirs], "worker", 60) == {mine}
+
+def expire_leases(db):
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.execute(update(models.Job).where(models.Job.status == JobStatus.PROCESSING).values(lease_expires_at=past))
+    db.commit()
+
+def test_expired_lease_is_requeued_then_failed(db):
+    job_id, = add_jobs(db, {})
+    crud.job.claim_next_job(db, "worker", 60)
+    expire_leases(db)
+    assert crud.job.requeue_expired_jobs(db, max_attempts=2, retry_delay_seconds=30) == (1, 0)
+    job = get_job(db, job_id)
+    assert job.status == JobStatus.PENDING and job.lease_owner is None
+    assert crud.job.claim_next_job(db, "worker", 60) is None # Retry delay
+
+    db.execute(update(models.Job).values(available_at=None))
+    db.commit()
+    assert crud.job.claim_next_job(db, "worker", 60) == (job_id, None)
+    expire_leases(db)
+    assert crud.job.requeue_expired_jobs(db, max_attempts=2, retry_delay_seconds=30) == (0, 1)
+    job = get_job(db, job_id)
+    assert job.status == JobStatus.FAILED
+    assert job.results["step"] == "job_queue"
+
+def test_live_leases_are_left_alone(db):
+    add_jobs(db, {})
+    crud.job.claim_next_job(db, "worker", 60)
+    assert crud.job.requeue_expired_jobs(db, max_attempts=2, retry_delay_seconds=30) == (0, 0)
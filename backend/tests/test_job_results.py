@@ -0,0 +1,34 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services import job_results
+
+VALUE = {
+    "sum": 2 ** 70,
+    "cells": [-(2 ** 65), 3, None, "x"],
+    "mean": np.float64(1.5),
+    "count": np.int64(7),
+    "flag": np.bool_(True),
+    "at": datetime(2024, 1, 2, tzinfo=timezone.utc),
+}
+EXPECTED = {
+    "sum": 2 ** 70,
+    "cells": [-(2 ** 65), 3, None, "x"],
+    "mean": 1.5,
+    "count": 7,
+    "flag": True,
+    "at": "2024-01-02T00:00:00+00:00",
+}
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encode_json_handles_big_ints_and_numpy_values(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(job_results, "orjson", None)
+    assert json.loads(job_results.encode_json(VALUE)) == EXPECTED
+
+def test_encode_json_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        job_results.encode_json({"value": object()})
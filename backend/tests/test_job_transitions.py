@@ -0,0 +1,38 @@
+from app import crud
+from app.core.config import settings
+from app.db.models import JobStatus
+from app.schemas.job import JobCreate
+
+def new_job(db):
+    return crud.job.create_job(db, JobCreate(uploaded_file_id=1))
+
+def test_transition_is_guarded_by_status(db):
+    job = new_job(db)
+    job_id, version = job.id, job.version
+    claimed = crud.job.transition_job(db, job_id, JobStatus.PROCESSING, from_statuses=[JobStatus.PENDING])
+    assert claimed.status == JobStatus.PROCESSING and claimed.version == version + 1
+    assert claimed.started_at is not None and claimed.finished_at is None
+    assert crud.job.transition_job(db, job_id, JobStatus.PROCESSING, from_statuses=[JobStatus.PENDING]) is None
+    assert crud.job.transition_job(db, 12345, JobStatus.PROCESSING) is None
+
+def test_transition_requires_the_lease(db):
+    job_id = new_job(db).id
+    crud.job.claim_next_job(db, "worker", 60)
+    assert crud.job.transition_job(db, job_id, JobStatus.COMPLETED, results={}, lease_owner="other") is None
+    completed = crud.job.transition_job(db, job_id, JobStatus.COMPLETED, results={}, lease_owner="worker")
+    assert completed.status == JobStatus.COMPLETED and completed.finished_at is not None
+
+def test_results_replace_their_artifact_references(db, monkeypatch):
+    job_id = new_job(db).id
+    crud.job.transition_job(db, job_id, JobStatus.PROCESSING)
+    monkeypatch.setattr(settings, "PIPELINE_VERSION", "next")
+    crud.job.transition_job(db, job_id, JobStatus.COMPLETED, results={"a": 1}, result_artifacts={"x", "y"})
+    assert crud.job.get_result_artifacts(db, job_id) == {"x", "y"}
+    db.expire_all()
+    assert crud.job.get_job(db, job_id).pipeline_version == "next"
+
+    crud.job.requeue_job(db, job_id)
+    assert crud.job.get_result_artifacts(db, job_id) == {"x", "y"} # Readable until the rerun replaces them
+    crud.job.transition_job(db, job_id, JobStatus.PROCESSING)
+    crud.job.transition_job(db, job_id, JobStatus.FAILED, results={"error": "broke"})
+    assert crud.job.get_result_artifacts(db, job_id) == set()
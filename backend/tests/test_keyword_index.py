@@ -0,0 +1,40 @@
+import logging
+
+from app import crud
+from app.schemas.job import JobCreate
+from app.services import keyword_index
+
+def new_job(db):
+    return crud.job.create_job(db, JobCreate(uploaded_file_id=1)).id
+
+def test_add_document_counts_each_job_once(db):
+    first, second = new_job(db), new_job(db)
+    assert crud.keyword.add_document(db, first, ["alpha", "beta", "alpha"])
+    assert not crud.keyword.add_document(db, first, ["alpha", "gamma"]) # Retried or re-analyzed job
+    assert crud.keyword.add_document(db, second, ["beta", "gamma"])
+    assert not crud.keyword.add_document(db, 12345, ["alpha"]) # No such job
+    assert crud.keyword.get_document_frequencies(db, ["alpha", "beta", "gamma", "delta"]) == (2, {"alpha": 1, "beta": 2, "gamma": 1})
+    assert crud.job.get_job(db, first).keywords_indexed_at is not None
+
+def test_lookups_and_upserts_are_batched(db):
+    terms = [f"t{i:04d}" for i in range(2500)]
+    assert crud.keyword.add_document(db, new_job(db), terms)
+    assert crud.keyword.add_document(db, new_job(db), terms[:700])
+    documents, frequencies = crud.keyword.get_document_frequencies(db, terms)
+    assert documents == 2 and len(frequencies) == 2500
+    assert frequencies["t0000"] == frequencies["t0699"] == 2 and frequencies["t0700"] == 1
+
+def test_index_errors_are_logged(db, monkeypatch, caplog):
+    job_id = new_job(db)
+    index = keyword_index.DocumentFrequencyIndex(job_id)
+    def broken(*args):
+        raise RuntimeError("database is down")
+    monkeypatch.setattr(crud.keyword, "get_document_frequencies", broken)
+    monkeypatch.setattr(crud.keyword, "add_document", broken)
+    with caplog.at_level(logging.WARNING, logger="udea_logger"):
+        assert index.lookup(["alpha"]) == (0, {})
+        index.add_document({"alpha": 3})
+    assert [record.getMessage() for record in caplog.records] == [
+        f"Could not read the keyword index for job {job_id}: database is down",
+        f"Could not add job {job_id} to the keyword index: database is down",
+    ]
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_gateway
+from app.services.llm_gateway import LLMError, LLMGateway
+from benchmarks import mock_llm_server
+
+TEMPLATE = "analyzer"
+
+@pytest.fixture(autouse=True)
+def llm_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE", False)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_DELAY", 0.01)
+
+@pytest.fixture
+def mock_server():
+    """The mock LLM API, answering at once and never failing unless a test says so."""
+    saved = dict(mock_llm_server.config)
+    mock_llm_server.config.update(latency=0.01, failure_rate=0.0, retry_after=0.01)
+    mock_llm_server._reset_stats()
+    yield mock_llm_server
+    mock_llm_server.config.update(saved)
+
+def mock_gateway(**kwargs) -> LLMGateway:
+    return LLMGateway(base_url="http://mock-llm/v1", transport=httpx.ASGITransport(app=mock_llm_server.app), **kwargs)
+
+def run(coroutine_function):
+    """Runs coroutine_function(gateway) with a new mock gateway, closing it afterwards."""
+    async def main():
+        gateway = mock_gateway()
+        try:
+            return await coroutine_function(gateway)
+        finally:
+            await gateway.aclose()
+    return asyncio.run(main())
+
+def test_identical_calls_in_flight_share_one_request(mock_server):
+    answers = run(lambda gateway: asyncio.gather(*(gateway.complete(TEMPLATE, "The same input") for _ in range(20))))
+    assert len(set(answers)) == 1
+    assert mock_server.stats["requests"] == 1
+
+def test_small_inputs_are_batched(mock_server):
+    texts = [f"Short note {i}" for i in range(10)]
+    answers = run(lambda gateway: gateway.complete_many(TEMPLATE, texts))
+    assert answers == [mock_llm_server._answer(text) for text in texts]
+    assert mock_server.stats["requests"] == 1
+    assert mock_server.stats["batched_inputs"] == 10
+
+def test_failing_requests_are_retried_then_raise(mock_server):
+    mock_server.config["failure_rate"] = 1.0
+    with pytest.raises(LLMError):
+        run(lambda gateway: gateway.complete(TEMPLATE, "Always fails"))
+    assert mock_server.stats["requests"] == settings.LLM_MAX_RETRIES + 1
+
+def scripted_transport(statuses):
+    """A transport answering with statuses in turn (then 200), recording the requests."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        status = statuses[len(requests) - 1] if len(requests) <= len(statuses) else 200
+        if status != 200:
+            return httpx.Response(status, headers={"Retry-After": "0"}, json={"error": {"message": "scripted"}})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "answer"}}], "usage": {}})
+    return httpx.MockTransport(handler), requests
+
+def test_retryable_errors_are_retried_until_an_answer():
+    transport, requests = scripted_transport([503, 429])
+
+    async def main():
+        gateway = LLMGateway(base_url="http://llm/v1", transport=transport)
+        try:
+            return await gateway.complete(TEMPLATE, "text")
+        finally:
+            await gateway.aclose()
+    assert asyncio.run(main()) == "answer"
+    assert len(requests) == 3
+
+def test_client_errors_are_not_retried():
+    transport, requests = scripted_transport([400])
+
+    async def main():
+        gateway = LLMGateway(base_url="http://llm/v1", transport=transport)
+        try:
+            return await gateway.complete(TEMPLATE, "text")
+        finally:
+            await gateway.aclose()
+    with pytest.raises(LLMError):
+        asyncio.run(main())
+    assert len(requests) == 1
+
+def test_process_gateway_is_shared_across_event_loops(mock_server):
+    gateway = mock_gateway(dedicated_loop=True)
+    llm_gateway.set_llm_gateway(gateway)
+    try:
+        assert llm_gateway.get_llm_gateway() is gateway
+        # Two loops at once (as two jobs would run), coalescing on the gateway's own loop
+        async def job():
+            return await llm_gateway.get_llm_gateway().complete(TEMPLATE, "Shared input")
+
+        async def two_jobs():
+            return await asyncio.gather(asyncio.to_thread(asyncio.run, job()), asyncio.to_thread(asyncio.run, job()))
+        first, second = asyncio.run(two_jobs())
+        assert first == second
+        assert mock_server.stats["requests"] == 1
+    finally:
+        asyncio.run(llm_gateway.close_llm_gateway())
+    assert llm_gateway._gateway is None
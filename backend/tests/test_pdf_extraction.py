@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+from app.core.config import settings
+from app.services.ai_agents import extractor_agent, pdf_extractor
+from app.services.ai_agents.sources import as_source
+from benchmarks.corpus import generate_pdf
+
+PAGES = 12
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "generated.pdf")
+    generate_pdf(path, PAGES, table_ratio=0.5, scanned_ratio=0, seed=3)
+    return path
+
+@pytest.fixture
+def in_process(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PROCESS_POOL_SIZE", 0)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 3)
+
+@pytest.fixture(scope="module")
+def all_pages(pdf_path):
+    return [page["text"] for page in pdf_extractor.extract_pages(as_source(pdf_path), range(1, PAGES + 1))]
+
+def test_parse_page_ranges():
+    assert pdf_extractor.parse_page_ranges(None, 4) == pdf_extractor.parse_page_ranges(" ", 4) == [1, 2, 3, 4]
+    assert pdf_extractor.parse_page_ranges("3, 1-2,2,9-", 10) == [1, 2, 3, 9, 10]
+    assert pdf_extractor.parse_page_ranges("-2,8-20", 10) == [1, 2, 8, 9, 10]
+    assert pdf_extractor.parse_page_ranges("9-12", 10) == [9, 10]
+    for spec in ("0", "5-2", "11-", "a", "1-b"):
+        with pytest.raises(ValueError):
+            pdf_extractor.parse_page_ranges(spec, 10)
+
+def test_page_range_selection(pdf_path, all_pages, in_process, monkeypatch):
+    output = extractor_agent.extract_from_pdf(pdf_path, "2-3,10-")
+    assert output["full_text_content"] == [all_pages[n - 1] for n in (2, 3, 10, 11, 12)]
+    assert all(table.name.startswith(("page_2_", "page_3_", "page_10_", "page_11_", "page_12_")) for table in output["tables"])
+    summary = output["pdf_pages"]
+    assert (summary["page_count"], summary["pages_requested"], summary["pages_extracted"]) == (PAGES, 5, 5)
+    assert summary["complete"] and summary["error"] is None and summary["failed_pages"] == []
+
+    monkeypatch.setattr(settings, "PDF_MAX_PAGES", 2)
+    capped = extractor_agent.extract_from_pdf(pdf_path, "5-")
+    assert capped["full_text_content"] == all_pages[4:6]
+    assert capped["pdf_pages"]["pages_requested"] == 2 and capped["pdf_pages"]["complete"]
+
+def test_invalid_range_is_reported(pdf_path, in_process):
+    output = extractor_agent.extract_from_pdf(pdf_path, "5-2")
+    assert output["full_text_content"] == []
+    summary = output["pdf_pages"]
+    assert summary["page_count"] == PAGES and summary["pages_extracted"] == 0
+    assert not summary["complete"] and summary["error"].startswith("ValueError")
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_truncated_extraction_is_flagged(pdf_path, in_process, monkeypatch, streaming):
+    extract_pages = pdf_extractor.extract_pages
+    def fail_on_page_7(source, page_numbers):
+        if 7 in page_numbers:
+            raise OSError("connection reset")
+        return extract_pages(source, page_numbers)
+    monkeypatch.setattr(pdf_extractor, "extract_pages", fail_on_page_7)
+
+    if streaming:
+        streamed = extractor_agent.stream_from_pdf(pdf_path)
+        assert streamed.summary["complete"] # Not known to be truncated until the pages are consumed
+        texts = [page["text"] for page in streamed.pages]
+        summary = streamed.summary
+    else:
+        output = extractor_agent.extract_from_pdf(pdf_path)
+        texts, summary = output["full_text_content"], output["pdf_pages"]
+    assert len(texts) == 6 # Pages 1-6: the task holding pages 7-9 failed
+    assert (summary["pages_requested"], summary["pages_extracted"]) == (PAGES, 6)
+    assert not summary["complete"] and summary["error"] == "OSError: connection reset"
+
+def test_unreadable_pdf_is_flagged(tmp_path, in_process):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4\nnot really a pdf")
+    output = asyncio.run(extractor_agent.run_extraction_agent(str(path), "application/pdf", "broken.pdf", streaming=False))
+    assert output["full_text_content"] == [] and not output["pdf_pages"]["complete"]
+
+def test_pool_matches_in_process_extraction(pdf_path, all_pages, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PROCESS_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 2)
+    assert pdf_extractor._get_pdf_pool() is not None
+    pages = list(pdf_extractor.iter_pdf_pages(as_source(pdf_path), list(range(1, PAGES + 1))))
+    assert [page["page"] for page in pages] == list(range(1, PAGES + 1))
+    assert [page["text"] for page in pages] == all_pages
+
+def _extract_in_daemon(path, results):
+    results.put((pdf_extractor._get_pdf_pool() is None, extractor_agent.extract_from_pdf(path)["pdf_pages"]))
+
+def test_daemonic_process_extracts_without_a_pool(pdf_path, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PROCESS_POOL_SIZE", 2) # Inherited by the forked child
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 2)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_extract_in_daemon, args=(pdf_path, results), daemon=True) # As a Celery prefork child is
+    child.start()
+    no_pool, summary = results.get(timeout=60)
+    child.join(10)
+    assert no_pool # A daemonic process may not start children
+    assert summary["complete"] and summary["pages_extracted"] == PAGES
@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+
+from app import crud
+from app.crud.search import _fts5_query
+from app.services import search_index
+
+DOCUMENTS = {
+    1: ("report.txt", "Quarterly revenue grew while operating costs fell."),
+    2: ("revenue.csv", "region,amount\nnorth,10\nsouth,20"),
+    3: ("notes.txt", "Costs of the C++ rewrite and the \"legacy\" system; revenue unchanged."),
+    4: ("empty.txt", ""),
+}
+
+@pytest.fixture
+def indexed(db):
+    for job_id, (filename, content) in DOCUMENTS.items():
+        crud.search.upsert_document(db, job_id, filename, content)
+    return db
+
+def job_ids(db, query, limit=10, offset=0):
+    return [hit["job_id"] for hit in crud.search.search_documents(db, query, limit, offset)]
+
+def test_fts5_query_quotes_every_term():
+    assert _fts5_query("revenue costs") == '"revenue" "costs"'
+    assert _fts5_query('  say "hi"  OR (x) ') == '"say" """hi""" "OR" "(x)"'
+    assert _fts5_query("c++ -legacy NEAR/2 col:val *") == '"c++" "-legacy" "NEAR/2" "col:val" "*"'
+    assert _fts5_query("") == _fts5_query(" \t\n") == ""
+
+def test_search_ranks_and_highlights(indexed):
+    hits = crud.search.search_documents(indexed, "revenue", 10)
+    assert hits[0]["job_id"] == 2 # Filename matches weigh more than content matches
+    assert {hit["job_id"] for hit in hits} == {1, 2, 3}
+    assert hits == sorted(hits, key=lambda hit: -hit["rank"])
+    report = next(hit for hit in hits if hit["job_id"] == 1)
+    assert report["filename"] == "report.txt" and "<b>revenue</b>" in report["snippet"]
+    assert job_ids(indexed, "revenue costs") == job_ids(indexed, "COSTS Revenue") # Every term must match, in any case
+    assert set(job_ids(indexed, "revenue costs")) == {1, 3}
+    assert set(job_ids(indexed, "cost")) == {1, 3} # Porter stemming
+
+def test_punctuation_is_not_query_syntax(indexed):
+    for query in ('"legacy', "c++", "costs -revenue", "NEAR(costs revenue)", "revenue OR nothing", "*", "amount:10", "'"):
+        job_ids(indexed, query) # Must not raise an FTS5 syntax error
+    assert job_ids(indexed, '"legacy"') == [3]
+    assert job_ids(indexed, "revenue OR nothing") == [] # OR is a plain term here
+
+def test_empty_query_returns_nothing(indexed):
+    assert job_ids(indexed, "") == job_ids(indexed, "   ") == []
+
+def test_pagination(indexed):
+    everything = job_ids(indexed, "revenue")
+    assert job_ids(indexed, "revenue", limit=2) + job_ids(indexed, "revenue", limit=2, offset=2) == everything
+    assert job_ids(indexed, "revenue", offset=10) == []
+
+def test_reindexing_replaces_the_document(indexed):
+    crud.search.upsert_document(indexed, 1, "renamed.txt", "nothing to see")
+    assert 1 not in job_ids(indexed, "revenue")
+    assert job_ids(indexed, "renamed") == job_ids(indexed, "nothing") == [1]
+    assert job_ids(indexed, "report") == []
+
+def test_index_job_logs_failures(db, monkeypatch, caplog):
+    def broken(*args):
+        raise RuntimeError("database is down")
+    monkeypatch.setattr(crud.search, "upsert_document", broken)
+    with caplog.at_level(logging.WARNING, logger="udea_logger"):
+        search_index.index_job(7, "a.txt", "text")
+    assert [record.getMessage() for record in caplog.records] == ["Could not index job 7 for search: database is down"]
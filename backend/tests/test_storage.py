@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from app.services.storage import LocalStorageBackend, RangeReader
+
+DATA = bytes(range(256)) * 64
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path), "bucket")
+    backend.ensure_bucket()
+    return backend
+
+def test_put_and_read_back(backend):
+    backend.put_stream("a/b/object.bin", io.BytesIO(DATA), "application/octet-stream", 1000)
+    assert backend.size("a/b/object.bin") == len(DATA)
+    with backend.open_stream("a/b/object.bin") as f:
+        assert f.read() == DATA
+
+def test_put_file_and_get_to_file(backend, tmp_path):
+    source = tmp_path / "source.bin"
+    source.write_bytes(DATA)
+    backend.put_file("object.bin", str(source), "application/octet-stream")
+    destination = tmp_path / "copy.bin"
+    backend.get_to_file("object.bin", str(destination))
+    assert destination.read_bytes() == DATA
+
+def test_read_range(backend):
+    backend.put_stream("object.bin", io.BytesIO(DATA), "application/octet-stream", 1000)
+    assert backend.read_range("object.bin", 100, 50) == DATA[100:150]
+    assert backend.read_range("object.bin", len(DATA) - 10, 50) == DATA[-10:]
+    assert backend.read_range("object.bin", len(DATA) + 10, 50) == b""
+
+def test_remove(backend):
+    backend.put_stream("object.bin", io.BytesIO(DATA), "application/octet-stream", 1000)
+    backend.remove("object.bin")
+    with pytest.raises(FileNotFoundError):
+        backend.size("object.bin")
+
+def test_object_names_stay_in_the_bucket(backend):
+    with pytest.raises(ValueError):
+        backend.put_stream("../outside.bin", io.BytesIO(DATA), "application/octet-stream", 1000)
+
+class FailingStream(io.RawIOBase):
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        raise OSError("connection reset")
+
+def test_failed_put_leaves_nothing(backend, tmp_path):
+    with pytest.raises(OSError):
+        backend.put_stream("object.bin", FailingStream(), "application/octet-stream", 1000)
+    assert [path.name for path in (tmp_path / "bucket").iterdir()] == []
+
+def test_range_reader_seeks_and_reads(backend):
+    backend.put_stream("object.bin", io.BytesIO(DATA), "application/octet-stream", 1000)
+    with io.BufferedReader(RangeReader(backend, "object.bin"), buffer_size=128) as f:
+        assert f.read(10) == DATA[:10]
+        f.seek(-20, io.SEEK_END)
+        assert f.read() == DATA[-20:]
+        f.seek(5000)
+        assert f.read(300) == DATA[5000:5300]
+        assert f.tell() == 5300
@@ -0,0 +1,53 @@
+import asyncio
+import csv
+
+import pytest
+
+from app.core.config import settings
+from app.services.ai_agents import analyzer_agent, cleaner_agent, extractor_agent
+from app.services.ai_agents.columnar import ColumnarTable, StreamedTable
+from row_wise import analyze_table, assert_same_analysis, clean_rows
+
+CSVS = {
+    "mixed": [["id", "amount", "zip", "mixed", "when"]] + [
+        [str(i), f"${i * 3},{i % 1000:03d}" if i % 4 else "", f"{i % 90000:05d}", ["1", "two", "3.5", ""][i % 4], "May 10, 2024"]
+        for i in range(1, 700)
+    ] + [["ragged", "row"]],
+    "null_heavy": [["label", "value", "empty"]] + [[f"r{i % 13}", str(i) if i % 9 == 0 else "", ""] for i in range(600)],
+    "header_only": [["a", "b", "c"]],
+}
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    return str(path)
+
+def analyze(path, streaming):
+    extracted = asyncio.run(extractor_agent.run_extraction_agent(path, "text/csv", "data.csv", streaming=streaming))
+    cleaned = asyncio.run(cleaner_agent.run_cleaning_agent(extracted))
+    return asyncio.run(analyzer_agent.run_analysis_agent(cleaned))["table_analysis"]
+
+@pytest.mark.parametrize("name", CSVS)
+def test_streamed_analysis_matches_buffered_and_row_wise(name, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CSV_STREAM_CHUNK_ROWS", 64)
+    path = write_csv(tmp_path / f"{name}.csv", CSVS[name])
+    streamed, buffered = analyze(path, streaming=True), analyze(path, streaming=False)
+    assert len(streamed) == len(buffered) == 1
+    expected = analyze_table(streamed[0]["table_name"], clean_rows(CSVS[name]))
+    assert_same_analysis(streamed[0], expected)
+    assert_same_analysis(buffered[0], expected)
+
+def test_chunks_are_bounded(tmp_path):
+    path = write_csv(tmp_path / "data.csv", CSVS["mixed"])
+    table = extractor_agent.stream_table_from_csv(path, chunk_rows=100)
+    assert isinstance(table, StreamedTable) and table.header == CSVS["mixed"][0]
+    chunks = list(table.chunks)
+    assert all(isinstance(chunk, ColumnarTable) and chunk.num_rows <= 100 for chunk in chunks)
+    assert sum(chunk.num_rows for chunk in chunks) == 699
+    assert sum(chunk.skipped_rows for chunk in chunks) == 1
+
+def test_empty_csv(tmp_path):
+    path = write_csv(tmp_path / "empty.csv", [])
+    assert extractor_agent.stream_table_from_csv(path) is None
+    assert extractor_agent.extract_tables_from_csv(path) == []
+    assert analyze(path, streaming=True) == analyze(path, streaming=False) == []
@@ -0,0 +1,117 @@
+"""
+Worker for the database job queue (JOB_QUEUE_BACKEND=database).
+
+Claims PENDING jobs from the jobs table (priority first, fair between tenants), runs the
+pipeline under a lease that a background thread keeps renewing, and re-queues jobs whose
+lease expired because their worker died or hung.
+
+Start from the backend/ directory:
+    python -m workers.db_worker --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import uuid
+from typing import Optional, Set
+
+from app import crud
+from app.core import metrics
+from app.core.config import settings
+from app.db import session as db_session
+from app.services import job_orchestrator, llm_gateway
+
+class DatabaseQueueWorker:
+    def __init__(self, worker_id: Optional[str] = None, concurrency: Optional[int] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency or settings.DB_WORKER_CONCURRENCY
+        self._in_flight: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _session(self):
+        return next(db_session.get_db())
+
+    def run_once(self) -> bool:
+        """Claims and processes one job. Returns False if no job was claimable."""
+        db = self._session()
+        try:
+            claimed = crud.job.claim_next_job(db, self.worker_id, settings.JOB_LEASE_SECONDS, settings.JOB_QUEUE_CLAIM_WINDOW)
+        finally:
+            db.close()
+        if claimed is None:
+            return False
+        job_id, _ = claimed
+        with self._lock:
+            self._in_flight.add(job_id)
+        try:
+            asyncio.run(job_orchestrator.process_file_job(job_id, db_session.get_db, lease_owner=self.worker_id))
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+        return True
+
+    def maintain(self) -> None:
+        """Renews this worker's leases and re-queues (or fails) jobs whose lease expired."""
+        db = self._session()
+        try:
+            with self._lock:
+                in_flight = set(self._in_flight)
+            held = crud.job.heartbeat_jobs(db, in_flight, self.worker_id, settings.JOB_LEASE_SECONDS)
+            for job_id in in_flight - held:
+                print(f"Worker {self.worker_id} lost the lease on job {job_id}; its results will be discarded.")
+            requeued, failed = crud.job.requeue_expired_jobs(
+                db, settings.JOB_QUEUE_MAX_ATTEMPTS, settings.JOB_QUEUE_RETRY_DELAY_SECONDS
+            )
+            if requeued or failed:
+                print(f"Expired leases: {requeued} job(s) re-queued, {failed} job(s) failed.")
+        finally:
+            db.close()
+
+    def _claim_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"Worker {self.worker_id} error: {e}")
+            self._stop.wait(settings.JOB_QUEUE_POLL_INTERVAL)
+
+    def _maintenance_loop(self) -> None:
+        interval = max(1, settings.JOB_LEASE_SECONDS // 3) # Renew well before the lease runs out
+        while not self._stop.wait(interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"Worker {self.worker_id} maintenance error: {e}")
+
+    def run_forever(self) -> None:
+        print(f"Database queue worker {self.worker_id} started with {self.concurrency} slot(s).")
+        self.maintain()
+        threads = [threading.Thread(target=self._maintenance_loop, name="queue-maintenance", daemon=True)]
+        threads += [threading.Thread(target=self._claim_loop, name=f"queue-slot-{i}") for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads[1:]:
+                thread.join()
+        except KeyboardInterrupt:
+            print("Stopping after the jobs in progress...")
+            self._stop.set()
+            for thread in threads[1:]:
+                thread.join()
+        asyncio.run(llm_gateway.close_llm_gateway()) # Shared by the jobs of this process
+
+    def stop(self) -> None:
+        self._stop.set()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--metrics-port", type=int, default=settings.METRICS_WORKER_PORT, help="0 = no metrics endpoint")
+    args = parser.parse_args()
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    DatabaseQueueWorker(args.worker_id, args.concurrency).run_forever()
@@ -0,0 +1,32 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+
+from app.db import session as db_session
+from app.services import job_orchestrator, job_queue, llm_gateway
+from workers.celery_app import celery_app
+
+def _run(coro) -> None:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(coro)
+        return
+    # Eager mode called from inside the API's event loop: run on a fresh loop in another thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(asyncio.run, coro).result()
+
+@celery_app.task(name=job_queue.PROCESS_FILE_JOB_TASK, bind=True)
+def process_file_job_task(self, job_id: int) -> None:
+    """Runs the extraction -> cleaning -> analysis pipeline for a job in a worker process."""
+    # A redelivered task (its worker died mid-job, see task_acks_late) may take over the PROCESSING job
+    redelivered = bool((self.request.delivery_info or {}).get("redelivered"))
+    _run(job_orchestrator.process_file_job(job_id=job_id, db_provider=db_session.get_db, allow_reclaim=redelivered))
+
+@worker_process_shutdown.connect # Prefork children
+@worker_shutdown.connect # Threads and solo pools
+def close_llm_gateway(**_: Any) -> None:
+    """Closes the LLM gateway the jobs of this process shared."""
+    asyncio.run(llm_gateway.close_llm_gateway())